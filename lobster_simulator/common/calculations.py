@@ -1,3 +1,6 @@
+import math
+
+import numpy as np
 from lobster_common.vec3 import Vec3
 
 
@@ -12,4 +15,47 @@ def interpolate_vec(x: float, x1: float, x2: float, y1: Vec3, y2: Vec3) -> Vec3:
 
 
 def clip(value: float, min_value: float, max_value: float) -> float:
-    return max(min(value, max_value), min_value)
\ No newline at end of file
+    return max(min(value, max_value), min_value)
+
+
+def quadratic_interpolation_weights(times: np.ndarray, x: np.ndarray, derivative: bool = False) -> np.ndarray:
+    """
+    Weights of the parabola through three points, so the interpolated values are weights.dot(values).
+    :param times: The 3 (distinct) times of the points.
+    :param x: (N,) times to interpolate at.
+    :param derivative: Whether to give the weights of the derivative of the parabola instead.
+    :return: (N, 3) weights.
+    """
+    x = np.asarray(x, dtype=float)[:, None]
+    times = np.asarray(times, dtype=float)
+    others = np.array([[1, 2], [0, 2], [0, 1]])
+
+    denominators = (times - times[others[:, 0]]) * (times - times[others[:, 1]])
+    if derivative:
+        numerators = 2 * x - times[others[:, 0]] - times[others[:, 1]]
+    else:
+        numerators = (x - times[others[:, 0]]) * (x - times[others[:, 1]])
+    return numerators / denominators
+
+
+def interpolate_rotations(rotation1: np.ndarray, rotation2: np.ndarray, fractions: np.ndarray) -> np.ndarray:
+    """
+    Interpolates between two rotation matrices along the shortest rotation between them.
+    :param rotation1: (3, 3) rotation at fraction 0.
+    :param rotation2: (3, 3) rotation at fraction 1.
+    :param fractions: (N,) fractions to interpolate at.
+    :return: (N, 3, 3) rotation matrices.
+    """
+    relative = rotation1.T.dot(rotation2)
+    angle = math.acos(clip((np.trace(relative) - 1) / 2, -1, 1))
+    if angle < 1e-12:
+        return np.broadcast_to(rotation1, (len(fractions), 3, 3)).copy()
+
+    axis = np.array([relative[2, 1] - relative[1, 2], relative[0, 2] - relative[2, 0], relative[1, 0] - relative[0, 1]])
+    axis /= 2 * math.sin(angle)
+    cross = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]])
+
+    # Rodrigues' formula for every fraction of the angle.
+    angles = np.asarray(fractions, dtype=float)[:, None, None] * angle
+    steps = np.eye(3) + np.sin(angles) * cross + (1 - np.cos(angles)) * cross.dot(cross)
+    return np.einsum('ij,njk->nik', rotation1, steps)
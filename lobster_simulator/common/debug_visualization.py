@@ -1,4 +1,5 @@
 from abc import ABC
+from typing import Optional
 
 from lobster_common.quaternion import Quaternion
 from lobster_common.vec3 import Vec3
@@ -17,7 +18,8 @@ class DebugLine(PyBulletObject):
     """
     _MIN_UPDATE_INTERVAL = 0.03
 
-    def __init__(self, from_location: Vec3 = None, to_location: Vec3 = None, width=5, color=None, parentIndex=-1):
+    def __init__(self, from_location: Vec3 = None, to_location: Vec3 = None, width=5, color=None, parentIndex=-1,
+                 physics_client_id: Optional[int] = None):
         if color is None:
             color = [1, 1, 1]
 
@@ -37,8 +39,9 @@ class DebugLine(PyBulletObject):
 
         self._latest_update_time = 0
         self._object_id = -1
+        self._physics_client_id = PybulletAPI._client(physics_client_id)
         object_id = self._update_debug_line()
-        super().__init__(object_id)
+        super().__init__(object_id, physics_client_id)
 
     def update(self, from_location: Vec3 = None, to_location: Vec3 = None, frame_id: int = None, color=None) -> None:
         """
@@ -72,28 +75,32 @@ class DebugLine(PyBulletObject):
                                             lineWidth=self._width,
                                             lineColorRGB=self._color,
                                             parentObjectUniqueId=self.parentIndex,
-                                            replaceItemUniqueId=self._object_id)
+                                            replaceItemUniqueId=self._object_id,
+                                            physicsClientId=self._physics_client_id)
 
 
 class DebugSphere(PyBulletObject):
 
-    def __init__(self, radius, rgba_color):
-        object_id = PybulletAPI.createVisualSphere(radius, rgba_color)
-        super().__init__(object_id)
+    def __init__(self, radius, rgba_color, physics_client_id: Optional[int] = None):
+        object_id = PybulletAPI.createVisualSphere(radius, rgba_color, physicsClientId=physics_client_id)
+        super().__init__(object_id, physics_client_id)
 
     def update_position(self, position: Vec3):
-        PybulletAPI.resetBasePositionAndOrientation(self._object_id, posObj=position)
+        PybulletAPI.resetBasePositionAndOrientation(self._object_id, posObj=position,
+                                                    physicsClientId=self._physics_client_id)
 
 
 class DebugScout(PyBulletObject):
 
-    def __init__(self, pos: Vec3 = None):
+    def __init__(self, pos: Vec3 = None, physics_client_id: Optional[int] = None):
         if not pos:
             pos = Vec3([0, 0, 0])
 
         object_id = PybulletAPI.loadURDF(resource_filename("lobster_simulator",
-                                                           "data/scout-alpha-visual.urdf"), pos)
-        super().__init__(object_id)
+                                                           "data/scout-alpha-visual.urdf"), pos,
+                                         physicsClientId=physics_client_id)
+        super().__init__(object_id, physics_client_id)
 
     def set_position_and_orientation(self, position: Vec3, orientation: Quaternion):
-        PybulletAPI.resetBasePositionAndOrientation(self._object_id, posObj=position, ornObj=orientation)
+        PybulletAPI.resetBasePositionAndOrientation(self._object_id, posObj=position, ornObj=orientation,
+                                                    physicsClientId=self._physics_client_id)
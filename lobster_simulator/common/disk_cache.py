@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional, Iterable, Dict, Callable, BinaryIO
+
+import numpy as np
+
+# Set this environment variable to change the cache directory, an empty value disables the cache.
+CACHE_DIRECTORY_ENVIRONMENT_VARIABLE = 'LOBSTER_SIMULATOR_CACHE'
+
+
+def cache_directory() -> Optional[str]:
+    """
+    Directory the cached results are stored in.
+    :return: Path to the directory or None when caching is disabled.
+    """
+    directory = os.environ.get(CACHE_DIRECTORY_ENVIRONMENT_VARIABLE)
+    if directory is None:
+        directory = os.path.join(os.path.expanduser('~'), '.cache', 'lobster_simulator')
+
+    return directory or None
+
+
+def cache_key(*parameters, files: Iterable[str] = ()) -> str:
+    """
+    Creates a key based on the given parameters and the content of the given files, so the key changes whenever one of
+    the files is changed.
+    :param parameters: Parameters that have to be part of the key, their repr is used.
+    :param files: Paths of the files whose content has to be part of the key.
+    :return: Hex digest that can be used as a file name.
+    """
+    key = hashlib.sha256()
+    for parameter in parameters:
+        key.update(repr(parameter).encode())
+
+    for file in files:
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                key.update(block)
+
+    return key.hexdigest()
+
+
+def load_array(name: str, key: str) -> Optional[np.ndarray]:
+    """
+    Loads an array from the cache.
+    :param name: Name of the kind of data, this is used as a sub directory.
+    :param key: Key created with cache_key.
+    :return: The array or None when it wasn't cached (or the cached file can't be read).
+    """
+    path = _cache_path(name, key, '.npy')
+    if path is None:
+        return None
+
+    try:
+        return np.load(path, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+
+def save_array(name: str, key: str, array: np.ndarray) -> None:
+    """
+    Stores an array in the cache. The cache is only an optimization, so failing to write it is silently ignored.
+    :param name: Name of the kind of data, this is used as a sub directory.
+    :param key: Key created with cache_key.
+    :param array: Array to store.
+    """
+    _write(_cache_path(name, key, '.npy'), lambda f: np.save(f, array, allow_pickle=False))
+
+
+def load_arrays(name: str, key: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Loads a set of named arrays from the cache.
+    :param name: Name of the kind of data, this is used as a sub directory.
+    :param key: Key created with cache_key.
+    :return: The arrays by their name or None when they weren't cached (or the cached file can't be read).
+    """
+    path = _cache_path(name, key, '.npz')
+    if path is None:
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            return {array_name: arrays[array_name] for array_name in arrays.files}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_arrays(name: str, key: str, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Stores a set of named arrays in the cache. Failing to write it is silently ignored.
+    :param name: Name of the kind of data, this is used as a sub directory.
+    :param key: Key created with cache_key.
+    :param arrays: Arrays by their name.
+    """
+    _write(_cache_path(name, key, '.npz'), lambda f: np.savez(f, **arrays))
+
+
+def _cache_path(name: str, key: str, extension: str) -> Optional[str]:
+    directory = cache_directory()
+    if directory is None:
+        return None
+
+    return os.path.join(directory, name, key + extension)
+
+
+def _write(path: Optional[str], write: Callable[[BinaryIO], None]) -> None:
+    if path is None:
+        return
+
+    try:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first so other processes never see a partially written file.
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as f:
+                write(f)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+    except OSError:
+        pass
@@ -14,4 +14,10 @@ class ArgumentLengthError(Exception):
 class InputDimensionError(Exception):
     """
     Raised when the size of the input dimension is correct
-    """
\ No newline at end of file
+    """
+
+
+class StateRestoreError(Exception):
+    """
+    Raised when a saved state can't be restored, for example because bodies were added or removed after saving it.
+    """
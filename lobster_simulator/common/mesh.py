@@ -0,0 +1,167 @@
+from typing import Tuple
+
+import numpy as np
+
+_BINARY_STL_HEADER_SIZE = 80
+_BINARY_STL_TRIANGLE = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
+
+# The column centers are shifted by this (irrational) fraction of their spacing, so they never lie exactly on an edge
+#  or vertex of the mesh, which would make the crossing count ambiguous.
+_COLUMN_OFFSET = np.array([np.sqrt(2) - 1, np.sqrt(3) - 1]) * 1e-3
+
+# Amount of triangle/column pairs that is tested at once, this limits the memory usage.
+_PAIRS_PER_CHUNK = 1 << 21
+
+
+def load_stl(file_name: str) -> np.ndarray:
+    """
+    Loads the triangles of an STL file (binary or ASCII).
+    :param file_name: Path of the STL file.
+    :return: Array with shape (N, 3, 3) with the 3 vertices of every triangle.
+    """
+    with open(file_name, 'rb') as f:
+        data = f.read()
+
+    if len(data) >= _BINARY_STL_HEADER_SIZE + 4:
+        triangle_count = int(np.frombuffer(data, dtype='<u4', count=1, offset=_BINARY_STL_HEADER_SIZE)[0])
+        if len(data) == _BINARY_STL_HEADER_SIZE + 4 + triangle_count * _BINARY_STL_TRIANGLE.itemsize:
+            triangles = np.frombuffer(data, dtype=_BINARY_STL_TRIANGLE, count=triangle_count,
+                                      offset=_BINARY_STL_HEADER_SIZE + 4)
+            return triangles['vertices'].astype(float)
+
+    vertices = [line.split()[1:4] for line in data.decode('ascii', errors='replace').splitlines()
+                if line.strip().startswith('vertex')]
+    return np.array(vertices, dtype=float).reshape(-1, 3, 3)
+
+
+def mesh_volume(triangles: np.ndarray) -> float:
+    """
+    Volume enclosed by a closed mesh (with outward facing triangles).
+    """
+    return float(np.einsum('ij,ij->i', triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])).sum() / 6)
+
+
+def voxelize(triangles: np.ndarray, voxel_size: float, columns_per_voxel: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Determines which part of every voxel of a regular grid lies inside a closed mesh.
+
+    Columns of points are cast along the x axis through the mesh, every crossing with a triangle toggles between outside
+    and inside (parity), which gives the exact intervals along x that are inside the mesh for every column. Every voxel
+    is covered by columns_per_voxel x columns_per_voxel columns, the volume of a voxel is the sum of the inside lengths
+    of its columns times their cross section.
+    :param triangles: Array with shape (N, 3, 3) with the triangles of the mesh.
+    :param voxel_size: Size of the edges of the voxels.
+    :param columns_per_voxel: Amount of columns per voxel along y and along z.
+    :return: The centers (M, 3) and the volumes (M,) of the voxels that are (partly) inside the mesh.
+    """
+    if voxel_size <= 0:
+        raise ValueError("The voxel size should be bigger than zero")
+
+    minimum = triangles.reshape(-1, 3).min(axis=0) - voxel_size
+    maximum = triangles.reshape(-1, 3).max(axis=0) + voxel_size
+    shape = np.ceil((maximum - minimum) / voxel_size).astype(int)
+
+    column_size = voxel_size / columns_per_voxel
+    column_counts = shape[1:] * columns_per_voxel
+
+    y_crossings, z_crossings, x_crossings = _column_crossings(triangles, minimum[1:], column_size, column_counts)
+    columns = y_crossings * column_counts[1] + z_crossings
+
+    # Sort the crossings per column along x, consecutive crossings then form the enter and exit of an inside interval.
+    order = np.lexsort((x_crossings, columns))
+    columns = columns[order]
+    x_crossings = x_crossings[order]
+
+    _, crossing_counts = np.unique(columns, return_counts=True)
+
+    # Columns with an odd amount of crossings go through a hole in the mesh, they are ignored.
+    closed = np.repeat(crossing_counts % 2 == 0, crossing_counts)
+    columns = columns[closed]
+    x_crossings = x_crossings[closed]
+
+    enter = x_crossings[0::2]
+    exit_ = x_crossings[1::2]
+    interval_columns = columns[0::2]
+
+    # Length of every interval that lies before each voxel edge along x, the differences between the edges give the
+    #  inside length per voxel.
+    edges = minimum[0] + np.arange(shape[0] + 1) * voxel_size
+    lengths = np.zeros((column_counts[0] * column_counts[1], shape[0]))
+    for start in range(0, len(enter), max(1, _PAIRS_PER_CHUNK // (shape[0] + 1))):
+        end = start + max(1, _PAIRS_PER_CHUNK // (shape[0] + 1))
+        covered = np.clip(edges[None, :] - enter[start:end, None], 0, (exit_[start:end] - enter[start:end])[:, None])
+        np.add.at(lengths, interval_columns[start:end], np.diff(covered, axis=1))
+
+    volumes = lengths.reshape(shape[1], columns_per_voxel, shape[2], columns_per_voxel, shape[0]) \
+        .sum(axis=(1, 3)) * column_size ** 2
+
+    y, z, x = np.nonzero(volumes > 0)
+    centers = minimum + (np.stack([x, y, z], axis=1) + 0.5) * voxel_size
+
+    return centers, volumes[y, z, x]
+
+
+def _column_crossings(triangles: np.ndarray, minimum: np.ndarray, column_size: float,
+                      column_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds where the columns along the x axis cross the triangles.
+    :return: The y and z index of the column and the x coordinate of every crossing.
+    """
+    a = triangles[:, 0, 1:]
+    b = triangles[:, 1, 1:]
+    c = triangles[:, 2, 1:]
+
+    # Range of columns that lie within the bounding box of every triangle (in the yz plane)
+    lower = np.ceil((np.minimum(np.minimum(a, b), c) - minimum) / column_size - 0.5 - _COLUMN_OFFSET).astype(int)
+    upper = np.floor((np.maximum(np.maximum(a, b), c) - minimum) / column_size - 0.5 - _COLUMN_OFFSET).astype(int)
+    lower = np.maximum(lower, 0)
+    upper = np.minimum(upper, column_counts - 1)
+
+    counts = np.maximum(upper - lower + 1, 0)
+    pairs_per_triangle = counts[:, 0] * counts[:, 1]
+
+    y_crossings = []
+    z_crossings = []
+    x_crossings = []
+
+    # Process the triangles in chunks so the amount of triangle/column pairs stays limited.
+    cumulative_pairs = np.cumsum(pairs_per_triangle)
+    start = 0
+    while start < len(triangles):
+        end = int(np.searchsorted(cumulative_pairs, cumulative_pairs[start] - pairs_per_triangle[start]
+                                  + _PAIRS_PER_CHUNK, side='right'))
+        end = max(end, start + 1)
+
+        chunk = np.arange(start, end)
+        triangle = np.repeat(chunk, pairs_per_triangle[chunk])
+        pair = np.arange(len(triangle)) - np.repeat(cumulative_pairs[chunk] - pairs_per_triangle[chunk],
+                                                    pairs_per_triangle[chunk])
+        column_y = lower[triangle, 0] + pair // np.maximum(counts[triangle, 1], 1)
+        column_z = lower[triangle, 1] + pair % np.maximum(counts[triangle, 1], 1)
+
+        point = minimum + (np.stack([column_y, column_z], axis=1) + 0.5 + _COLUMN_OFFSET) * column_size
+
+        # Barycentric coordinates of the column within the projection of the triangle.
+        v0 = b[triangle] - a[triangle]
+        v1 = c[triangle] - a[triangle]
+        v2 = point - a[triangle]
+        denominator = v0[:, 0] * v1[:, 1] - v1[:, 0] * v0[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u = (v2[:, 0] * v1[:, 1] - v1[:, 0] * v2[:, 1]) / denominator
+            v = (v0[:, 0] * v2[:, 1] - v2[:, 0] * v0[:, 1]) / denominator
+            inside = (denominator != 0) & (u >= 0) & (v >= 0) & (u + v <= 1)
+
+        triangle = triangle[inside]
+        u = u[inside]
+        v = v[inside]
+        x = triangles[triangle, 0, 0] \
+            + u * (triangles[triangle, 1, 0] - triangles[triangle, 0, 0]) \
+            + v * (triangles[triangle, 2, 0] - triangles[triangle, 0, 0])
+
+        y_crossings.append(column_y[inside])
+        z_crossings.append(column_z[inside])
+        x_crossings.append(x)
+
+        start = end
+
+    return np.concatenate(y_crossings), np.concatenate(z_crossings), np.concatenate(x_crossings)
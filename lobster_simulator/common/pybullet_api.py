@@ -16,6 +16,16 @@ from lobster_simulator.common.simulation_time import SimulationTime
 from lobster_simulator.common import translation
 
 
+# Matrix that converts ENU vectors to NED, derived from Vec3 so the array conversions always agree with it.
+_ENU_TO_NED = np.column_stack([Vec3.fromENU(axis.tolist()).numpy() for axis in np.eye(3)])
+
+# Rows are the axes of an OpenGL camera (right, up, backwards) in the frame of a camera that looks along x with z down.
+_CAMERA_TO_OPENGL = np.array([[0, 1, 0], [0, 0, -1], [-1, 0, 0]], dtype=float)
+
+# Bullet refuses batches of more rays than this.
+_MAX_RAY_BATCH_SIZE = 8192
+
+
 class Frame(Enum):
     LINK_FRAME = 1
     WORLD_FRAME = 2
@@ -30,59 +40,97 @@ class PybulletAPI:
     KEY_IS_DOWN = p.KEY_IS_DOWN
     DELETE_KEY = p.B3G_DELETE
 
+    # The instance that is used when no physics client is given explicitly (the most recently initialized one).
     _INSTANCE: Optional[PybulletAPI] = None
 
+    # All connected instances by their physics client id.
+    _INSTANCES: Dict[int, PybulletAPI] = dict()
+
     def __init__(self, time_step: SimulationTime, gui: bool = False):
+        """
+        Connects to a new physics server. Every instance has its own physics client, so multiple (DIRECT mode) worlds
+        can exist side by side in one process without influencing each other.
+        :param time_step: Time step of the physics simulation.
+        :param gui: Connect with the PyBullet GUI when true.
+        """
         self._gui = gui
 
-        if self._INSTANCE is not None and p.isConnected(self._INSTANCE._physics_client_id):
-            # Instance could already exist when running test, just to be sure resetting it here.
-            p.resetSimulation(self._INSTANCE._physics_client_id)
-
         self._physics_client_id = -1
         if gui:
             self._physics_client_id = p.connect(p.GUI)
 
-            p.configureDebugVisualizer(p.COV_ENABLE_KEYBOARD_SHORTCUTS, 0)
-            p.configureDebugVisualizer(p.COV_ENABLE_RGB_BUFFER_PREVIEW, 0)
-            p.configureDebugVisualizer(p.COV_ENABLE_DEPTH_BUFFER_PREVIEW, 0)
-            p.configureDebugVisualizer(p.COV_ENABLE_SEGMENTATION_MARK_PREVIEW, 0)
-            p.configureDebugVisualizer(p.COV_ENABLE_SHADOWS, 1)
-            p.configureDebugVisualizer(p.COV_ENABLE_GUI, 0)
+            client = self._physics_client_id
+            p.configureDebugVisualizer(p.COV_ENABLE_KEYBOARD_SHORTCUTS, 0, physicsClientId=client)
+            p.configureDebugVisualizer(p.COV_ENABLE_RGB_BUFFER_PREVIEW, 0, physicsClientId=client)
+            p.configureDebugVisualizer(p.COV_ENABLE_DEPTH_BUFFER_PREVIEW, 0, physicsClientId=client)
+            p.configureDebugVisualizer(p.COV_ENABLE_SEGMENTATION_MARK_PREVIEW, 0, physicsClientId=client)
+            p.configureDebugVisualizer(p.COV_ENABLE_SHADOWS, 1, physicsClientId=client)
+            p.configureDebugVisualizer(p.COV_ENABLE_GUI, 0, physicsClientId=client)
 
         else:
             self._physics_client_id = p.connect(p.DIRECT)
 
-        p.setAdditionalSearchPath(pybullet_data.getDataPath())
-        p.setTimeStep(time_step.seconds)
-        p.setGravity(0, 0, -GRAVITY)
+        p.setAdditionalSearchPath(pybullet_data.getDataPath(), physicsClientId=self._physics_client_id)
+        p.setTimeStep(time_step.seconds, physicsClientId=self._physics_client_id)
+        p.setGravity(0, 0, -GRAVITY, physicsClientId=self._physics_client_id)
+
+        PybulletAPI._INSTANCES[self._physics_client_id] = self
 
     def is_gui_enabled(self) -> bool:
         return self._gui
 
+    @property
+    def physics_client_id(self) -> int:
+        return self._physics_client_id
+
     @staticmethod
-    def initialize(time_step: SimulationTime, gui: bool) -> None:
+    def initialize(time_step: SimulationTime, gui: bool) -> int:
+        """
+        Connects a new physics client and makes it the default client, which is used by all calls that don't specify a
+        physics client explicitly.
+        :return: Id of the new physics client.
+        """
         PybulletAPI._INSTANCE = PybulletAPI(time_step, gui)
+        return PybulletAPI._INSTANCE.physics_client_id
 
     @staticmethod
-    def changeDynamics(bodyUniqueId: int, linearDamping: float, angularDamping: float) -> None:
+    def _client(physicsClientId: Optional[int]) -> int:
+        """
+        Resolves the physics client that should be used, falling back to the default client when none is given.
+        """
+        if physicsClientId is None:
+            return PybulletAPI.get_pybullet_id()
+        return physicsClientId
+
+    @staticmethod
+    def changeDynamics(bodyUniqueId: int, linearDamping: float, angularDamping: float,
+                       physicsClientId: Optional[int] = None) -> None:
 
         p.changeDynamics(bodyUniqueId=bodyUniqueId,
                          linkIndex=-1,
                          linearDamping=linearDamping,
-                         angularDamping=angularDamping)
+                         angularDamping=angularDamping,
+                         physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
     def get_pybullet_id() -> int:
+        """
+        Gets the id of the default physics client (0, the PyBullet default, when no client has been initialized).
+        """
+        if PybulletAPI._INSTANCE is None:
+            return 0
         return PybulletAPI._INSTANCE._physics_client_id
 
     @staticmethod
-    def loadURDF(file_name: str, base_position: Vec3, base_orientation: Quaternion = None) -> int:
+    def loadURDF(file_name: str, base_position: Vec3, base_orientation: Quaternion = None,
+                 physicsClientId: Optional[int] = None) -> int:
         if base_orientation:
             return p.loadURDF(fileName=file_name, basePosition=base_position.asENU(),
-                              baseOrientation=base_orientation.asENU())
+                              baseOrientation=base_orientation.asENU(),
+                              physicsClientId=PybulletAPI._client(physicsClientId))
         else:
-            return p.loadURDF(fileName=file_name, basePosition=base_position.asENU())
+            return p.loadURDF(fileName=file_name, basePosition=base_position.asENU(),
+                              physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
     def getQuaternionFromEuler(euler_angle: Vec3) -> Quaternion:
@@ -98,47 +146,54 @@ class PybulletAPI:
         return p.getMatrixFromQuaternion(quaternion._data)
 
     @staticmethod
-    def gui() -> bool:
-        return PybulletAPI._INSTANCE.is_gui_enabled()
+    def gui(physicsClientId: Optional[int] = None) -> bool:
+        instance = PybulletAPI._INSTANCES.get(PybulletAPI._client(physicsClientId))
+        return instance is not None and instance.is_gui_enabled()
 
     @staticmethod
-    def setTimeStep(time_step: SimulationTime) -> None:
-        p.setTimeStep(time_step.seconds)
+    def setTimeStep(time_step: SimulationTime, physicsClientId: Optional[int] = None) -> None:
+        p.setTimeStep(time_step.seconds, physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def stepSimulation() -> None:
-        p.stepSimulation()
+    def stepSimulation(physicsClientId: Optional[int] = None) -> None:
+        p.stepSimulation(physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def addUserDebugParameter(name: str, rangeMin: float, rangeMax: float, startValue: float) -> int:
-        if PybulletAPI.gui():
-            return p.addUserDebugParameter(name, rangeMin, rangeMax, startValue)
+    def addUserDebugParameter(name: str, rangeMin: float, rangeMax: float, startValue: float,
+                              physicsClientId: Optional[int] = None) -> int:
+        if PybulletAPI.gui(physicsClientId):
+            return p.addUserDebugParameter(name, rangeMin, rangeMax, startValue,
+                                           physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def readUserDebugParameter(itemUniqueId: int) -> float:
-        if PybulletAPI.gui():
-            return p.readUserDebugParameter(itemUniqueId)
+    def readUserDebugParameter(itemUniqueId: int, physicsClientId: Optional[int] = None) -> float:
+        if PybulletAPI.gui(physicsClientId):
+            return p.readUserDebugParameter(itemUniqueId, physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
     def addUserDebugLine(lineFromXYZ: Vec3, lineToXYZ: Vec3, lineWidth: float, lineColorRGB: List[float],
-                         parentObjectUniqueId: int = -1, replaceItemUniqueId: int = -1) -> int:
+                         parentObjectUniqueId: int = -1, replaceItemUniqueId: int = -1,
+                         physicsClientId: Optional[int] = None) -> int:
 
-        if PybulletAPI.gui():
+        if PybulletAPI.gui(physicsClientId):
             return p.addUserDebugLine(lineFromXYZ=lineFromXYZ.asENU(),
                                       lineToXYZ=lineToXYZ.asENU(),
                                       lineWidth=lineWidth,
                                       lineColorRGB=lineColorRGB,
                                       parentObjectUniqueId=parentObjectUniqueId,
-                                      replaceItemUniqueId=replaceItemUniqueId)
+                                      replaceItemUniqueId=replaceItemUniqueId,
+                                      physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def getKeyboardEvents() -> Dict:
-        return p.getKeyboardEvents()
+    def getKeyboardEvents(physicsClientId: Optional[int] = None) -> Dict:
+        return p.getKeyboardEvents(physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def moveCameraToPosition(position: Vec3, orientation: Optional[Quaternion] = None) -> None:
-        if PybulletAPI.gui():
-            camera_info = p.getDebugVisualizerCamera()
+    def moveCameraToPosition(position: Vec3, orientation: Optional[Quaternion] = None,
+                             physicsClientId: Optional[int] = None) -> None:
+        if PybulletAPI.gui(physicsClientId):
+            physicsClientId = PybulletAPI._client(physicsClientId)
+            camera_info = p.getDebugVisualizerCamera(physicsClientId=physicsClientId)
 
             if orientation:
                 orn = PybulletAPI.getEulerFromQuaternion(orientation)
@@ -152,98 +207,244 @@ class PybulletAPI:
                 cameraDistance=camera_info[10],
                 cameraYaw=yaw,
                 cameraPitch=pitch,
-                cameraTargetPosition=position.asENU()
+                cameraTargetPosition=position.asENU(),
+                physicsClientId=physicsClientId
             )
 
     @staticmethod
-    def getBasePositionAndOrientation(objectUniqueId: int) -> Tuple[Vec3, Quaternion]:
+    def getBasePositionAndOrientation(objectUniqueId: int,
+                                      physicsClientId: Optional[int] = None) -> Tuple[Vec3, Quaternion]:
 
-        position, orientation = p.getBasePositionAndOrientation(objectUniqueId)
+        position, orientation = p.getBasePositionAndOrientation(objectUniqueId,
+                                                                physicsClientId=PybulletAPI._client(physicsClientId))
 
         return Vec3.fromENU(position), Quaternion.fromENU(orientation)
 
     @staticmethod
-    def resetBasePositionAndOrientation(objectUniqueId: int, posObj: Vec3 = None, ornObj: Quaternion = None) -> None:
+    def resetBasePositionAndOrientation(objectUniqueId: int, posObj: Vec3 = None, ornObj: Quaternion = None,
+                                        physicsClientId: Optional[int] = None) -> None:
         if posObj is None:
-            posObj = PybulletAPI.getBasePositionAndOrientation(objectUniqueId=objectUniqueId)[0]
+            posObj = PybulletAPI.getBasePositionAndOrientation(objectUniqueId=objectUniqueId,
+                                                               physicsClientId=physicsClientId)[0]
         if ornObj is None:
-            ornObj = PybulletAPI.getBasePositionAndOrientation(objectUniqueId=objectUniqueId)[1]
+            ornObj = PybulletAPI.getBasePositionAndOrientation(objectUniqueId=objectUniqueId,
+                                                               physicsClientId=physicsClientId)[1]
 
-        p.resetBasePositionAndOrientation(objectUniqueId, posObj.asENU(), ornObj.asENU())
+        p.resetBasePositionAndOrientation(objectUniqueId, posObj.asENU(), ornObj.asENU(),
+                                          physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def getBaseVelocity(objectUniqueId: int) -> Tuple[Vec3, Vec3]:
+    def getBaseVelocity(objectUniqueId: int, physicsClientId: Optional[int] = None) -> Tuple[Vec3, Vec3]:
         """
         Gets the velocity and angular velocity of an object.
         :param objectUniqueId: Id of the object.
+        :param physicsClientId: Physics client the object lives in.
         :return: Tuple with velocity and angular velocity.
         """
-        linearVelocity, angularVelocity = p.getBaseVelocity(objectUniqueId)
+        linearVelocity, angularVelocity = p.getBaseVelocity(objectUniqueId,
+                                                            physicsClientId=PybulletAPI._client(physicsClientId))
         return Vec3.fromENU(linearVelocity), Vec3.fromENU(angularVelocity)
 
     @staticmethod
-    def resetBaseVelocity(objectUniqueId: int, linearVelocity: Vec3, angularVelocity: Vec3) -> None:
-        p.resetBaseVelocity(objectUniqueId, linearVelocity.asENU(), angularVelocity.asENU())
+    def resetBaseVelocity(objectUniqueId: int, linearVelocity: Vec3, angularVelocity: Vec3,
+                          physicsClientId: Optional[int] = None) -> None:
+        p.resetBaseVelocity(objectUniqueId, linearVelocity.asENU(), angularVelocity.asENU(),
+                            physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def applyExternalForce(objectUniqueId: int, forceObj: Vec3, posObj: Vec3, frame: Frame) -> None:
+    def applyExternalForce(objectUniqueId: int, forceObj: Vec3, posObj: Vec3, frame: Frame,
+                           physicsClientId: Optional[int] = None) -> None:
         assert isinstance(forceObj, Vec3) and isinstance(posObj, Vec3)
 
-        p.applyExternalForce(objectUniqueId, -1, forceObj.asENU(), posObj.asENU(), frame.value)
+        p.applyExternalForce(objectUniqueId, -1, forceObj.asENU(), posObj.asENU(), frame.value,
+                             physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def changeVisualShapeColor(objectUniqueId: int, color: List[float]):
-        p.changeVisualShape(objectUniqueId=objectUniqueId, linkIndex=-1, rgbaColor=color)
+    def changeVisualShapeColor(objectUniqueId: int, color: List[float], physicsClientId: Optional[int] = None):
+        p.changeVisualShape(objectUniqueId=objectUniqueId, linkIndex=-1, rgbaColor=color,
+                            physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def createVisualSphere(radius, rgbaColor) -> int:
-        sphereShape = p.createVisualShape(p.GEOM_SPHERE, radius=radius, rgbaColor=rgbaColor)
-        return p.createMultiBody(0, -1, sphereShape, [0, 0, 0])
+    def createVisualSphere(radius, rgbaColor, physicsClientId: Optional[int] = None) -> int:
+        physicsClientId = PybulletAPI._client(physicsClientId)
+        sphereShape = p.createVisualShape(p.GEOM_SPHERE, radius=radius, rgbaColor=rgbaColor,
+                                          physicsClientId=physicsClientId)
+        return p.createMultiBody(0, -1, sphereShape, [0, 0, 0], physicsClientId=physicsClientId)
 
     @staticmethod
-    def createVisualPlane(radius, rgbaColor) -> int:
-        shape = p.createVisualShape(p.GEOM_PLANE, radius=radius, rgbaColor=rgbaColor)
-        return p.createMultiBody(0, -1, shape, [0, 0, 0])
+    def createVisualPlane(radius, rgbaColor, physicsClientId: Optional[int] = None) -> int:
+        physicsClientId = PybulletAPI._client(physicsClientId)
+        shape = p.createVisualShape(p.GEOM_PLANE, radius=radius, rgbaColor=rgbaColor, physicsClientId=physicsClientId)
+        return p.createMultiBody(0, -1, shape, [0, 0, 0], physicsClientId=physicsClientId)
 
     @staticmethod
-    def createVisualCylinder(radius: float, height: float, color: List[float], orientation: Quaternion):
-        shape = p.createVisualShape(p.GEOM_CYLINDER, radius=radius, length=height, rgbaColor=color)
-        return p.createMultiBody(0, -1, shape, basePosition=[0, 0, 0], baseOrientation=orientation.asENU())
+    def createVisualCylinder(radius: float, height: float, color: List[float], orientation: Quaternion,
+                             physicsClientId: Optional[int] = None):
+        physicsClientId = PybulletAPI._client(physicsClientId)
+        shape = p.createVisualShape(p.GEOM_CYLINDER, radius=radius, length=height, rgbaColor=color,
+                                    physicsClientId=physicsClientId)
+        return p.createMultiBody(0, -1, shape, basePosition=[0, 0, 0], baseOrientation=orientation.asENU(),
+                                 physicsClientId=physicsClientId)
 
     @staticmethod
-    def loadTexture(file_name: str) -> int:
-        return p.loadTexture(file_name)
+    def createHeightfield(heightfieldData: List[float], numHeightfieldRows: int, numHeightfieldColumns: int,
+                          meshScale: List[float], heightfieldTextureScaling: float, basePosition: Vec3,
+                          baseOrientation: Quaternion, physicsClientId: Optional[int] = None) -> int:
+        """
+        Creates a static heightfield body.
+        :return: Id of the created body.
+        """
+        physicsClientId = PybulletAPI._client(physicsClientId)
+        shape = p.createCollisionShape(shapeType=p.GEOM_HEIGHTFIELD,
+                                       meshScale=meshScale,
+                                       heightfieldTextureScaling=heightfieldTextureScaling,
+                                       heightfieldData=heightfieldData,
+                                       numHeightfieldRows=numHeightfieldRows,
+                                       numHeightfieldColumns=numHeightfieldColumns,
+                                       physicsClientId=physicsClientId)
+
+        return p.createMultiBody(0, shape, basePosition=basePosition.asENU(),
+                                 baseOrientation=baseOrientation.asENU(), physicsClientId=physicsClientId)
+
+    @staticmethod
+    def loadTexture(file_name: str, physicsClientId: Optional[int] = None) -> int:
+        return p.loadTexture(file_name, physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def changeVisualShape(object_id: int, textureUniqueId: int, rgbaColor: List[float]):
+    def changeVisualShape(object_id: int, textureUniqueId: int, rgbaColor: List[float],
+                          physicsClientId: Optional[int] = None):
         """
         Changes the texture and color of an object.
         :param object_id: Object that you want to change.
         :param textureUniqueId: Id of the texture you want to give the object.
         :param rgbaColor: List of 4 floats in the range [0, 1] that apply extra colour over the texture.
+        :param physicsClientId: Physics client the object lives in.
         """
-        p.changeVisualShape(object_id, -1, textureUniqueId=textureUniqueId, rgbaColor=rgbaColor)
+        p.changeVisualShape(object_id, -1, textureUniqueId=textureUniqueId, rgbaColor=rgbaColor,
+                            physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def rayTest(rayFromPosition: Vec3, rayToPosition: Vec3, object_id=-1) -> Tuple[float, Vec3, Vec3]:
+    def rayTest(rayFromPosition: Vec3, rayToPosition: Vec3, object_id=-1,
+                physicsClientId: Optional[int] = None) -> Tuple[float, Vec3, Vec3]:
         if object_id != -1:
-            rayFromPosition = translation.vec3_local_to_world_id(object_id, rayFromPosition)
-            rayToPosition = translation.vec3_local_to_world_id(object_id, rayToPosition)
+            rayFromPosition = translation.vec3_local_to_world_id(object_id, rayFromPosition, physicsClientId)
+            rayToPosition = translation.vec3_local_to_world_id(object_id, rayToPosition, physicsClientId)
 
-        _, _, hit_fraction, hit_position, hit_normal = p.rayTest(rayFromPosition.asENU(), rayToPosition.asENU())[0]
+        _, _, hit_fraction, hit_position, hit_normal = p.rayTest(rayFromPosition.asENU(), rayToPosition.asENU(),
+                                                                 physicsClientId=PybulletAPI._client(physicsClientId))[0]
 
         return hit_fraction, Vec3.fromENU(hit_position), Vec3.fromENU(hit_normal)
 
     @staticmethod
-    def removeBody(objectUniqueId: int):
-        p.removeBody(objectUniqueId)
+    def rayTestBatch(rayFromPositions: np.ndarray, rayToPositions: np.ndarray, numThreads: int = 0,
+                     physicsClientId: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Casts many rays at once, Bullet can spread them over multiple threads. Batches that are bigger than Bullet
+        supports are split up.
+        :param rayFromPositions: (N, 3) array with the start positions of the rays in the world frame.
+        :param rayToPositions: (N, 3) array with the end positions of the rays in the world frame.
+        :param numThreads: Amount of threads Bullet uses, 0 uses all available threads.
+        :param physicsClientId: Physics client to cast the rays in.
+        :return: Arrays with the object ids that were hit (-1 if none), the hit fractions, the hit positions and the hit
+            normals.
+        """
+        ray_from_positions = np.asarray(rayFromPositions, dtype=float).reshape(-1, 3).dot(_ENU_TO_NED)
+        ray_to_positions = np.asarray(rayToPositions, dtype=float).reshape(-1, 3).dot(_ENU_TO_NED)
+
+        results = []
+        for start in range(0, len(ray_from_positions), _MAX_RAY_BATCH_SIZE):
+            end = start + _MAX_RAY_BATCH_SIZE
+            results.extend(p.rayTestBatch(ray_from_positions[start:end].tolist(),
+                                          ray_to_positions[start:end].tolist(),
+                                          numThreads=numThreads,
+                                          physicsClientId=PybulletAPI._client(physicsClientId)))
+
+        object_ids = np.array([result[0] for result in results], dtype=int)
+        hit_fractions = np.array([result[2] for result in results], dtype=float)
+        hit_positions = np.array([result[3] for result in results], dtype=float).reshape(-1, 3).dot(_ENU_TO_NED.T)
+        hit_normals = np.array([result[4] for result in results], dtype=float).reshape(-1, 3).dot(_ENU_TO_NED.T)
+
+        return object_ids, hit_fractions, hit_positions, hit_normals
+
+    @staticmethod
+    def computeProjectionMatrixFOV(fov: float, aspect: float, nearVal: float, farVal: float) -> List[float]:
+        """
+        :param fov: Vertical field of view in degrees.
+        :param aspect: Width of the image divided by its height.
+        :param nearVal: Distance of the near clipping plane.
+        :param farVal: Distance of the far clipping plane.
+        :return: The OpenGL projection matrix as 16 floats in column major order.
+        """
+        return p.computeProjectionMatrixFOV(fov, aspect, nearVal, farVal)
 
     @staticmethod
-    def removeUserDebugItem(itemUniqueId: int):
-        p.removeUserDebugItem(itemUniqueId=itemUniqueId)
+    def computeViewMatrixFromPose(position: np.ndarray, rotation: np.ndarray) -> List[float]:
+        """
+        Computes the view matrix of a camera without going through eye, target and up vectors.
+        :param position: Position of the camera in the world frame.
+        :param rotation: (3, 3) rotation matrix from the camera frame to the world frame, the camera looks along its x
+            axis and its z axis points down in the image.
+        :return: The OpenGL view matrix as 16 floats in column major order.
+        """
+        # OpenGL cameras look along their negative z axis with their y axis up in the image.
+        camera_to_world = _ENU_TO_NED.T.dot(np.asarray(rotation, dtype=float)).dot(_CAMERA_TO_OPENGL.T)
+        camera_position = _ENU_TO_NED.T.dot(np.asarray(position, dtype=float))
+
+        view_matrix = np.eye(4)
+        view_matrix[:3, :3] = camera_to_world.T
+        view_matrix[:3, 3] = -camera_to_world.T.dot(camera_position)
+        return view_matrix.flatten(order='F').tolist()
 
     @staticmethod
-    def applyExternalTorque(objectUniqueId: int, torqueObj: Vec3, frame: Frame):
+    def getCameraImage(width: int, height: int, viewMatrix: List[float], projectionMatrix: List[float],
+                       physicsClientId: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Renders an image with the software renderer, which also works without a GUI.
+        :param width: Width of the image in pixels.
+        :param height: Height of the image in pixels.
+        :param viewMatrix: View matrix, see computeViewMatrixFromPose.
+        :param projectionMatrix: Projection matrix, see computeProjectionMatrixFOV.
+        :param physicsClientId: Physics client to render.
+        :return: The (height, width, 4) RGBA image and the (height, width) depth buffer (between 0 and 1).
+        """
+        _, _, rgba, depth, _ = p.getCameraImage(width, height, viewMatrix=viewMatrix,
+                                                projectionMatrix=projectionMatrix, renderer=p.ER_TINY_RENDERER,
+                                                flags=p.ER_NO_SEGMENTATION_MASK,
+                                                physicsClientId=PybulletAPI._client(physicsClientId))
+
+        return np.asarray(rgba, dtype=np.uint8).reshape(height, width, 4), \
+            np.asarray(depth, dtype=np.float32).reshape(height, width)
+
+    @staticmethod
+    def linkToBodyFrame(objectUniqueId: int, points: np.ndarray, physicsClientId: Optional[int] = None) -> np.ndarray:
+        """
+        Converts points given in the frame of the base link as it is described in the URDF (for example the vertices of
+        its mesh) to the local frame of the body. Bullet places the frame of a body at the inertial frame of its base
+        link, so the inertial origin of the URDF is taken into account here.
+        :param objectUniqueId: Id of the body.
+        :param points: (N, 3) array with points in the URDF frame of the base link.
+        :param physicsClientId: Physics client the body lives in.
+        :return: (N, 3) array with the points in the local frame of the body.
+        """
+        dynamics_info = p.getDynamicsInfo(objectUniqueId, -1, physicsClientId=PybulletAPI._client(physicsClientId))
+        inertial_position = np.array(dynamics_info[3])
+        inertial_rotation = np.array(p.getMatrixFromQuaternion(dynamics_info[4])).reshape(3, 3)
+
+        return (np.asarray(points, dtype=float) - inertial_position).dot(inertial_rotation).dot(_ENU_TO_NED.T)
+
+    @staticmethod
+    def removeBody(objectUniqueId: int, physicsClientId: Optional[int] = None):
+        p.removeBody(objectUniqueId, physicsClientId=PybulletAPI._client(physicsClientId))
+
+    @staticmethod
+    def removeUserDebugItem(itemUniqueId: Optional[int], physicsClientId: Optional[int] = None):
+        # Without the gui no debug items are created, so there is nothing to remove.
+        if itemUniqueId is None:
+            return
+        p.removeUserDebugItem(itemUniqueId=itemUniqueId, physicsClientId=PybulletAPI._client(physicsClientId))
+
+    @staticmethod
+    def applyExternalTorque(objectUniqueId: int, torqueObj: Vec3, frame: Frame, physicsClientId: Optional[int] = None):
         assert isinstance(torqueObj, Vec3)
 
         # There is a bug in Pybullet that the Link Frame and World frame are swapped when applying a torque to the
@@ -253,8 +454,14 @@ class PybulletAPI:
         else:
             frame = Frame.WORLD_FRAME
 
-        p.applyExternalTorque(objectUniqueId, -1, torqueObj.asENU(), flags=frame.value)
+        p.applyExternalTorque(objectUniqueId, -1, torqueObj.asENU(), flags=frame.value,
+                              physicsClientId=PybulletAPI._client(physicsClientId))
 
     @staticmethod
-    def disconnect():
-        p.disconnect()
+    def disconnect(physicsClientId: Optional[int] = None):
+        physicsClientId = PybulletAPI._client(physicsClientId)
+        p.disconnect(physicsClientId=physicsClientId)
+
+        PybulletAPI._INSTANCES.pop(physicsClientId, None)
+        if PybulletAPI._INSTANCE is not None and PybulletAPI._INSTANCE.physics_client_id == physicsClientId:
+            PybulletAPI._INSTANCE = None
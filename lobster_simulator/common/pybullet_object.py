@@ -1,20 +1,29 @@
 from abc import ABC
+from typing import Optional
 
 from lobster_simulator.common.pybullet_api import PybulletAPI
 
 
 class PyBulletObject(ABC):
 
-    def __init__(self, object_id):
+    def __init__(self, object_id, physics_client_id: Optional[int] = None):
         self._object_id = object_id
+        self._physics_client_id = PybulletAPI._client(physics_client_id)
 
     def remove(self) -> None:
         """
         Removes current object from GUI
         """
-        PybulletAPI.removeUserDebugItem(self._object_id)
+        PybulletAPI.removeUserDebugItem(self._object_id, physicsClientId=self._physics_client_id)
         self._object_id = None
 
+    @property
+    def physics_client_id(self) -> int:
+        """
+        Id of the physics client (world) the object lives in.
+        """
+        return self._physics_client_id
+
     @property
     def object_id(self):
         if self._object_id is None:
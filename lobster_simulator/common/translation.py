@@ -5,6 +5,8 @@ from __future__ import annotations
 # Functions that handle some of the conversions between local and world frame based vectors
 #
 
+from typing import Optional
+
 from lobster_common.quaternion import Quaternion
 from lobster_common.vec3 import Vec3
 
@@ -42,13 +44,13 @@ def vec3_rotate_vector_to_local(local_frame_orientation: Quaternion, world_vec:
     return world_vec.rotate_inverse(local_frame_orientation)
 
 
-def vec3_local_to_world_id(local_frame_id: int, local_vec: Vec3) -> Vec3:
+def vec3_local_to_world_id(local_frame_id: int, local_vec: Vec3, physics_client_id: Optional[int] = None) -> Vec3:
     from lobster_simulator.common.pybullet_api import PybulletAPI
-    pos, orn = PybulletAPI.getBasePositionAndOrientation(local_frame_id)
+    pos, orn = PybulletAPI.getBasePositionAndOrientation(local_frame_id, physicsClientId=physics_client_id)
     return vec3_local_to_world(pos, orn, local_vec)
 
 
-def vec3_world_to_local_id(local_frame_id: int, world_vec: Vec3) -> Vec3:
+def vec3_world_to_local_id(local_frame_id: int, world_vec: Vec3, physics_client_id: Optional[int] = None) -> Vec3:
     from lobster_simulator.common.pybullet_api import PybulletAPI
-    pos, orn = PybulletAPI.getBasePositionAndOrientation(local_frame_id)
+    pos, orn = PybulletAPI.getBasePositionAndOrientation(local_frame_id, physicsClientId=physics_client_id)
     return vec3_world_to_local(pos, orn, world_vec)
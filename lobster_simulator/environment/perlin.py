@@ -0,0 +1,120 @@
+import numpy as np
+
+# Ken Perlin's permutation table, repeated so lookups of summed indices don't have to wrap. It is the same table the
+#  noise package uses, so the noise below gives the same terrain as noise.pnoise2.
+_PERMUTATION = np.array([
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225, 140, 36, 103, 30, 69, 142, 8, 99, 37, 240,
+    21, 10, 23, 190, 6, 148, 247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32, 57, 177, 33, 88,
+    237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175, 74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83,
+    111, 229, 122, 60, 211, 133, 230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54, 65, 25, 63, 161, 1, 216,
+    80, 73, 209, 76, 132, 187, 208, 89, 18, 169, 200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173, 186,
+    3, 64, 52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212, 207, 206, 59, 227, 47, 16, 58, 17,
+    182, 189, 28, 42, 223, 183, 170, 213, 119, 248, 152, 2, 44, 154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9, 129,
+    22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104, 218, 246, 97, 228, 251, 34, 242, 193, 238,
+    210, 144, 12, 191, 179, 162, 241, 81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157, 184,
+    84, 204, 176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93, 222, 114, 67, 29, 24, 72, 243, 141, 128, 195,
+    78, 66, 215, 61, 156, 180
+] * 2, dtype=np.int32)
+
+# The x and y components of the gradients, indexed by the lowest 4 bits of a hash.
+_GRADIENTS_X = np.array([1, -1, 1, -1, 1, -1, 1, -1, 0, 0, 0, 0, 1, -1, 0, 0], dtype=np.float32)
+_GRADIENTS_Y = np.array([1, 1, -1, -1, 0, 0, 0, 0, 1, -1, 1, -1, 0, 0, -1, 1], dtype=np.float32)
+
+# The gradient components of the permuted indices, so the gradient of a corner is a single lookup.
+_PERMUTED_GRADIENTS_X = _GRADIENTS_X[_PERMUTATION & 15]
+_PERMUTED_GRADIENTS_Y = _GRADIENTS_Y[_PERMUTATION & 15]
+
+
+def pnoise2(x: np.ndarray, y: np.ndarray, octaves: int = 1, persistence: float = 0.5, lacunarity: float = 2.0,
+            repeatx: float = 1024, repeaty: float = 1024, base: int = 0) -> np.ndarray:
+    """
+    Perlin noise (fractal Brownian motion when there are multiple octaves) of arrays of coordinates. This gives the same
+    values as noise.pnoise2 (up to float rounding), but computes all the coordinates at once. The calculations are done
+    in single precision like noise.pnoise2 does.
+    :param x: Array with the x coordinates.
+    :param y: Array with the y coordinates, with the same shape as x.
+    :param octaves: Amount of layers of noise that are added.
+    :param persistence: Amplitude of every octave relative to the previous one.
+    :param lacunarity: Frequency of every octave relative to the previous one.
+    :param repeatx: Period of the noise in the x direction (of the first octave).
+    :param repeaty: Period of the noise in the y direction (of the first octave).
+    :param base: Offset of the permutation table, different bases give different noise. Only the bases 0 and 1 match
+        noise.pnoise2 everywhere, because it reads outside of its table for bigger bases.
+    :return: Array with the noise, between -1 and 1.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    shape = np.broadcast(x, y).shape
+
+    # The frequencies and amplitudes are accumulated in single precision, like noise.pnoise2 does.
+    frequencies = np.empty(octaves, dtype=np.float32)
+    amplitudes = np.empty(octaves, dtype=np.float32)
+    frequency = np.float32(1)
+    amplitude = np.float32(1)
+    for octave in range(octaves):
+        frequencies[octave] = frequency
+        amplitudes[octave] = amplitude
+        frequency *= np.float32(lacunarity)
+        amplitude *= np.float32(persistence)
+
+    # All the octaves are computed at once, as the rows of an (octaves, N) array.
+    frequencies = frequencies[:, None]
+    octave_noise = _noise2(np.broadcast_to(x, shape).reshape(1, -1) * frequencies,
+                           np.broadcast_to(y, shape).reshape(1, -1) * frequencies,
+                           np.float32(repeatx) * frequencies, np.float32(repeaty) * frequencies, base)
+
+    total = np.zeros(octave_noise.shape[1], dtype=np.float32)
+    maximum = np.float32(0)
+    for octave in range(octaves):
+        total += octave_noise[octave] * amplitudes[octave]
+        maximum += amplitudes[octave]
+
+    return (total / maximum).reshape(shape)
+
+
+def _noise2(x: np.ndarray, y: np.ndarray, repeatx: np.ndarray, repeaty: np.ndarray, base: int) -> np.ndarray:
+    """
+    A single octave of Perlin noise.
+    """
+    i = np.floor(np.fmod(x, repeatx)).astype(np.int32)
+    j = np.floor(np.fmod(y, repeaty)).astype(np.int32)
+    ii = np.fmod((i + 1).astype(np.float32), repeatx).astype(np.int32)
+    jj = np.fmod((j + 1).astype(np.float32), repeaty).astype(np.int32)
+    i = (i & 255) + base
+    j = (j & 255) + base
+    ii = (ii & 255) + base
+    jj = (jj & 255) + base
+
+    # Position within the cell and its fade curve.
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    fx = x * x * x * (x * (x * np.float32(6) - np.float32(15)) + np.float32(10))
+    fy = y * y * y * (y * (y * np.float32(6) - np.float32(15)) + np.float32(10))
+
+    a = _permute(i)
+    b = _permute(ii)
+    aa = _permute(a + j)
+    ab = _permute(a + jj)
+    ba = _permute(b + j)
+    bb = _permute(b + jj)
+
+    one = np.float32(1)
+    return _lerp(fy, _lerp(fx, _gradient(aa, x, y), _gradient(ba, x - one, y)),
+                 _lerp(fx, _gradient(ab, x, y - one), _gradient(bb, x - one, y - one)))
+
+
+def _permute(index: np.ndarray) -> np.ndarray:
+    # Indices only go past the table for bases above 1, where noise.pnoise2 reads outside of its table.
+    return _PERMUTATION.take(index & 511)
+
+
+def _gradient(index: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Dot product of the offset to a corner and the gradient of the corner, the gradient is picked by the permuted index.
+    """
+    index = index & 511
+    return x * _PERMUTED_GRADIENTS_X.take(index) + y * _PERMUTED_GRADIENTS_Y.take(index)
+
+
+def _lerp(t: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a + t * (b - a)
@@ -0,0 +1,179 @@
+import os
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Header of a grid file: magic, data type of the cells (numpy type string), amount of rows and columns, size of a cell,
+#  north and east coordinates of the first cell and the value of cells without data (NaN when there is none). The cells
+#  follow the header row after row.
+GRID_MAGIC = b'LOBGRID1'
+_GRID_HEADER = struct.Struct('<8s8sqqdddd')
+
+# Queries spanning more cells than this read their cells one by one instead of reading the window around them.
+_MAX_WINDOW_CELLS = 1 << 22
+
+
+class BathymetryRaster:
+    """
+    Height function that resamples a gridded survey of the seabed, so a Terrain can be generated from real bathymetry
+    (see Terrain.bathymetry_terrain).
+
+    The grid is memory mapped, so it can be much bigger than the memory. Every call only reads the window of cells
+    around the requested coordinates (for a chunk that is a small block of the grid) and interpolates it bilinearly, so
+    the grid can have a different resolution than the chunks.
+
+    The grid is laid out in the NED world frame: the rows go north and the columns go east, so the cell in row r and
+    column c is at north = origin[0] + r * cell_size and east = origin[1] + c * cell_size. Coordinates outside of the
+    grid get the height of the nearest edge. Cells without data are left out of the interpolation, points with only
+    such cells around them get the fill value.
+    """
+
+    def __init__(self, grid: np.ndarray, cell_size: float, origin: Tuple[float, float] = (0, 0),
+                 positive_down: bool = False, nodata: Optional[float] = None, fill_value: float = 0,
+                 path: Optional[str] = None):
+        """
+        BathymetryRaster
+        :param grid: Two dimensional array (usually a memory map) with a value for every cell, rows along north (x) and
+            columns along east (y).
+        :param cell_size: Distance between two cells in meters.
+        :param origin: North and east coordinates of the first cell.
+        :param positive_down: Whether the values are depths (positive downwards) instead of heights.
+        :param nodata: Value of the cells without data.
+        :param fill_value: Height of points that only have cells without data around them.
+        :param path: File the grid was read from, it identifies the terrain in the tile store.
+        """
+        if grid.ndim != 2 or min(grid.shape) < 2:
+            raise ValueError("The grid should be two dimensional with at least two rows and columns")
+        if cell_size <= 0:
+            raise ValueError("The cell size should be positive")
+
+        self.grid = grid
+        self.cell_size = float(cell_size)
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.positive_down = positive_down
+        self.nodata = None if nodata is None or np.isnan(nodata) else float(nodata)
+        self.fill_value = float(fill_value)
+        self.path = path
+
+    @staticmethod
+    def open(path: str, cell_size: Optional[float] = None, origin: Optional[Tuple[float, float]] = None,
+             **kwargs) -> 'BathymetryRaster':
+        """
+        Memory maps a grid, either a .npy file or a grid file with a header (see write_grid).
+        :param path: Path to the file.
+        :param cell_size: Distance between two cells, required for .npy files, it overrides the header of a grid file.
+        :param origin: North and east coordinates of the first cell, it overrides the header of a grid file.
+        :param kwargs: Other parameters of the raster, see the constructor.
+        """
+        if path.endswith('.npy'):
+            if cell_size is None:
+                raise ValueError("The cell size of a .npy grid has to be given")
+
+            grid = np.load(path, mmap_mode='r', allow_pickle=False)
+            return BathymetryRaster(grid, cell_size, origin if origin is not None else (0, 0), path=path, **kwargs)
+
+        with open(path, 'rb') as f:
+            header = f.read(_GRID_HEADER.size)
+        if len(header) != _GRID_HEADER.size or not header.startswith(GRID_MAGIC):
+            raise ValueError(f"{path} is not a grid file")
+
+        _, dtype, rows, columns, header_cell_size, origin_north, origin_east, nodata = _GRID_HEADER.unpack(header)
+        grid = np.memmap(path, dtype=np.dtype(dtype.rstrip(b'\0').decode()), mode='r', offset=_GRID_HEADER.size,
+                         shape=(rows, columns))
+
+        kwargs.setdefault('nodata', nodata)
+        return BathymetryRaster(grid, cell_size if cell_size is not None else header_cell_size,
+                                origin if origin is not None else (origin_north, origin_east), path=path, **kwargs)
+
+    @staticmethod
+    def write_grid(path: str, grid: np.ndarray, cell_size: float, origin: Tuple[float, float] = (0, 0),
+                   nodata: Optional[float] = None) -> None:
+        """
+        Writes a grid file that can be opened with open, the cells are written in the data type of the grid.
+        """
+        grid = np.asarray(grid)
+        if grid.ndim != 2:
+            raise ValueError("The grid should be two dimensional")
+
+        header = _GRID_HEADER.pack(GRID_MAGIC, grid.dtype.str.encode(), grid.shape[0], grid.shape[1], cell_size,
+                                   origin[0], origin[1], np.nan if nodata is None else nodata)
+        with open(path, 'wb') as f:
+            f.write(header)
+            for row in grid:
+                f.write(np.ascontiguousarray(row).tobytes())
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """
+        The smallest and largest north and east coordinates of the cells.
+        """
+        rows, columns = self.grid.shape
+        return (self.origin[0], self.origin[0] + (rows - 1) * self.cell_size,
+                self.origin[1], self.origin[1] + (columns - 1) * self.cell_size)
+
+    @property
+    def key(self) -> tuple:
+        """
+        Everything that determines the heights, to use as the tile key of a terrain. The file is identified by its
+        size and modification time, since hashing a large survey would take longer than generating its tiles.
+        """
+        if self.path is None:
+            raise ValueError("Only a raster that was read from a file has a key")
+
+        stat = os.stat(self.path)
+        return ('bathymetry', os.path.abspath(self.path), stat.st_size, stat.st_mtime_ns, self.grid.shape,
+                self.cell_size, self.origin, self.positive_down, self.nodata, self.fill_value)
+
+    def __call__(self, north: np.ndarray, east: np.ndarray) -> np.ndarray:
+        """
+        Gives the heights of arrays of north and east coordinates.
+        """
+        north, east = np.broadcast_arrays(np.asarray(north, dtype=float), np.asarray(east, dtype=float))
+        rows, columns = self.grid.shape
+
+        # Position in the grid, the cell (row, column) with the fraction of the way to the next row and column.
+        row = np.clip((north - self.origin[0]) / self.cell_size, 0, rows - 1)
+        column = np.clip((east - self.origin[1]) / self.cell_size, 0, columns - 1)
+        column_0 = np.minimum(column.astype(np.int64), columns - 2)
+        row_0 = np.minimum(row.astype(np.int64), rows - 2)
+        column_fraction = column - column_0
+        row_fraction = row - row_0
+
+        if north.size == 0:
+            return np.zeros(north.shape)
+
+        # Only the window of the grid around the coordinates is read from the file.
+        column_start, column_end = column_0.min(), column_0.max() + 2
+        row_start, row_end = row_0.min(), row_0.max() + 2
+        if (column_end - column_start) * (row_end - row_start) <= _MAX_WINDOW_CELLS:
+            window = np.asarray(self.grid[row_start:row_end, column_start:column_end], dtype=float)
+
+            def cells(row_offset: int, column_offset: int) -> np.ndarray:
+                return window[row_0 - row_start + row_offset, column_0 - column_start + column_offset]
+        else:
+            def cells(row_offset: int, column_offset: int) -> np.ndarray:
+                return np.asarray(self.grid[row_0 + row_offset, column_0 + column_offset], dtype=float)
+
+        total = np.zeros(north.shape)
+        total_weight = np.zeros(north.shape)
+        for row_offset, row_weight in ((0, 1 - row_fraction), (1, row_fraction)):
+            for column_offset, column_weight in ((0, 1 - column_fraction), (1, column_fraction)):
+                values = cells(row_offset, column_offset)
+                weight = row_weight * column_weight
+                valid = ~np.isnan(values)
+                if self.nodata is not None:
+                    valid &= values != self.nodata
+
+                total += np.where(valid, values * weight, 0)
+                total_weight += np.where(valid, weight, 0)
+
+        # Cells without data are left out by dividing by the weight of the cells that do have data. A tiny weight means
+        #  the point is (almost) on top of cells without data.
+        heights = np.full(north.shape, self.fill_value)
+        has_data = total_weight > 1e-9
+        heights[has_data] = total[has_data] / total_weight[has_data]
+        if self.positive_down:
+            heights[has_data] *= -1
+
+        return heights
@@ -1,113 +1,334 @@
-import math
-from typing import Callable
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Optional, Dict, Tuple, Set, Sequence, Union
 
-import noise
-import pybullet as p
+import numpy as np
 
 from lobster_common.vec3 import Vec3
 from lobster_common.constants import *
 from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.environment import perlin
+from lobster_simulator.environment.raster import BathymetryRaster
+from lobster_simulator.environment.tile_store import TileStore
+
+# Takes arrays with the x and y coordinates and gives an array with the height at every coordinate.
+HeightFunction = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# Time in seconds an update may spend on adding generated chunks to the physics world.
+DEFAULT_LOAD_BUDGET = 0.002
+
+# The chunks around the position the robot will be at after this many seconds are generated ahead of time.
+DEFAULT_PREFETCH_TIME = 5
+
+# Part of the key of the stored tiles, it has to be increased whenever the way the tiles are laid out changes.
+_TILE_LAYOUT_VERSION = 1
 
 
 class Terrain:
-    chunks = dict()
 
-    def __init__(self, height_function: Callable[[float, float], float], depth=100):
-        self.current_chunk = (0, 0)
+    def __init__(self, height_function: HeightFunction, depth=100, physics_client_id: Optional[int] = None,
+                 vectorized: bool = True, workers: int = 2, load_budget: float = DEFAULT_LOAD_BUDGET,
+                 prefetch_time: float = DEFAULT_PREFETCH_TIME, tile_key: Optional[tuple] = None,
+                 render_distance: int = 3, lod_distances: Sequence[int] = ()):
+        """
+        Terrain
+        :param height_function: Gives the heights of arrays of x (north) and y (east) coordinates in the world, it is
+            called once for all the points of a chunk. The heights point up, so a point lies at depth - height.
+        :param depth: Depth of the terrain.
+        :param physics_client_id: Physics client the terrain is loaded in.
+        :param vectorized: When False the height function takes a single coordinate and is called for every point,
+            which is a lot slower.
+        :param workers: Amount of threads that generate height fields, the height function is called from them.
+        :param load_budget: Time in seconds an update may spend on adding generated chunks to the physics world.
+        :param prefetch_time: How many seconds of movement ahead of the robot the chunks are generated.
+        :param tile_key: Everything that determines the height function (the generator, its parameters and seed). When
+            it is given, the generated height fields are stored in the disk cache and reused by later runs, see
+            TileStore. Nothing is stored by default.
+        :param render_distance: Amount of chunks along each side of the square of chunks around the robot that is
+            loaded.
+        :param lod_distances: Distances (in chunks from the chunk of the robot) up to which each level of detail is
+            used, beyond the last distance the next level is used. Every level halves the resolution of the chunks, for
+            example (1, 2) gives full resolution under the robot and next to it, half resolution at a distance of 2
+            chunks and a quarter further away. Empty gives full resolution everywhere.
+        """
+        if not vectorized:
+            height_function = np.vectorize(height_function, otypes=[float])
 
-        # TODO: Changing the chunk size should not impact the shape of the generated world, however for some reason
-        #  it does. If you think you can fix it, go ahead.
+        # The ids of the bodies of the loaded chunks and their level of detail.
+        self.chunks: Dict[Tuple[int, int], int] = dict()
+        self.chunk_levels: Dict[Tuple[int, int], int] = dict()
+        self.current_chunk: Optional[Tuple[int, int]] = None
+        self._predicted_chunk: Optional[Tuple[int, int]] = None
+        # Whether all the chunks around the current chunk are loaded.
+        self._complete = False
+        self._physics_client_id = PybulletAPI._client(physics_client_id)
+
+        # The chunk (i, j) covers the square from (i, j) * chunk_size to (i + 1, j + 1) * chunk_size in the x (north) and
+        #  y (east) direction of the world.
         self.chunk_size = 2**7 - 1
 
         self.points_per_chunk = 2 ** 5
         self.point_spacing = self.chunk_size / (self.points_per_chunk - 1)
-        self.render_distance = 3
+        self.render_distance = render_distance
+        self.lod_distances = sorted(lod_distances)
 
         self.depth = depth
         self.height_function = height_function
 
+        self.load_budget = load_budget
+        self.prefetch_time = prefetch_time
+
+        # Height fields of chunks (by their coordinates and level of detail) that are wanted but not loaded yet, they are
+        #  generated in the background.
+        self._height_fields: Dict[Tuple[int, int, int], Future] = dict()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='Terrain')
+
+        self._tile_key = tile_key
+        # The tile stores by their level of detail, they are opened when they are first needed.
+        self._tile_stores: Dict[int, Optional[TileStore]] = dict()
+        self._tile_stores_lock = threading.Lock()
+
     @staticmethod
-    def sine_wave_terrain(depth=100):
+    def sine_wave_terrain(depth=100, physics_client_id: Optional[int] = None, cache_tiles: bool = False, **kwargs):
+        """
+        :param cache_tiles: Whether the generated height fields are stored in the disk cache and reused by later runs.
+        """
         def get_height(x, y):
-            return math.sin(x / 20) * 30 + math.sin(y / 30) * 10
-        return Terrain(get_height, depth=depth)
+            return np.sin(x / 20) * 30 + np.sin(y / 30) * 10
+
+        if cache_tiles:
+            kwargs.setdefault('tile_key', ('sine_wave', 20, 30, 30, 10))
+        return Terrain(get_height, depth=depth, physics_client_id=physics_client_id, **kwargs)
 
     @staticmethod
-    def perlin_noise_terrain(depth=100):
+    def perlin_noise_terrain(depth=100, physics_client_id: Optional[int] = None, cache_tiles: bool = False, **kwargs):
+        """
+        :param cache_tiles: Whether the generated height fields are stored in the disk cache and reused by later runs.
+        """
+        scale = 80
+        octaves = 6
+        persistence = 0.5
+        lacunarity = 2.0
+        seed = 1
+
         def get_height_perlin(x, y):
-            scale = 80
-            octaves = 6
-            persistence = 0.5
-            lacunarity = 2.0
-            seed = 1
-
-            height = noise.pnoise2(x / scale, y / scale,
-                                   octaves=octaves,
-                                   persistence=persistence,
-                                   lacunarity=lacunarity,
-                                   repeatx=1024,
-                                   repeaty=1024,
-                                   base=seed)
+            height = perlin.pnoise2(x / scale, y / scale,
+                                    octaves=octaves,
+                                    persistence=persistence,
+                                    lacunarity=lacunarity,
+                                    repeatx=1024,
+                                    repeaty=1024,
+                                    base=seed)
             height *= 200
 
             return height
 
-        return Terrain(get_height_perlin, depth=depth)
+        if cache_tiles:
+            kwargs.setdefault('tile_key', ('perlin_noise', scale, octaves, persistence, lacunarity, 1024, seed, 200))
+        return Terrain(get_height_perlin, depth=depth, physics_client_id=physics_client_id, **kwargs)
+
+    @staticmethod
+    def bathymetry_terrain(raster: Union[BathymetryRaster, str], depth=0, physics_client_id: Optional[int] = None,
+                           cache_tiles: bool = False, **kwargs):
+        """
+        Terrain of a gridded survey of the seabed, the chunks are resampled from the grid when they are loaded so the
+        grid is never read as a whole.
+        :param raster: The raster or the path of a grid file that is opened with BathymetryRaster.open.
+        :param depth: Depth of the zero height of the raster.
+        :param cache_tiles: Whether the resampled height fields are stored in the disk cache and reused by later runs,
+            only for a raster that was read from a file.
+        """
+        if isinstance(raster, str):
+            raster = BathymetryRaster.open(raster)
+
+        def get_height_bathymetry(x, y):
+            # The terrain samples x (north) and y (east) of the world, the rows and columns of the raster.
+            return raster(north=x, east=y)
+
+        if cache_tiles and raster.path is not None:
+            kwargs.setdefault('tile_key', raster.key)
+        return Terrain(get_height_bathymetry, depth=depth, physics_client_id=physics_client_id, **kwargs)
+
+    def points_at_level(self, level: int) -> int:
+        """
+        Amount of points along each side of a chunk at a level of detail, every level halves the resolution.
+        """
+        return max(2, self.points_per_chunk >> level)
+
+    def level_at_distance(self, distance: int) -> int:
+        """
+        Level of detail of a chunk at a distance (in chunks) from the chunk of the robot.
+        """
+        return sum(1 for lod_distance in self.lod_distances if lod_distance < distance)
 
-    def get_height_field(self, chunk_x, chunk_y):
-        height_field_data = [0.0] * self.points_per_chunk * self.points_per_chunk
-        for j in range(self.points_per_chunk):
-            for i in range(self.points_per_chunk):
-                world_x = (-chunk_x * self.chunk_size) + self.point_spacing * i
-                world_y = (chunk_y * self.chunk_size)  + self.point_spacing * j
+    def chunk_corner(self, chunk_x, chunk_y) -> Tuple[float, float]:
+        """
+        The x and y coordinate in the world of the corner of a chunk where its coordinates are the smallest, the chunk
+        extends chunk_size from there in both directions.
+        """
+        return chunk_x * self.chunk_size, chunk_y * self.chunk_size
 
-                height = self.height_function(world_x, world_y)
+    def get_height_field(self, chunk_x, chunk_y, level: int = 0) -> np.ndarray:
+        """
+        Computes the heights of all the points of a chunk with a single call to the height function, which gets the x
+        (north) and y (east) coordinates of the points in the world.
+        :param level: Level of detail, see points_at_level.
+        :return: Array with the heights, the point i steps along y and j steps along x from the corner of the chunk is
+            at index i + j * points_at_level(level).
+        """
+        points = self.points_at_level(level)
+        steps = (self.chunk_size / (points - 1)) * np.arange(points)
+        corner_x, corner_y = self.chunk_corner(chunk_x, chunk_y)
+        world_x, world_y = np.broadcast_arrays(corner_x + steps[:, None], corner_y + steps[None, :])
 
-                height_field_data[i + j * self.points_per_chunk] = height
+        return np.asarray(self.height_function(world_x, world_y), dtype=float).reshape(-1)
 
-        return height_field_data
+    def load_chunk(self, chunk_x, chunk_y, level: int = 0):
+        """
+        Generates a chunk and adds it to the physics world right away.
+        :return: Id of the body of the chunk.
+        """
+        return self._create_chunk(chunk_x, chunk_y, self._height_field(chunk_x, chunk_y, level), level)
 
-    def load_chunk(self, chunk_x, chunk_y):
-        height_field_data = self.get_height_field(chunk_x, chunk_y)
+    def _height_field(self, chunk_x, chunk_y, level: int = 0) -> np.ndarray:
+        """
+        Gives the height field of a chunk from the tile store, or generates (and stores) it when it isn't stored.
+        """
+        tile_store = self._tile_store(level)
+        if tile_store is None:
+            return self.get_height_field(chunk_x, chunk_y, level)
 
-        middle = (max(height_field_data) + min(height_field_data)) / 2
+        height_field = tile_store.get((chunk_x, chunk_y))
+        if height_field is None:
+            height_field = self.get_height_field(chunk_x, chunk_y, level)
+            tile_store.put((chunk_x, chunk_y), height_field)
 
-        terrainShape = p.createCollisionShape(shapeType=p.GEOM_HEIGHTFIELD,
-                                              meshScale=[self.point_spacing, self.point_spacing, 1],
-                                              heightfieldTextureScaling=(self.points_per_chunk - 1) / 2,
-                                              heightfieldData=height_field_data,
-                                              numHeightfieldRows=self.points_per_chunk,
-                                              numHeightfieldColumns=self.points_per_chunk)
+        return height_field
 
-        # todo might refactor this because chunk_y is used for the first axis and chunk_x is used for the second axis
-        #  Issue #51
-        terrain = p.createMultiBody(0, terrainShape,
-                                    basePosition=Vec3([-(self.chunk_size * chunk_y + self.chunk_size / 2),
-                                                       (self.chunk_size * chunk_x + self.chunk_size / 2),
-                                                       -(middle - self.depth)]).asENU(),
-                                    baseOrientation=PybulletAPI.getQuaternionFromEuler(Vec3([0, 0, math.pi])).asENU())
+    def _tile_store(self, level: int) -> Optional[TileStore]:
+        """
+        Every level of detail has its own tile store, since the tiles have a different size.
+        """
+        if self._tile_key is None:
+            return None
+
+        with self._tile_stores_lock:
+            if level not in self._tile_stores:
+                points = self.points_at_level(level)
+                self._tile_stores[level] = TileStore.for_terrain(_TILE_LAYOUT_VERSION, *self._tile_key,
+                                                                 self.chunk_size, tile_shape=(points ** 2,))
+            return self._tile_stores[level]
+
+    def _create_chunk(self, chunk_x, chunk_y, height_field_data: np.ndarray, level: int = 0) -> int:
+        middle = (height_field_data.max() + height_field_data.min()) / 2
+        points = self.points_at_level(level)
+        point_spacing = self.chunk_size / (points - 1)
+
+        # Bullet centers the height field on its base position, with the rows along y and the columns along x.
+        corner_x, corner_y = self.chunk_corner(chunk_x, chunk_y)
+        terrain = PybulletAPI.createHeightfield(heightfieldData=height_field_data.tolist(),
+                                                numHeightfieldRows=points,
+                                                numHeightfieldColumns=points,
+                                                meshScale=[point_spacing, point_spacing, 1],
+                                                heightfieldTextureScaling=(points - 1) / 2,
+                                                basePosition=Vec3([corner_x + self.chunk_size / 2,
+                                                                   corner_y + self.chunk_size / 2,
+                                                                   -(middle - self.depth)]),
+                                                baseOrientation=PybulletAPI.getQuaternionFromEuler(Vec3([0, 0, 0])),
+                                                physicsClientId=self._physics_client_id)
 
         return terrain
 
-    def update(self, position):
-        current_chunk = (int(position[X] // self.chunk_size), int(position[Y] // self.chunk_size))
+    def update(self, position, velocity=None):
+        """
+        Streams the chunks around the robot. The height fields are generated on background threads, this only adds the
+        finished ones to the physics world (closest first, within the load budget) and removes the chunks that are out
+        of range, so it never waits for the terrain. A chunk that moves to another level of detail keeps its old
+        height field until the new one is ready.
+        :param position: Position of the robot.
+        :param velocity: Velocity of the robot, when it is given the chunks around the position where the robot will be
+            after prefetch_time seconds are generated ahead of time.
+        """
+        current_chunk = self._chunk_of(position[X], position[Y])
+        predicted_chunk = current_chunk
+        if velocity is not None and self.prefetch_time > 0:
+            predicted_chunk = self._chunk_of(position[X] + velocity[X] * self.prefetch_time,
+                                             position[Y] + velocity[Y] * self.prefetch_time)
+
+        # Nothing changes until the robot enters another chunk or there are chunks waiting to be added.
+        if current_chunk == self.current_chunk and predicted_chunk == self._predicted_chunk and self._complete:
+            return
+
+        self.current_chunk = current_chunk
+        self._predicted_chunk = predicted_chunk
+
+        # The level of detail of every chunk that is needed now, and of the chunks that will be needed soon.
+        needed = self._levels_around(current_chunk)
+        wanted = {(*key, level) for key, level in self._levels_around(predicted_chunk).items()}
+        wanted.update((*key, level) for key, level in needed.items())
+
+        for key in [key for key in self.chunks if key not in needed]:
+            PybulletAPI.removeBody(self.chunks.pop(key), physicsClientId=self._physics_client_id)
+            del self.chunk_levels[key]
+
+        for key in [key for key in self._height_fields if key not in wanted]:
+            self._height_fields.pop(key).cancel()
+
+        def distance(chunk: Tuple[int, ...]) -> int:
+            return max(abs(chunk[0] - current_chunk[0]), abs(chunk[1] - current_chunk[1]))
+
+        missing = [key for key in wanted
+                   if self.chunk_levels.get(key[:2]) != key[2] and key not in self._height_fields]
+        for key in sorted(missing, key=distance):
+            # Opening the tile store and reading from it touch the disk, so that is done by the workers as well.
+            self._height_fields[key] = self._executor.submit(self._height_field, *key)
+
+        start = time.perf_counter()
+        for key, level in sorted(needed.items(), key=lambda item: distance(item[0])):
+            if self.chunk_levels.get(key) == level:
+                continue
+
+            height_field = self._height_fields[(*key, level)]
+            if not height_field.done():
+                continue
+
+            # At least one chunk is added on every update, so the terrain always catches up.
+            if key in self.chunks:
+                PybulletAPI.removeBody(self.chunks[key], physicsClientId=self._physics_client_id)
+            self.chunks[key] = self._create_chunk(*key, height_field.result(), level)
+            self.chunk_levels[key] = level
+            del self._height_fields[(*key, level)]
+
+            if time.perf_counter() - start >= self.load_budget:
+                break
+
+        self._complete = all(self.chunk_levels.get(key) == level for key, level in needed.items())
 
-        if self.current_chunk[X] != current_chunk[X] or self.current_chunk[Y] != current_chunk[Y]:
-            new_chunks = dict()
+    def close(self) -> None:
+        """
+        Stops generating height fields, the chunks that are loaded stay in the physics world.
+        """
+        for height_field in self._height_fields.values():
+            height_field.cancel()
+        self._height_fields.clear()
+        self._executor.shutdown(wait=False)
 
-            render_dist_min = self.render_distance//2
-            render_dist_max = self.render_distance - render_dist_min
+    def _chunk_of(self, x: float, y: float) -> Tuple[int, int]:
+        # The chunk that covers a point of the world, the inverse of chunk_corner.
+        return int(x // self.chunk_size), int(y // self.chunk_size)
 
-            for i in range(current_chunk[0] - render_dist_min, current_chunk[0] + render_dist_max):
-                for j in range(current_chunk[1] - render_dist_min, current_chunk[1] + render_dist_max):
-                    if (i, j) not in self.chunks:
-                        new_chunks[(i, j)] = self.load_chunk(i, j)
-                    else:
-                        new_chunks[(i, j)] = self.chunks[(i, j)]
+    def _levels_around(self, chunk: Tuple[int, int]) -> Dict[Tuple[int, int], int]:
+        """
+        The levels of detail of the chunks around a chunk.
+        """
+        return {key: self.level_at_distance(max(abs(key[0] - chunk[0]), abs(key[1] - chunk[1])))
+                for key in self._chunks_around(chunk)}
 
-            for key, value in self.chunks.items():
-                if key not in new_chunks.keys():
-                    PybulletAPI.removeBody(value)
+    def _chunks_around(self, chunk: Tuple[int, int]) -> Set[Tuple[int, int]]:
+        render_dist_min = self.render_distance // 2
+        render_dist_max = self.render_distance - render_dist_min
 
-            self.chunks = new_chunks
-            self.current_chunk = current_chunk
+        return {(i, j)
+                for i in range(chunk[0] - render_dist_min, chunk[0] + render_dist_max)
+                for j in range(chunk[1] - render_dist_min, chunk[1] + render_dist_max)}
@@ -0,0 +1,205 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Tuple, Dict, Iterator
+
+import numpy as np
+
+from lobster_simulator.common import disk_cache
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, there the store is only safe to use from a single process at a time.
+    fcntl = None
+
+TILES_FILE_NAME = 'tiles.bin'
+INDEX_FILE_NAME = 'index.bin'
+LOCK_FILE_NAME = 'lock'
+
+# Amount of tiles that are kept in memory by default.
+DEFAULT_MAX_RESIDENT_TILES = 256
+
+# Every entry of the index is the x and y coordinate of a tile and its slot in the tiles file.
+_INDEX_ENTRY_DTYPE = np.dtype([('x', '<i8'), ('y', '<i8'), ('slot', '<i8')])
+
+_TILE_DTYPE = np.dtype('<f8')
+
+
+class TileStore:
+    """
+    Persistent store of terrain tiles (the height fields of chunks) of a single terrain.
+
+    The tiles are appended to a single file that is read through a memory map, the index file tells which tile is in
+    which slot. A tile is written before its index entry, so the store stays consistent when a run is cut off. Tiles
+    that were read recently are kept in memory in a least recently used cache of bounded size, so revisited areas don't
+    even touch the memory map.
+
+    Tiles are only appended, so processes that share a store (for example the workers of a VectorSimulator) see each
+    other's tiles. Writes are serialized with a lock file where the platform supports it.
+    """
+
+    def __init__(self, directory: str, tile_shape: Tuple[int, int],
+                 max_resident_tiles: int = DEFAULT_MAX_RESIDENT_TILES):
+        """
+        TileStore
+        :param directory: Directory of the store, it is created when it doesn't exist. Every terrain should have its
+            own directory, see for_terrain.
+        :param tile_shape: Shape of every tile.
+        :param max_resident_tiles: Amount of tiles that are kept in memory.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.tile_shape = tuple(tile_shape)
+        self.max_resident_tiles = max_resident_tiles
+
+        self._tile_size = int(np.prod(self.tile_shape)) * _TILE_DTYPE.itemsize
+        self._tiles_path = os.path.join(directory, TILES_FILE_NAME)
+        self._index_path = os.path.join(directory, INDEX_FILE_NAME)
+
+        # Slots of the tiles by their coordinates and the amount of index entries that are read.
+        self._slots: Dict[Tuple[int, int], int] = dict()
+        self._index_length = 0
+
+        self._tiles: Optional[np.memmap] = None
+        self._resident: OrderedDict = OrderedDict()
+
+        # The terrain reads and writes tiles from multiple threads.
+        self._lock = threading.RLock()
+
+        self._read_index()
+
+    @staticmethod
+    def for_terrain(*parameters, tile_shape: Tuple[int, int],
+                    max_resident_tiles: int = DEFAULT_MAX_RESIDENT_TILES) -> Optional['TileStore']:
+        """
+        Opens the store of a terrain in the cache directory (see disk_cache).
+        :param parameters: Everything that determines the terrain (the generator, its parameters and seed and the
+            size of the chunks), the store is keyed on these.
+        :param tile_shape: Shape of every tile.
+        :param max_resident_tiles: Amount of tiles that are kept in memory.
+        :return: The store, or None when caching is disabled.
+        """
+        directory = disk_cache.cache_directory()
+        if directory is None:
+            return None
+
+        key = disk_cache.cache_key(*parameters, tile_shape)
+        try:
+            return TileStore(os.path.join(directory, 'terrain', key), tile_shape, max_resident_tiles)
+        except OSError:
+            # The store is only an optimization.
+            return None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
+
+    def __contains__(self, coordinates: Tuple[int, int]) -> bool:
+        with self._lock:
+            if coordinates not in self._slots:
+                self._read_index()
+            return coordinates in self._slots
+
+    def get(self, coordinates: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        :param coordinates: Coordinates of the tile.
+        :return: The tile (read only), or None when it isn't stored.
+        """
+        with self._lock:
+            tile = self._resident.get(coordinates)
+            if tile is not None:
+                self._resident.move_to_end(coordinates)
+                return tile
+
+            if coordinates not in self._slots:
+                # Another process might have stored it in the meantime.
+                self._read_index()
+                if coordinates not in self._slots:
+                    return None
+
+            tile = np.array(self._map(self._slots[coordinates]))
+            tile.setflags(write=False)
+            self._make_resident(coordinates, tile)
+            return tile
+
+    def put(self, coordinates: Tuple[int, int], tile: np.ndarray) -> None:
+        """
+        Stores a tile, nothing happens when the tile is already stored.
+        :param coordinates: Coordinates of the tile.
+        :param tile: The tile, with the tile shape of the store.
+        """
+        tile = np.ascontiguousarray(tile, dtype=_TILE_DTYPE).reshape(self.tile_shape)
+
+        with self._lock, self._file_lock():
+            self._read_index()
+            if coordinates not in self._slots:
+                slot = self._index_length
+                with open(self._tiles_path, 'ab') as f:
+                    f.truncate(slot * self._tile_size)
+                    f.write(tile.tobytes())
+
+                entry = np.array([(coordinates[0], coordinates[1], slot)], dtype=_INDEX_ENTRY_DTYPE)
+                with open(self._index_path, 'ab') as f:
+                    f.write(entry.tobytes())
+
+                self._slots[coordinates] = slot
+                self._index_length += 1
+
+            tile = tile.copy()
+            tile.setflags(write=False)
+            self._make_resident(coordinates, tile)
+
+    @property
+    def resident_count(self) -> int:
+        """
+        Amount of tiles that are kept in memory.
+        """
+        return len(self._resident)
+
+    def _make_resident(self, coordinates: Tuple[int, int], tile: np.ndarray) -> None:
+        self._resident[coordinates] = tile
+        self._resident.move_to_end(coordinates)
+        while len(self._resident) > self.max_resident_tiles:
+            self._resident.popitem(last=False)
+
+    def _map(self, slot: int) -> np.ndarray:
+        """
+        Gives the tile in a slot from the memory map, which is remapped when the file grew.
+        """
+        if self._tiles is None or slot >= len(self._tiles):
+            self._tiles = np.memmap(self._tiles_path, dtype=_TILE_DTYPE, mode='r',
+                                    shape=(self._index_length,) + self.tile_shape)
+        return self._tiles[slot]
+
+    def _read_index(self) -> None:
+        """
+        Reads the index entries that were added since the last time, by this or another process.
+        """
+        if not os.path.exists(self._index_path):
+            return
+
+        length = os.path.getsize(self._index_path) // _INDEX_ENTRY_DTYPE.itemsize
+        if length <= self._index_length:
+            return
+
+        entries = np.fromfile(self._index_path, dtype=_INDEX_ENTRY_DTYPE, count=length - self._index_length,
+                              offset=self._index_length * _INDEX_ENTRY_DTYPE.itemsize)
+        for x, y, slot in entries.tolist():
+            self._slots[(x, y)] = slot
+        self._index_length = length
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+
+        with open(os.path.join(self.directory, LOCK_FILE_NAME), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pkg_resources import resource_filename
 
 from lobster_common.vec3 import Vec3
@@ -9,11 +11,17 @@ class WaterSurface:
 
     @staticmethod
     def water_height(x, y):
+        """
+        Height of the water surface, x and y can also be numpy arrays (the result is then broadcast against them).
+        """
         return 0
 
-    def __init__(self, time: SimulationTime):
-        water_id = PybulletAPI.loadURDF(resource_filename("lobster_simulator", "data/water_surface.urdf"), Vec3([0, 0, 0]))
+    def __init__(self, time: SimulationTime, physics_client_id: Optional[int] = None):
+        water_id = PybulletAPI.loadURDF(resource_filename("lobster_simulator", "data/water_surface.urdf"), Vec3([0, 0, 0]),
+                                        physicsClientId=physics_client_id)
 
-        self.water_texture = PybulletAPI.loadTexture(resource_filename("lobster_simulator", "data/water_texture.png"))
+        self.water_texture = PybulletAPI.loadTexture(resource_filename("lobster_simulator", "data/water_texture.png"),
+                                                     physicsClientId=physics_client_id)
 
-        PybulletAPI.changeVisualShape(water_id, textureUniqueId=self.water_texture, rgbaColor=[0, 0.3, 1, 0.5])
+        PybulletAPI.changeVisualShape(water_id, textureUniqueId=self.water_texture, rgbaColor=[0, 0.3, 1, 0.5],
+                                      physicsClientId=physics_client_id)
@@ -1,4 +1,4 @@
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Any, Callable, Union
 
 import numpy as np
 from pkg_resources import resource_filename
@@ -6,12 +6,13 @@ from pkg_resources import resource_filename
 from lobster_simulator.common.general_exceptions import ArgumentNoneError
 from lobster_simulator.common.pybullet_object import PyBulletObject
 from lobster_simulator.robot import buoyancy
+from lobster_simulator.robot.robot_state import RobotState
 from lobster_simulator.robot.thruster import Thruster
-from lobster_simulator.sensors.accelerometer import Accelerometer
 from lobster_simulator.sensors.dvl import DVL
+from lobster_simulator.sensors.imu import IMU, IMUView, AccelerometerView, GyroscopeView, MagnetometerView
 from lobster_simulator.sensors.pressure_sensor import PressureSensor
-from lobster_simulator.sensors.gyroscope import Gyroscope
-from lobster_simulator.sensors.magnetometer import Magnetometer
+from lobster_simulator.sensors.sensor import Sensor, Interpolation
+from lobster_simulator.sensors.subscription import Subscription
 from lobster_simulator.common.simulation_time import SimulationTime
 from lobster_common.constants import *
 from lobster_simulator.common.pybullet_api import Frame
@@ -21,7 +22,13 @@ from lobster_simulator.common.translation import *
 
 class AUV(PyBulletObject):
 
-    def __init__(self, time: SimulationTime, config):
+    def __init__(self, time: SimulationTime, config, physics_client_id: Optional[int] = None):
+        """
+        AUV
+        :param time: Current time of the simulator.
+        :param config: Config of the robot.
+        :param physics_client_id: Physics client (world) the robot is created in, defaults to the default client.
+        """
         if config is None:
             raise ArgumentNoneError("config parameter should not be None")
 
@@ -29,13 +36,25 @@ class AUV(PyBulletObject):
 
         self.damping_matrix: np.ndarray = np.diag(config['damping_matrix_diag'])
 
-        object_id = p.loadURDF(resource_filename("lobster_simulator", "data/scout-alpha.urdf"),
-                              Vec3([0, 0, 2]),
-                              p.getQuaternionFromEuler(Vec3([0, 0, 0])))
-
-        super().__init__(object_id)
-
-        self._buoyancy = buoyancy.Buoyancy(self, 0.10, 2, resolution=config.get('buoyancy_resolution'))
+        physics_client_id = p._client(physics_client_id)
+        urdf_file = resource_filename("lobster_simulator", "data/scout-alpha.urdf")
+        object_id = p.loadURDF(urdf_file,
+                               Vec3([0, 0, 2]),
+                               p.getQuaternionFromEuler(Vec3([0, 0, 0])),
+                               physicsClientId=physics_client_id)
+
+        super().__init__(object_id, physics_client_id)
+
+        self._state: Optional[RobotState] = None
+
+        mesh_file = resource_filename("lobster_simulator", "data/base_link.STL")
+        buoyancy_model = buoyancy.BuoyancyModel[config.get('buoyancy_model', 'sampled').upper()]
+        self._buoyancy = buoyancy.Buoyancy(self, config.get('diameter', 0.2) / 2, config.get('length', 2),
+                                           resolution=config.get('buoyancy_resolution'),
+                                           model_files=[urdf_file, mesh_file],
+                                           model=buoyancy_model,
+                                           mesh_file=mesh_file,
+                                           voxel_size=config.get('buoyancy_voxel_size', 0.01))
         config_thrusters = config['thrusters']
 
         self.thrusters: Dict[str, Thruster] = dict()
@@ -45,28 +64,43 @@ class AUV(PyBulletObject):
                                                                             Vec3(config_thrusters[i]['direction']))
 
         # Set damping to zero, because default is not zero
-        p.changeDynamics(self._object_id, linearDamping=0.0, angularDamping=0.0)
+        p.changeDynamics(self._object_id, linearDamping=0.0, angularDamping=0.0,
+                         physicsClientId=self._physics_client_id)
 
         self._motor_debug_lines = list()
         self._motor_count = len(config_thrusters)
         self._rpm_motors = list()
         self._desired_rpm_motors: List[float] = list()
 
-        self._pressure_sensor = PressureSensor(self, Vec3([1, 0, 0]), SimulationTime(4000), time=time)
-        self._accelerometer = Accelerometer(self, Vec3([1, 0, 0]), SimulationTime(4000), time=time)
-        self._gyroscope = Gyroscope(self, Vec3([1, 0, 0]), SimulationTime(4000), time=time)
-        self._magnetometer = Magnetometer(self, Vec3([1, 0, 0]), SimulationTime(4000), time=time)
+        # Every sensor gets its own independent stream of noise, which is reproducible when a seed is configured.
+        pressure_seed, imu_seed = np.random.SeedSequence(config.get('noise_seed')).spawn(2)
+
+        # Quadratic interpolation makes it possible to run the physics at a low rate without losing sensor quality.
+        interpolation = Interpolation[config.get('sensor_interpolation', 'linear').upper()]
+
+        self._pressure_sensor = PressureSensor(self, Vec3([1, 0, 0]), SimulationTime(4000), time=time,
+                                               noise_seed=pressure_seed, interpolation=interpolation)
+        self._imu = IMU(self, Vec3([1, 0, 0]), SimulationTime(4000), time=time, noise_seed=imu_seed,
+                        interpolation=interpolation)
         self._dvl = DVL(self, Vec3([-.5, 0, 0.10]), time_step=SimulationTime(4000), time=time)
 
+        # The sensors by their name, in the order they are updated.
+        self._sensors: Dict[str, Sensor] = {'pressure_sensor': self._pressure_sensor, 'imu': self._imu,
+                                            'dvl': self._dvl}
+
+        # Subscribers that get the samples of all the sensors at once, with the samples collected for them during the
+        #  step.
+        self._step_subscribers: List[Tuple[Callable[[Dict[str, np.ndarray]], None], Dict[str, np.ndarray]]] = []
+
         self._max_thrust = 100
 
-    # TODO: This should in the future be based on the volume of the robot.
     def set_buoyancy(self, value: float):
         """
-        Sets the force of the buoyance that acts on the robot
+        Sets the force of the buoyance that acts on the robot when it is completely submerged. The voxel buoyancy model
+        bases this force on the volume of the robot, this overrides it.
         :param value: Bouyance force in Newtons.
         """
-        self._buoyancy = value
+        self._buoyancy.buoyancy_force = value
 
     def get_thruster(self, name: str):
         return self.thrusters[name]
@@ -79,50 +113,132 @@ class AUV(PyBulletObject):
         """
         if dt.microseconds <= 0:
             raise ValueError(f"time dt can't be less or equal to zero was: {dt}")
-        self._pressure_sensor.update(time, dt)
-        self._accelerometer.update(time, dt)
-        self._gyroscope.update(time, dt)
-        self._magnetometer.update(time, dt)
-        self._dvl.update(time, dt)
 
-        self._buoyancy.update()
+        state = self.state
+
+        for sensor in self._sensors.values():
+            sensor.update(time, dt)
+
+        for callback, step_samples in self._step_subscribers:
+            if step_samples:
+                samples = dict(step_samples)
+                step_samples.clear()
+                callback(samples)
+
+        self._buoyancy.update(state)
 
         for thruster in self.thrusters.values():
-            thruster._update(dt)
+            thruster._update(dt, state)
+
+        self._apply_damping(state)
+
+    @property
+    def sensors(self) -> Dict[str, Sensor]:
+        """
+        The sensors of the robot by their name.
+        """
+        return dict(self._sensors)
+
+    def add_sensor(self, name: str, sensor: Sensor) -> None:
+        """
+        Adds a sensor (for example an ImagingSonar) to the robot, it is updated on every step after the built in
+        sensors. Sensors should be added before subscribe_all is used, otherwise they aren't part of it.
+        :param name: Name of the sensor in sensors.
+        :param sensor: Sensor that is attached to this robot.
+        """
+        if name in self._sensors:
+            raise ValueError(f"The robot already has a sensor called {name}")
+
+        self._sensors[name] = sensor
+
+    def subscribe(self, sensor: Union[Sensor, IMUView], callback: Callable[[np.ndarray], None], decimation: int = 1,
+                  batch_size: Optional[int] = None) -> Subscription:
+        """
+        Calls the callback with the new samples of a sensor as a structured array, see Sensor.subscribe. The views on
+        the IMU (accelerometer, gyroscope, magnetometer) subscribe to the complete IMU.
+        """
+        if isinstance(sensor, IMUView):
+            sensor = self._imu
+
+        return sensor.subscribe(callback, decimation=decimation, batch_size=batch_size)
+
+    def subscribe_all(self, callback: Callable[[Dict[str, np.ndarray]], None], decimation: int = 1) -> None:
+        """
+        Calls the callback once per step with the new samples of all the sensors, as a dictionary from the name of the
+        sensor (see sensors) to a structured array. Sensors without new samples are left out, the callback isn't called
+        when there are no new samples at all.
+        :param callback: Called with the samples of the step.
+        :param decimation: Only every decimation-th sample of every sensor is delivered.
+        """
+        step_samples: Dict[str, np.ndarray] = dict()
+        for name, sensor in self.sensors.items():
+            sensor.subscribe(lambda records, name=name: step_samples.__setitem__(name, records), decimation=decimation)
 
-        self._apply_damping()
+        self._step_subscribers.append((callback, step_samples))
+
+    def set_polling(self, enabled: bool) -> None:
+        """
+        Enables or disables keeping the samples of all the sensors to be popped. Sensors that aren't polled and have no
+        subscribers don't generate samples at all.
+        """
+        for sensor in self._sensors.values():
+            sensor.polling = enabled
+
+    def set_sensor_interpolation(self, interpolation: Interpolation) -> None:
+        """
+        Sets how all the sensors compute their samples between two physics steps, see Interpolation.
+        """
+        for sensor in self._sensors.values():
+            sensor.interpolation = interpolation
+
+    @property
+    def state(self) -> RobotState:
+        """
+        Kinematic state of the robot. It is fetched from Bullet once and then shared until the physics world changes
+        (see invalidate_state), so it should be treated as read only. The getters (get_position, get_orientation, ...)
+        give copies that can be changed freely.
+        """
+        if self._state is None:
+            self._state = RobotState.fetch(self._object_id, self._physics_client_id)
+        return self._state
+
+    def invalidate_state(self) -> None:
+        """
+        Makes sure the state is fetched from Bullet again on the next access. The robot does this itself whenever it
+        changes its body (the setters, apply_force, restore_state), the simulator does it after every physics step.
+        """
+        self._state = None
 
     def get_position_and_orientation(self) -> Tuple[Vec3, Quaternion]:
         """
         Gets both the position and the orientation of the robot.
         :return: Tuple with the position and the orientation.
         """
-        return p.getBasePositionAndOrientation(self._object_id)
+        state = self.state
+        return Vec3(state.position), Quaternion(state.orientation)
 
     def get_position(self) -> Vec3:
         """
         Position of the robot.
         :return: Vec3 with the position.
         """
-        position, _ = self.get_position_and_orientation()
-        return position
+        return Vec3(self.state.position)
 
     def get_orientation(self) -> Quaternion:
         """
         Gives the orientation of the robot in the world frame.
         :return: Orientation as a quaternion.
         """
-        _, orientation = self.get_position_and_orientation()
-        return orientation
+        return Quaternion(self.state.orientation)
 
     def get_velocity(self) -> Vec3:
         """
         Gets the linear velocity of the Robot in the World frame.
         """
-        return p.getBaseVelocity(self._object_id)[0]
+        return Vec3(self.state.velocity)
 
     def get_angular_velocity(self):
-        return p.getBaseVelocity(self._object_id)[1]
+        return Vec3(self.state.angular_velocity)
 
     def get_altitude(self) -> Optional[float]:
         """
@@ -133,11 +249,10 @@ class AUV(PyBulletObject):
         beam_length = 100
         raytest_endpoint = 2 * Vec3([0, 0, beam_length])
 
-        world_frame_endpoint = vec3_local_to_world(self.get_position(),
-                                                   self.get_orientation(),
-                                                   raytest_endpoint)
+        state = self.state
+        world_frame_endpoint = state.local_to_world(raytest_endpoint)
 
-        result = p.rayTest(self.get_position(), world_frame_endpoint)
+        result = p.rayTest(state.position, world_frame_endpoint, physicsClientId=self._physics_client_id)
 
         altitude = result[0] * beam_length
 
@@ -156,10 +271,12 @@ class AUV(PyBulletObject):
 
         if not relative_direction:
             # If the force direction is given in the world frame, it should be rotated to the local frame
-            force = vec3_rotate_vector_to_local(self.get_orientation(), force)
+            force = self.state.rotate_to_local(force)
 
         # Apply the force in the local frame
-        p.applyExternalForce(self._object_id, force, force_pos, Frame.LINK_FRAME)
+        p.applyExternalForce(self._object_id, force, force_pos, Frame.LINK_FRAME,
+                             physicsClientId=self._physics_client_id)
+        self.invalidate_state()
 
     def set_position_and_orientation(self, position: Vec3 = None, orientation: Quaternion = None) -> None:
         """
@@ -172,7 +289,9 @@ class AUV(PyBulletObject):
         if orientation is None:
             orientation = self.get_orientation()
 
-        p.resetBasePositionAndOrientation(self._object_id, position, orientation)
+        p.resetBasePositionAndOrientation(self._object_id, position, orientation,
+                                          physicsClientId=self._physics_client_id)
+        self.invalidate_state()
 
     def set_velocity(self, linear_velocity: Vec3 = None, angular_velocity: Vec3 = None, local_frame=False) -> None:
         """
@@ -190,9 +309,11 @@ class AUV(PyBulletObject):
             linear_velocity = vec3_rotate_vector_to_world(self.get_orientation(), linear_velocity)
             angular_velocity = vec3_rotate_vector_to_world(self.get_orientation(), angular_velocity)
 
-        p.resetBaseVelocity(self._object_id, linear_velocity, angular_velocity)
+        p.resetBaseVelocity(self._object_id, linear_velocity, angular_velocity,
+                            physicsClientId=self._physics_client_id)
+        self.invalidate_state()
 
-    def _apply_damping(self):
+    def _apply_damping(self, state: RobotState):
         """
         Applies damping to the robot on its linear and angular velocity.
         See https://docs.lobster-robotics.com/scout/robots/scout-alpha/scout-simulator-model
@@ -201,11 +322,11 @@ class AUV(PyBulletObject):
         # Don't apply damping if the robot is above water
         # TODO. This creates a unrealistic hard boundary for enabling and disabling damping, so perhaps this should be
         #  improved in the future.
-        if self.get_position()[Z] < 0:
+        if state.position[Z] < 0:
             return
 
-        velocity = vec3_rotate_vector_to_local(self.get_orientation(), self.get_velocity())
-        angular_velocity = vec3_rotate_vector_to_local(self.get_orientation(), self.get_angular_velocity())
+        velocity = state.body_velocity
+        angular_velocity = state.body_angular_velocity
 
         damping = -np.dot(self.damping_matrix, np.concatenate((velocity.numpy(), angular_velocity.numpy())))
 
@@ -216,32 +337,70 @@ class AUV(PyBulletObject):
         angular_damping_torque = Vec3(damping[3:])
 
         p.applyExternalForce(self._object_id, forceObj=linear_damping_force, posObj=Vec3([0, 0, 0]),
-                             frame=Frame.LINK_FRAME)
-        p.applyExternalTorque(self._object_id, torqueObj=angular_damping_torque, frame=Frame.LINK_FRAME)
+                             frame=Frame.LINK_FRAME, physicsClientId=self._physics_client_id)
+        p.applyExternalTorque(self._object_id, torqueObj=angular_damping_torque, frame=Frame.LINK_FRAME,
+                              physicsClientId=self._physics_client_id)
+
+    def save_state(self) -> Dict[str, Any]:
+        """
+        Captures the state of the robot: the pose and the velocities of its body and the Python side state of the
+        sensors and thrusters. The rest of the physics world (like the terrain) isn't part of it, so it can change
+        without making the state invalid.
+        :return: State that can be given to restore_state.
+        """
+        state = self.state
+        return {
+            'body': (Vec3(state.position), state.orientation, Vec3(state.velocity), Vec3(state.angular_velocity)),
+            'sensors': {name: sensor.save_state() for name, sensor in self._sensors.items()},
+            'thrusters': {name: thruster.save_state() for name, thruster in self.thrusters.items()}
+        }
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restores a state that was captured with save_state.
+        """
+        position, orientation, velocity, angular_velocity = state['body']
+        p.resetBasePositionAndOrientation(self._object_id, position, orientation,
+                                          physicsClientId=self._physics_client_id)
+        p.resetBaseVelocity(self._object_id, velocity, angular_velocity, physicsClientId=self._physics_client_id)
+
+        for name, sensor_state in state['sensors'].items():
+            self._sensors[name].restore_state(sensor_state)
+
+        for name, thruster_state in state['thrusters'].items():
+            self.thrusters[name].restore_state(thruster_state)
+
+        self.invalidate_state()
 
     @property
     def dvl(self) -> DVL:
         return self._dvl
 
     @property
-    def accelerometer(self) -> Accelerometer:
-        return self._accelerometer
+    def imu(self) -> IMU:
+        return self._imu
+
+    @property
+    def accelerometer(self) -> AccelerometerView:
+        return self._imu.accelerometer
 
     @property
-    def gyroscope(self) -> Gyroscope:
-        return self._gyroscope
+    def gyroscope(self) -> GyroscopeView:
+        return self._imu.gyroscope
 
     @property
-    def magnetometer(self) -> Magnetometer:
-        return self._magnetometer
+    def magnetometer(self) -> MagnetometerView:
+        return self._imu.magnetometer
 
     @property
     def pressure_sensor(self) -> PressureSensor:
         return self._pressure_sensor
 
     def remove(self) -> None:
-        p.removeBody(self._object_id)
-        self._dvl.remove()
+        p.removeBody(self._object_id, physicsClientId=self._physics_client_id)
+        self.invalidate_state()
+        for sensor in self._sensors.values():
+            sensor.remove()
         self._buoyancy.remove()
         for thruster in self.thrusters.values():
             thruster.remove()
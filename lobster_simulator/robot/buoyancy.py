@@ -1,19 +1,61 @@
-from typing import Optional
+import math
+from enum import Enum, auto
+from typing import Optional, List, Tuple
 
 import numpy as np
 
 from lobster_common.vec3 import Vec3
 from lobster_simulator.environment.water_surface import WaterSurface
 from lobster_simulator.robot import auv
-from lobster_simulator.common import translation
+from lobster_simulator.robot.robot_state import RobotState
 from lobster_common.constants import *
 from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common import disk_cache
+from lobster_simulator.common.mesh import load_stl, voxelize
+from lobster_simulator.robot.hull_volume import HullVolume
+from lobster_simulator.robot.point_octree import PointOctree
+
+# Name of the test points in the disk cache, the version should be increased whenever the way they are created changes.
+_TEST_POINTS_CACHE_NAME = 'buoyancy_test_points'
+_TEST_POINTS_VERSION = 1
+_HULL_VOLUME_CACHE_NAME = 'buoyancy_hull_volume'
+_HULL_VOLUME_VERSION = 2
+
+# Size of the smallest blocks of the octree of the test points, relative to the resolution.
+_LEAF_BLOCK_RESOLUTIONS = 2
+
+
+class BuoyancyModel(Enum):
+    """
+    The ways the submerged volume of the robot (and thus the buoyancy force) can be determined.
+    """
+    # Counts the test points inside the robot that are under water.
+    SAMPLED = auto()
+    # Treats the robot as a cylinder and calculates the submerged volume exactly.
+    CYLINDER = auto()
+    # Uses the voxelized mesh of the robot, the buoyancy force follows from its actual volume.
+    VOXEL = auto()
 
 
 class Buoyancy:
 
     def __init__(self, robot: 'auv', radius: float, length: float, resolution: Optional[float] = None,
-                 visualize: bool = False):
+                 visualize: bool = False, model_files: Optional[List[str]] = None,
+                 model: BuoyancyModel = BuoyancyModel.SAMPLED, mesh_file: Optional[str] = None,
+                 voxel_size: float = 0.01):
+        """
+        Buoyancy
+        :param robot: Robot the buoyancy acts on.
+        :param radius: Radius of the cylinder that contains the robot.
+        :param length: Length of the cylinder that contains the robot.
+        :param resolution: Distance between the test points, only a single test point is used when None.
+        :param visualize: Show the test points in the gui.
+        :param model_files: Files the model of the robot is loaded from (including its mesh). When given, the test points
+            and the voxelized hull are cached on disk.
+        :param model: How the submerged volume is determined, the test points are only created for the sampled model.
+        :param mesh_file: STL file with the mesh of the robot, needed for the voxel model.
+        :param voxel_size: Size of the voxels of the voxel model.
+        """
         if radius <= 0:
             raise ValueError("Radius should be bigger than zero")
         if length <= 0:
@@ -23,105 +65,349 @@ class Buoyancy:
         self._length = length
 
         self._robot: auv = robot
+        self._physics_client_id = robot.physics_client_id
 
         self._buoyancy: float = 550
 
         self.resolution = resolution
+        self.model = model
 
-        pos = Vec3([0, 0, 0])
-
-        self.visualize = visualize
+        self.visualize = visualize and model == BuoyancyModel.SAMPLED
 
         self.dots = []
         self.dot_under_water = []
-        self.test_points = []
 
-        if resolution:
+        # Distance from the origin of the robot within which the complete robot lies.
+        self._max_distance_from_position = max(self._radius, self._length / 2)
+
+        if model == BuoyancyModel.VOXEL:
+            if mesh_file is None:
+                raise ValueError("The voxel buoyancy model needs the mesh of the robot")
+
+            self._hull_volume = self._load_or_create_hull_volume(mesh_file, voxel_size, model_files)
+            self._max_distance_from_position = self._hull_volume.extent
+            self._buoyancy = DENSITY_FRESHWATER * GRAVITY * self._hull_volume.total_volume
+
+        if model != BuoyancyModel.SAMPLED:
+            self.test_points: np.ndarray = np.zeros((0, 3))
+            return
+
+        # The test points in the robot frame, stored as an (N, 3) array so they can be transformed all at once.
+        self.test_points: np.ndarray = self._load_or_create_test_points(model_files)
+
+        if len(self.test_points) == 0:
+            raise NoTestPointsCreated(f"No buoyancy test points where created with robot: {robot}, radius: {radius},"
+                                      f" length: {length}"
+                                      f" and resolution {resolution} ")
+
+        # Groups the test points so only the test points close to the water surface have to be tested one by one.
+        self._test_point_octree = PointOctree(self.test_points, _LEAF_BLOCK_RESOLUTIONS * (self.resolution or 1))
+
+        if self.visualize:
+            sphere_size = self.resolution / 4 if self.resolution else 0.05
+            for _ in range(len(self.test_points)):
+                self.dot_under_water.append(True)
+                self.dots.append(PybulletAPI.createVisualSphere(sphere_size, [0, 0, 1, 1],
+                                                                physicsClientId=self._physics_client_id))
+
+    def _load_or_create_test_points(self, model_files: Optional[List[str]]) -> np.ndarray:
+        """
+        Loads the test points from the disk cache, they are only created (and then cached) when they aren't in there.
+        The test points only depend on the model of the robot and the parameters, so the cache is only used when the
+        files the model is loaded from are known.
+        """
+        if model_files is None:
+            return self._create_test_points()
+
+        key = disk_cache.cache_key(_TEST_POINTS_VERSION, self._radius, self._length, self.resolution,
+                                   files=model_files)
+
+        test_points = disk_cache.load_array(_TEST_POINTS_CACHE_NAME, key)
+        if test_points is None:
+            test_points = self._create_test_points()
+            disk_cache.save_array(_TEST_POINTS_CACHE_NAME, key, test_points)
+
+        return test_points
+
+    def _load_or_create_hull_volume(self, mesh_file: str, voxel_size: float,
+                                    model_files: Optional[List[str]]) -> HullVolume:
+        """
+        Loads the voxelized hull from the disk cache, it is only created (and then cached) when it isn't in there.
+        """
+        if model_files is None:
+            return self._create_hull_volume(mesh_file, voxel_size)
+
+        key = disk_cache.cache_key(_HULL_VOLUME_VERSION, voxel_size, files=model_files)
+
+        arrays = disk_cache.load_arrays(_HULL_VOLUME_CACHE_NAME, key)
+        if arrays is not None:
+            return HullVolume.from_arrays(arrays)
+
+        hull_volume = self._create_hull_volume(mesh_file, voxel_size)
+        disk_cache.save_arrays(_HULL_VOLUME_CACHE_NAME, key, hull_volume.to_arrays())
+
+        return hull_volume
+
+    def _create_hull_volume(self, mesh_file: str, voxel_size: float) -> HullVolume:
+        centers, volumes = voxelize(load_stl(mesh_file), voxel_size)
+
+        # The mesh is given in the frame of the link, the buoyancy works in the frame of the robot.
+        centers = PybulletAPI.linkToBodyFrame(self._robot.object_id, centers, physicsClientId=self._physics_client_id)
+
+        return HullVolume.from_voxels(centers, volumes, voxel_size)
+
+    def _create_test_points(self) -> np.ndarray:
+        """
+        Creates a grid of points within the cylinder and keeps the points that are inside the robot. A point is inside
+        the robot when the rays cast towards it from 1 meter away in the 4 directions around the length axis of the
+        robot all hit the robot.
+        """
+        radius = self._radius
+        length = self._length
+
+        if self.resolution:
             # Expects that the robot has a cylindrical shape.
             x_range = np.arange(-length / 2, length / 2, self.resolution)
             y_range = np.arange(-radius, radius + self.resolution, self.resolution)
             z_range = np.arange(-radius, radius + self.resolution, self.resolution)
         else:
-            x_range = range(1)
-            y_range = range(1)
-            z_range = range(1)
-
-        total_points = len(x_range) * len(y_range) * len(z_range)
-        count = 0
-        # Casts rays within a certain radius directed onto the robot object. When the ray hits (or not hits?) the robot the origin of the ray is saved as a test point.
-        # Joris could you elaborate here? This is what I thought it would be.
-        for x in x_range:
-            for y in y_range:
-                for z in z_range:
-                    pos = Vec3([x, y, z])
-                    count += 1
-                    if count % 1000 == 0:
-                        print(f"{int(count / total_points * 100)}%")
-
-                    if np.math.sqrt(y ** 2 + z ** 2) < radius \
-                            and self._check_ray_hits_robot(pos + Vec3([0, 1, 0]), pos) \
-                            and self._check_ray_hits_robot(pos + Vec3([0, 0, 1]), pos) \
-                            and self._check_ray_hits_robot(pos + Vec3([0, -1, 0]), pos) \
-                            and self._check_ray_hits_robot(pos + Vec3([0, 0, -1]), pos):
-
-                        if self.visualize:
-                            self.dot_under_water.append(True)
-                            if self.resolution:
-                                sphere_size = self.resolution / 4
-                            else:
-                                sphere_size = 0.05
-                            self.dots.append(PybulletAPI.createVisualSphere(sphere_size, [0, 0, 1, 1]))
-
-                        self.test_points.append(Vec3([x, y, z]))
-        if len(self.test_points) == 0:
-            raise NoTestPointsCreated(f"No buoyancy test points where created with robot: {robot}, radius: {radius},"
-                                      f" length: {length}"
-                                      f" and resolution {resolution} ")
+            x_range = np.zeros(1)
+            y_range = np.zeros(1)
+            z_range = np.zeros(1)
 
-    def _check_ray_hits_robot(self, start_point: Vec3, endpoint: Vec3) -> bool:
-        return PybulletAPI.rayTest(start_point, endpoint, object_id=self._robot.object_id)[0] < 1
+        grid = np.stack(np.meshgrid(x_range, y_range, z_range, indexing='ij'), axis=-1).reshape(-1, 3)
+        points = grid[np.sqrt(grid[:, Y] ** 2 + grid[:, Z] ** 2) < radius]
+
+        inside = np.ones(len(points), dtype=bool)
+        for direction in ([0, 1, 0], [0, 0, 1], [0, -1, 0], [0, 0, -1]):
+            if not inside.any():
+                break
+            inside &= self._check_ray_hits_robot(points + direction, points)
+
+        return points[inside]
+
+    def _check_ray_hits_robot(self, start_points: np.ndarray, end_points: np.ndarray) -> np.ndarray:
+        """
+        Casts rays (given in the robot frame) in a single batch.
+        :return: Boolean array that tells for every ray whether it hit the robot.
+        """
+        state = self._robot.state
+        object_ids, _, _, _ = PybulletAPI.rayTestBatch(state.local_to_world_array(start_points),
+                                                       state.local_to_world_array(end_points),
+                                                       physicsClientId=self._physics_client_id)
+        return object_ids == self._robot.object_id
+
+    def update(self, state: Optional[RobotState] = None):
+        """
+        Applies the buoyancy force to the robot.
+        :param state: Current state of the robot, fetched from the robot when not given.
+        """
+        if state is None:
+            state = RobotState(*self._robot.get_position_and_orientation())
 
-    def update(self):
         buoyancy_point = Vec3([0, 0, 0])
-        buoyancy_force = Vec3([0, 0, -self._buoyancy])
-        under_water_count = 0
+        submerged_fraction = 1.0
 
-        position, orientation = self._robot.get_position_and_orientation()
+        position = state.position
 
         # Only do the computationally intensive calculation of the buoyancy point and force when the robot is close to
         #  the surface
         # And when there are any points to be used to calculate the buoyancy.
-        max_distance_from_pos = max(self._radius, self._length / 2)
-        if position[Z] - max_distance_from_pos < WaterSurface.water_height(position[X], position[Y]):
-            for i in range(len(self.test_points)):
-                dot_position = translation.vec3_local_to_world(position, orientation, self.test_points[i])
+        if position[Z] - self._max_distance_from_position < WaterSurface.water_height(position[X], position[Y]):
+            if self.model == BuoyancyModel.CYLINDER:
+                buoyancy_point, submerged_fraction = self._cylinder_buoyancy(state)
+            elif self.model == BuoyancyModel.VOXEL:
+                buoyancy_point, submerged_fraction = self._voxel_buoyancy(state)
+            else:
+                buoyancy_point, submerged_fraction = self._sampled_buoyancy(state)
+        elif self.model == BuoyancyModel.VOXEL:
+            # The buoyancy of the completely submerged hull acts at the centre of its volume.
+            buoyancy_point = Vec3(self._hull_volume.centroid)
 
-                if self.visualize:
-                    PybulletAPI.resetBasePositionAndOrientation(self.dots[i], dot_position)
+        buoyancy_force = Vec3([0, 0, -self._buoyancy]) * submerged_fraction
 
-                if dot_position[Z] > WaterSurface.water_height(dot_position[X], dot_position[Y]):
-                    under_water_count += 1
-                    buoyancy_point += self.test_points[i]
-                    if self.visualize and not self.dot_under_water[i]:
-                        PybulletAPI.changeVisualShapeColor(self.dots[i], [0, 0, 1, 0.5])
-                        self.dot_under_water[i] = True
+        # Apply the buoyancy force
+        self._robot.apply_force(buoyancy_point, buoyancy_force, relative_direction=False)
 
-                else:
-                    if self.visualize and self.dot_under_water[i]:
-                        PybulletAPI.changeVisualShapeColor(self.dots[i], [1, 0, 0, 0.5])
-                        self.dot_under_water[i] = False
+    def _sampled_buoyancy(self, state: RobotState) -> Tuple[Vec3, float]:
+        """
+        Determines the part of the test points that is under water.
 
-            if under_water_count > 0:
-                buoyancy_point /= under_water_count
+        The water surface is treated as flat around the robot, so the test points under water are the ones on one side
+        of a plane in the robot frame. The octree of the test points resolves blocks of test points that are completely
+        under water or completely dry at once, only the test points close to the water surface are tested one by one.
+        :return: The center of the submerged test points in the robot frame and the submerged fraction.
+        """
+        if self.visualize:
+            return self._sampled_buoyancy_per_point(state)
 
-            buoyancy_force = buoyancy_force * under_water_count / len(self.test_points)
+        buoyancy_point = Vec3([0, 0, 0])
 
-        # Apply the buoyancy force
-        self._robot.apply_force(buoyancy_point, buoyancy_force, relative_direction=False)
+        position = state.position
+        depth = position[Z] - WaterSurface.water_height(position[X], position[Y])
+
+        # A test point p is under water when its depth, depth + down . p, is positive.
+        under_water_count, under_water_sum = self._test_point_octree.above_plane(state.rotation_matrix[Z], depth)
+
+        if under_water_count > 0:
+            buoyancy_point = Vec3(under_water_sum / under_water_count)
+
+        return buoyancy_point, under_water_count / len(self.test_points)
+
+    def _sampled_buoyancy_per_point(self, state: RobotState) -> Tuple[Vec3, float]:
+        """
+        Tests every test point, which is needed to show all of them.
+        :return: The center of the submerged test points in the robot frame and the submerged fraction.
+        """
+        buoyancy_point = Vec3([0, 0, 0])
+
+        # Rotate and translate all the test points to the world frame with a single matrix multiplication.
+        world_points = state.local_to_world_array(self.test_points)
+
+        under_water = world_points[:, Z] > WaterSurface.water_height(world_points[:, X], world_points[:, Y])
+        under_water_count = int(np.count_nonzero(under_water))
+
+        if under_water_count > 0:
+            buoyancy_point = Vec3(self.test_points[under_water].mean(axis=0))
+
+        self._update_visualization(world_points, under_water)
+
+        return buoyancy_point, under_water_count / len(self.test_points)
+
+    def _cylinder_buoyancy(self, state: RobotState) -> Tuple[Vec3, float]:
+        """
+        Calculates the submerged volume and its center of a cylinder along the x axis of the robot (centered at the
+        origin of the robot) that is cut by a flat water surface at the height of the water above the robot.
+
+        Every slice of the cylinder perpendicular to its axis is a disk that is cut by the water surface. At distance s
+        along the axis, the normalized depth of the center of that disk is d(s) = (z(s) - h) / (r * k), where k is the
+        length of the vertical component within the plane of the disk. d changes linearly along the axis, so the volume
+        and its first moments are integrals over d that have closed form antiderivatives.
+        :return: The center of the submerged volume in the robot frame and the submerged fraction.
+        """
+        radius = self._radius
+        length = self._length
+
+        position = state.position
+        water_height = WaterSurface.water_height(position[X], position[Y])
+
+        # The down direction of the world in the robot frame, the x component is the vertical part of the axis.
+        down = state.rotation_matrix[Z]
+        axis_z = down[X]
+        k = math.hypot(down[Y], down[Z])
+
+        # Direction within the disks that points down the most.
+        down_in_disk = np.array([0, down[Y], down[Z]]) / k if k > 0 else np.zeros(3)
+
+        k = max(k, _MIN_DISK_TILT)
+        d0 = (position[Z] - water_height) / (radius * k)
+        slope = axis_z / (radius * k)
+
+        if abs(slope) * length < _HORIZONTAL_SLOPE:
+            # The cylinder is (almost) horizontal, so every slice is submerged the same.
+            c = min(max(d0, -1.0), 1.0)
+            volume = radius ** 2 * length * _segment_area(c)
+            moment_axis = radius ** 2 * slope * length ** 3 / 6 * math.sqrt(1 - c ** 2) if abs(d0) < 1 else 0.0
+            moment_disk = radius ** 3 * length * 2 / 3 * (1 - c ** 2) ** 1.5
+        else:
+            d1 = d0 - slope * length / 2
+            d2 = d0 + slope * length / 2
+
+            area_integral = _segment_area_integral(d2) - _segment_area_integral(d1)
+
+            volume = radius ** 2 / slope * area_integral
+            moment_axis = radius ** 2 / slope ** 2 * (_segment_moment_integral(d2) - _segment_moment_integral(d1)
+                                                      - d0 * area_integral)
+            moment_disk = radius ** 3 * 2 / 3 / slope * (_segment_disk_moment_integral(d2)
+                                                          - _segment_disk_moment_integral(d1))
+
+        if volume <= 0:
+            return Vec3([0, 0, 0]), 0.0
+
+        buoyancy_point = Vec3([moment_axis / volume, 0, 0] + down_in_disk * moment_disk / volume)
+
+        return buoyancy_point, min(volume / (math.pi * radius ** 2 * length), 1.0)
+
+    def _voxel_buoyancy(self, state: RobotState) -> Tuple[Vec3, float]:
+        """
+        Looks up the submerged part of the voxelized hull.
+        :return: The center of the submerged volume in the robot frame and the submerged fraction.
+        """
+        position = state.position
+        depth = position[Z] - WaterSurface.water_height(position[X], position[Y])
+
+        # The down direction of the world in the robot frame
+        volume, center = self._hull_volume.submerged(state.rotation_matrix[Z], depth)
+
+        return Vec3(center), volume / self._hull_volume.total_volume
+
+    @property
+    def buoyancy_force(self) -> float:
+        """
+        Buoyancy force (in Newton) when the robot is completely submerged.
+        """
+        return self._buoyancy
+
+    @buoyancy_force.setter
+    def buoyancy_force(self, value: float) -> None:
+        self._buoyancy = value
+
+    def _update_visualization(self, world_points: np.ndarray, under_water: np.ndarray) -> None:
+        for i in range(len(world_points)):
+            PybulletAPI.resetBasePositionAndOrientation(self.dots[i], Vec3(world_points[i]),
+                                                        physicsClientId=self._physics_client_id)
+
+            if under_water[i] != self.dot_under_water[i]:
+                color = [0, 0, 1, 0.5] if under_water[i] else [1, 0, 0, 0.5]
+                PybulletAPI.changeVisualShapeColor(self.dots[i], color, physicsClientId=self._physics_client_id)
+                self.dot_under_water[i] = bool(under_water[i])
 
     def remove(self):
         for dot in self.dots:
-            PybulletAPI.removeBody(dot)
+            PybulletAPI.removeBody(dot, physicsClientId=self._physics_client_id)
+
+
+# Below this tilt of the disks (the cylinder is vertical) the water surface is treated as if it hardly cuts the disks.
+_MIN_DISK_TILT = 1e-12
+
+# Below this change of the normalized depth over the length of the cylinder it is treated as horizontal, which avoids
+#  dividing small differences by a small slope.
+_HORIZONTAL_SLOPE = 1e-4
+
+
+def _segment_area(d: float) -> float:
+    """
+    Area of the part of a unit disk that is under water, when its center is at normalized depth d (clipped to [-1, 1]).
+    """
+    return math.pi - math.acos(d) + d * math.sqrt(1 - d ** 2)
+
+
+def _segment_area_integral(d: float) -> float:
+    """
+    Antiderivative of the submerged area of a unit disk with respect to d (zero at d = -1).
+    """
+    c = min(max(d, -1.0), 1.0)
+    s = math.sqrt(1 - c ** 2)
+    return math.pi * c - c * math.acos(c) + s - s ** 3 / 3 + math.pi * max(d - 1, 0.0)
+
+
+def _segment_moment_integral(d: float) -> float:
+    """
+    Antiderivative of d times the submerged area of a unit disk with respect to d.
+    """
+    c = min(max(d, -1.0), 1.0)
+    s = math.sqrt(1 - c ** 2)
+    return (math.pi * c ** 2 / 2 - c ** 2 / 2 * math.acos(c) - math.asin(c) / 8 + c * s / 4
+            - c * (1 - 2 * c ** 2) * s / 8 + math.pi / 2 * (max(d, 1.0) ** 2 - 1))
+
+
+def _segment_disk_moment_integral(d: float) -> float:
+    """
+    Antiderivative of (1 - d^2)^(3/2) with respect to d, the first moment of the submerged part of a unit disk in the
+    down direction is 2/3 of that integrand.
+    """
+    c = min(max(d, -1.0), 1.0)
+    return c * (5 - 2 * c ** 2) * math.sqrt(1 - c ** 2) / 8 + 3 / 8 * math.asin(c)
 
 
 class NoTestPointsCreated(RuntimeError):
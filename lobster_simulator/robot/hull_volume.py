@@ -0,0 +1,162 @@
+import math
+from typing import Tuple, Dict
+
+import numpy as np
+
+# Below this length of the down direction within the cross sections (the hull is vertical), the cross sections are
+#  treated as completely submerged or completely dry.
+_MIN_CROSS_SECTION_TILT = 1e-12
+
+
+class HullVolume:
+    """
+    Submerged volume and centre of buoyancy of a voxelized hull for any orientation and depth.
+
+    The voxels lie on a grid that is aligned with the axes of the robot. Within every slab along the x axis of the robot
+    (its length axis) the voxels form rows along the y axis and rows along the z axis, and the volume and first moment
+    of everything beyond every voxel boundary of every row are summed up front. The water plane crosses every row at a
+    single point, so at runtime the submerged volume is a lookup of these prefix sums for every row at the point where
+    the water plane actually crosses it, instead of a test for every voxel. The rows along the axis of the cross section
+    that is closest to the down direction are used, so the water plane crosses them as steeply as possible.
+
+    A voxel that the water plane passes through counts with the part of its width along the row that is under water, so
+    the volume changes continuously with the depth. Only those voxels can differ from an exact cut of the voxels by a
+    plane, each by less than its own volume, and when the water plane is parallel to a face of the voxels (like for a
+    level hull) the cut is exact.
+    """
+
+    def __init__(self, y_rows: np.ndarray, z_rows: np.ndarray, origin: np.ndarray, voxel_size: float,
+                 total_volume: float, centroid: np.ndarray):
+        """
+        HullVolume, use from_voxels to create one from voxels.
+        :param y_rows: (slabs, z rows, y boundaries, 4) volume and first moment beyond every boundary of the rows along
+            the y axis.
+        :param z_rows: (slabs, y rows, z boundaries, 4) volume and first moment beyond every boundary of the rows along
+            the z axis.
+        :param origin: Center of the first voxel of the grid.
+        :param voxel_size: Size of the voxels.
+        :param total_volume: Volume of the complete hull.
+        :param centroid: Centre of the volume of the complete hull.
+        """
+        self._y_rows = y_rows
+        self._z_rows = z_rows
+        self._origin = origin
+        self._voxel_size = voxel_size
+        self.total_volume = total_volume
+        self.centroid = centroid
+
+        self._totals = np.concatenate([[total_volume], centroid * total_volume])
+
+        # Coordinates of the centers of the voxels along every axis of the grid.
+        shape = (y_rows.shape[0], z_rows.shape[1], y_rows.shape[1])
+        self._positions = [origin[axis] + np.arange(shape[axis]) * voxel_size for axis in range(3)]
+
+        lower_corner = origin - voxel_size / 2
+        upper_corner = lower_corner + np.array(shape) * voxel_size
+        self.extent = float(np.linalg.norm(np.maximum(np.abs(lower_corner), np.abs(upper_corner))))
+
+        # The rows along y lie along z and the other way around.
+        self._row_lookups = {1: self._row_lookup(y_rows, 2), 2: self._row_lookup(z_rows, 1)}
+
+    def _row_lookup(self, rows: np.ndarray, row_axis: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Only the rows that contain part of the hull are looked up.
+        :return: The table with a row per boundary, the index of the first boundary of every row in it and the x and
+            row axis coordinates of the rows.
+        """
+        slabs, row_indices = np.nonzero(rows[:, :, 0, 0] > 0)
+        first_boundaries = (slabs * rows.shape[1] + row_indices) * rows.shape[2]
+        return rows.reshape(-1, 4), first_boundaries, self._positions[0][slabs], self._positions[row_axis][row_indices]
+
+    @staticmethod
+    def from_voxels(centers: np.ndarray, volumes: np.ndarray, voxel_size: float) -> 'HullVolume':
+        """
+        Precomputes the prefix sums of a voxelized hull.
+        :param centers: (N, 3) centers of the voxels in the robot frame, on a grid aligned with the axes of the robot.
+        :param volumes: (N,) volume of every voxel.
+        :param voxel_size: Size of the voxels.
+        """
+        origin = centers.min(axis=0)
+        indices = np.rint((centers - origin) / voxel_size).astype(int)
+
+        weights = np.concatenate([volumes[:, None], volumes[:, None] * centers], axis=1)
+        grid = np.zeros(tuple(indices.max(axis=0) + 1) + (4,))
+        np.add.at(grid, tuple(indices.T), weights)
+
+        total_volume = float(volumes.sum())
+        return HullVolume(y_rows=_beyond_boundaries(grid.transpose(0, 2, 1, 3)),
+                          z_rows=_beyond_boundaries(grid),
+                          origin=origin,
+                          voxel_size=voxel_size,
+                          total_volume=total_volume,
+                          centroid=weights[:, 1:].sum(axis=0) / total_volume)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Gives all the data as arrays, so it can be stored (see from_arrays).
+        """
+        return {
+            'y_rows': self._y_rows,
+            'z_rows': self._z_rows,
+            'origin': self._origin,
+            'parameters': np.array([self._voxel_size, self.total_volume]),
+            'centroid': self.centroid
+        }
+
+    @staticmethod
+    def from_arrays(arrays: Dict[str, np.ndarray]) -> 'HullVolume':
+        voxel_size, total_volume = arrays['parameters']
+        return HullVolume(arrays['y_rows'], arrays['z_rows'], arrays['origin'], float(voxel_size),
+                          float(total_volume), arrays['centroid'])
+
+    def submerged(self, down: np.ndarray, depth: float) -> Tuple[float, np.ndarray]:
+        """
+        Determines the part of the hull that is under water.
+        :param down: Unit vector pointing down (into the water) in the robot frame.
+        :param depth: Depth of the origin of the robot below the water surface.
+        :return: The submerged volume and its centre in the robot frame (the origin when nothing is submerged).
+        """
+        if depth >= self.extent:
+            return self.total_volume, self.centroid
+        if depth <= -self.extent:
+            return 0.0, np.zeros(3)
+
+        # The rows run along axis a of the cross section and lie along axis b.
+        a, b = (1, 2) if abs(down[1]) >= abs(down[2]) else (2, 1)
+        table, first_boundaries, row_x, row_b = self._row_lookups[a]
+
+        down_a = down[a]
+        if abs(down_a) < _MIN_CROSS_SECTION_TILT:
+            down_a = math.copysign(_MIN_CROSS_SECTION_TILT, down_a)
+
+        # Everything in a row where down_a * a > -depth - down_x * x - down_b * b is under water.
+        crossings = (-depth - down[0] * row_x - down[b] * row_b) / down_a
+
+        boundary_count = len(self._positions[a]) + 1
+        boundaries = (crossings - (self._origin[a] - self._voxel_size / 2)) / self._voxel_size
+        boundaries = np.clip(boundaries, 0, boundary_count - 1)
+        b0 = np.minimum(boundaries.astype(np.intp), boundary_count - 2)
+        boundary_weight = boundaries - b0
+
+        indices = first_boundaries + b0
+        totals = table.take(indices, axis=0).T.dot(1 - boundary_weight) \
+            + table.take(indices + 1, axis=0).T.dot(boundary_weight)
+
+        # When the down direction points backwards along the rows, the part before the crossing is under water.
+        if down_a < 0:
+            totals = self._totals - totals
+
+        volume = totals[0]
+        if volume <= 1e-12 * self.total_volume:
+            return 0.0, np.zeros(3)
+
+        return float(volume), totals[1:] / volume
+
+
+def _beyond_boundaries(rows: np.ndarray) -> np.ndarray:
+    """
+    Sums of everything beyond every boundary along the third axis, boundary i is before element i (so the last boundary
+    is after the last element and has nothing beyond it).
+    """
+    padded = np.concatenate([rows, np.zeros_like(rows[:, :, :1])], axis=2)
+    return np.cumsum(padded[:, :, ::-1], axis=2)[:, :, ::-1]
@@ -0,0 +1,134 @@
+from typing import Tuple, List
+
+import numpy as np
+
+# Bits per axis of the Morton codes, the grid of leaf blocks can be at most 2^21 blocks along every axis.
+_MORTON_BITS = 21
+
+# The tree stops at the level that has at most this amount of blocks, these are all tested in the first level.
+_MAX_TOP_LEVEL_BLOCKS = 8
+
+
+class PointOctree:
+    """
+    Coarse to fine grouping of points to quickly find the points on one side of a plane.
+
+    The points are grouped into cubic leaf blocks which are grouped into blocks of 2 x 2 x 2 blocks at every level above
+    it (an octree). The points are sorted in Morton order, so the points of every block at every level are a contiguous
+    range. A block that lies completely on one side of the plane is resolved with a single test (and the sum of its
+    points follows from prefix sums), only the blocks the plane cuts are refined and only the points of the leaf blocks
+    it cuts are tested individually.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: float):
+        """
+        PointOctree
+        :param points: (N, 3) points.
+        :param leaf_size: Size of the edges of the smallest blocks.
+        """
+        if leaf_size <= 0:
+            raise ValueError("The leaf size should be bigger than zero")
+
+        cells = np.floor((points - points.min(axis=0)) / leaf_size).astype(np.int64)
+        if cells.max(initial=0) >= 1 << _MORTON_BITS:
+            raise ValueError("The leaf size is too small for the extent of the points")
+
+        codes = _morton_codes(cells)
+        order = np.argsort(codes, kind='stable')
+
+        self.points = points[order]
+        codes = codes[order]
+
+        # Sum of all the points before every index, the sum of the points of a block is the difference of two of these.
+        self._point_sums = np.concatenate([np.zeros((1, 3)), np.cumsum(self.points, axis=0)])
+
+        # The levels from the leaves up to the top.
+        self._starts: List[np.ndarray] = []
+        self._ends: List[np.ndarray] = []
+        self._centers: List[np.ndarray] = []
+        self._half_sizes: List[np.ndarray] = []
+
+        keys = codes
+        while True:
+            block_keys, starts = np.unique(keys, return_index=True)
+            ends = np.append(starts[1:], len(keys))
+
+            minimums = np.minimum.reduceat(self.points, starts, axis=0)
+            maximums = np.maximum.reduceat(self.points, starts, axis=0)
+
+            self._starts.append(starts)
+            self._ends.append(ends)
+            self._centers.append((minimums + maximums) / 2)
+            self._half_sizes.append((maximums - minimums) / 2)
+
+            if len(block_keys) <= _MAX_TOP_LEVEL_BLOCKS:
+                break
+            keys = keys >> 3
+
+        # Range of the blocks one level lower that make up every block, for every level above the leaves.
+        self._children: List[Tuple[np.ndarray, np.ndarray]] = []
+        for level in range(1, len(self._starts)):
+            lower_starts = self._starts[level - 1]
+            first = np.searchsorted(lower_starts, self._starts[level])
+            last = np.searchsorted(lower_starts, self._ends[level])
+            self._children.append((first, last))
+
+    def above_plane(self, normal: np.ndarray, offset: float) -> Tuple[int, np.ndarray]:
+        """
+        Finds the points p for which normal . p + offset > 0.
+        :param normal: Normal of the plane.
+        :param offset: Offset of the plane.
+        :return: The amount of points above the plane and their sum.
+        """
+        absolute_normal = np.abs(normal)
+
+        count = 0
+        total = np.zeros(3)
+
+        level = len(self._starts) - 1
+        blocks = np.arange(len(self._starts[level]))
+        while len(blocks) > 0:
+            distances = self._centers[level][blocks].dot(normal) + offset
+            extents = self._half_sizes[level][blocks].dot(absolute_normal)
+
+            above = blocks[distances - extents > 0]
+            starts = self._starts[level][above]
+            ends = self._ends[level][above]
+            count += int((ends - starts).sum())
+            total += (self._point_sums[ends] - self._point_sums[starts]).sum(axis=0)
+
+            cut = blocks[(distances - extents <= 0) & (distances + extents > 0)]
+
+            if level == 0:
+                # Only the points of the leaf blocks that are cut by the plane are tested individually.
+                points = self.points[_concatenate_ranges(self._starts[0][cut], self._ends[0][cut])]
+                points = points[points.dot(normal) + offset > 0]
+                count += len(points)
+                total += points.sum(axis=0)
+                break
+
+            first, last = self._children[level - 1]
+            blocks = _concatenate_ranges(first[cut], last[cut])
+            level -= 1
+
+        return count, total
+
+
+def _concatenate_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Concatenation of np.arange(start, end) for all the ranges, without a loop.
+    """
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(lengths.sum()) + offsets
+
+
+def _morton_codes(cells: np.ndarray) -> np.ndarray:
+    """
+    Interleaves the bits of the x, y and z cell indices, so sorting by the code sorts the cells in octree order.
+    """
+    codes = np.zeros(len(cells), dtype=np.int64)
+    for bit in range(_MORTON_BITS):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> bit) & 1) << (3 * bit + axis)
+    return codes
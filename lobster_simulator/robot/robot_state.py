@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+
+
+class RobotState:
+    """
+    Kinematic state of a robot at one moment in time. It is fetched from Bullet once per step and shared by all the
+    subsystems (sensors, buoyancy, thrusters, damping) that need it, so they don't each have to query Bullet and convert
+    the result to NED again.
+    """
+
+    def __init__(self, position: Vec3, orientation: Quaternion, velocity: Optional[Vec3] = None,
+                 angular_velocity: Optional[Vec3] = None):
+        """
+        RobotState
+        :param position: Position of the robot in the world frame.
+        :param orientation: Orientation of the robot in the world frame.
+        :param velocity: Linear velocity in the world frame.
+        :param angular_velocity: Angular velocity in the world frame.
+        """
+        self.position: Vec3 = position
+        self.orientation: Quaternion = orientation
+        self.velocity: Optional[Vec3] = velocity
+        self.angular_velocity: Optional[Vec3] = angular_velocity
+
+        # Rotation matrix from the robot frame to the world frame.
+        self.rotation_matrix: np.ndarray = np.asarray(orientation.get_rotation_matrix(), dtype=float)
+        self.position_array: np.ndarray = position.numpy()
+
+        self.body_velocity: Optional[Vec3] = None
+        self.body_angular_velocity: Optional[Vec3] = None
+        if velocity is not None:
+            self.body_velocity = self.rotate_to_local(velocity)
+        if angular_velocity is not None:
+            self.body_angular_velocity = self.rotate_to_local(angular_velocity)
+
+    @staticmethod
+    def fetch(object_id: int, physics_client_id: Optional[int] = None) -> RobotState:
+        """
+        Gets the current state of a body from Bullet.
+        :param object_id: Id of the body.
+        :param physics_client_id: Physics client the body lives in.
+        """
+        position, orientation = PybulletAPI.getBasePositionAndOrientation(object_id,
+                                                                          physicsClientId=physics_client_id)
+        velocity, angular_velocity = PybulletAPI.getBaseVelocity(object_id, physicsClientId=physics_client_id)
+
+        return RobotState(position, orientation, velocity, angular_velocity)
+
+    def local_to_world(self, local_vec: Vec3) -> Vec3:
+        """
+        Converts a position in the robot frame to the world frame.
+        """
+        return Vec3(self.rotation_matrix.dot(local_vec.numpy()) + self.position_array)
+
+    def local_to_world_array(self, local_points: np.ndarray) -> np.ndarray:
+        """
+        Converts an (N, 3) array of positions in the robot frame to the world frame.
+        """
+        return local_points.dot(self.rotation_matrix.T) + self.position_array
+
+    def world_to_local(self, world_vec: Vec3) -> Vec3:
+        """
+        Converts a position in the world frame to the robot frame.
+        """
+        return Vec3(self.rotation_matrix.T.dot(world_vec.numpy() - self.position_array))
+
+    def rotate_to_world(self, local_vec: Vec3) -> Vec3:
+        """
+        Rotates a vector (for example a force or velocity) from the robot frame to the world frame.
+        """
+        return Vec3(self.rotation_matrix.dot(local_vec.numpy()))
+
+    def rotate_to_local(self, world_vec: Vec3) -> Vec3:
+        """
+        Rotates a vector (for example a force or velocity) from the world frame to the robot frame.
+        """
+        return Vec3(self.rotation_matrix.T.dot(world_vec.numpy()))
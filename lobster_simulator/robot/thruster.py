@@ -1,9 +1,11 @@
+from typing import Tuple
+
 from lobster_simulator.common.calculations import clip
 from lobster_common.vec3 import Vec3
 from lobster_simulator.environment.water_surface import WaterSurface
 from lobster_simulator.robot import auv
+from lobster_simulator.robot.robot_state import RobotState
 from lobster_simulator.common.simulation_time import SimulationTime
-from lobster_simulator.common import translation
 from lobster_common.constants import *
 from lobster_simulator.common.debug_visualization import DebugLine
 from lobster_simulator.common.pybullet_api import PybulletAPI, Frame
@@ -33,7 +35,8 @@ class Thruster:
         # This is needed to be able to only actually start producing thrust once the minimum thrust is exceeded.
         self._theoretical_thrust = 0
 
-        self._motor_debug_line = DebugLine(self._position, self._position, parentIndex=robot._object_id, color=[0, 0, 1])
+        self._motor_debug_line = DebugLine(self._position, self._position, parentIndex=robot._object_id, color=[0, 0, 1],
+                                           physics_client_id=robot.physics_client_id)
 
     def set_desired_thrust(self, desired_thrust: float) -> None:
         self._desired_thrust = clip(desired_thrust, -self._maximum_backward_thrust, self._maximum_forward_thrust)
@@ -42,10 +45,11 @@ class Thruster:
     def current_thrust(self) -> float:
         return self._theoretical_thrust if abs(self._theoretical_thrust) >= self._minimum_thrust else 0.0
 
-    def _update(self, dt: SimulationTime):
+    def _update(self, dt: SimulationTime, state: RobotState):
         """
 
         :param dt: Delta time
+        :param state: Current state of the robot
         """
         if abs(self._desired_thrust - self._theoretical_thrust) <= self._maximum_delta_thrust_per_second * dt.seconds:
             self._theoretical_thrust = self._desired_thrust
@@ -57,13 +61,14 @@ class Thruster:
         self._theoretical_thrust = clip(self._theoretical_thrust, -self._maximum_backward_thrust,
                                         self._maximum_forward_thrust)
 
-        world_position = translation.vec3_local_to_world_id(self._robot.object_id, self._position)
+        world_position = state.local_to_world(self._position)
         if world_position[Z] > WaterSurface.water_height(world_position[X], world_position[Y]):
 
             PybulletAPI.applyExternalForce(objectUniqueId=self._robot.object_id,
                                            forceObj=self._direction * self.current_thrust,
                                            posObj=self._position,
-                                           frame=Frame.LINK_FRAME)
+                                           frame=Frame.LINK_FRAME,
+                                           physicsClientId=self._robot.physics_client_id)
 
             debug_line_color = [0, 0, 1]  # Debug line color is blue when the thruster is in the water
         else:
@@ -76,6 +81,15 @@ class Thruster:
                                       self._robot.object_id,
                                       color=debug_line_color)
 
+    def save_state(self) -> Tuple[float, float]:
+        """
+        Captures the state of the thruster (desired thrust and the thrust it is ramping towards it).
+        """
+        return self._desired_thrust, self._theoretical_thrust
+
+    def restore_state(self, state: Tuple[float, float]) -> None:
+        self._desired_thrust, self._theoretical_thrust = state
+
     def remove(self):
         self._motor_debug_line.remove()
 
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from lobster_simulator.robot.auv import AUV
+
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.sensors.sensor import Sensor
+
+# Frames are big, so only a few of them are kept until they are popped.
+DEFAULT_CAMERA_BUFFER_CAPACITY = 8
+
+
+class Camera(Sensor):
+    """
+    Camera that renders the scene with the software renderer of Bullet, so it also works in DIRECT mode.
+
+    The projection matrix only depends on the intrinsics of the camera, so it is computed once. The view matrix is only
+    recomputed when the pose of the robot changed since the last frame. Frames are written into a preallocated array of
+    frames that is used as a ring, the buffer of the sensor only stores the number of the frame, so popped frames are
+    views that stay valid until the frame is overwritten (after buffer_capacity newer frames).
+
+    Rendering is expensive, so the camera should run at a low rate, and the downscale parameter renders a smaller image
+    for cheap runs (for example on CI). No frames are rendered at all when the camera isn't polled and has no
+    subscribers.
+    """
+
+    # The frames themselves aren't part of the state, they are too big to copy on every snapshot. After a snapshot is
+    #  restored, the frames that were queued then can show frames that were rendered after the snapshot was taken.
+    _STATE_ATTRIBUTES = Sensor._STATE_ATTRIBUTES + ['_frame_count']
+
+    def __init__(self, robot: AUV, position: Vec3, time_step: SimulationTime, time: SimulationTime,
+                 orientation: Quaternion = None, width: int = 320, height: int = 240, fov: float = 60,
+                 near: float = 0.05, far: float = 50, downscale: int = 1, depth: bool = False,
+                 buffer_capacity: int = DEFAULT_CAMERA_BUFFER_CAPACITY):
+        """
+        Camera
+        :param robot: Robot the camera is attached to.
+        :param position: Position of the camera on the robot.
+        :param time_step: Time between two frames.
+        :param time: Current time of the simulator.
+        :param orientation: Orientation of the camera on the robot, the camera looks along its x axis with its z axis
+            pointing down in the image.
+        :param width: Width of the image in pixels.
+        :param height: Height of the image in pixels.
+        :param fov: Vertical field of view in degrees.
+        :param near: Distance of the near clipping plane in meters.
+        :param far: Distance of the far clipping plane in meters, this is the maximum depth.
+        :param downscale: The width and the height are divided by this, to render at a lower resolution.
+        :param depth: Whether the camera also gives the depth of every pixel in meters.
+        :param buffer_capacity: Amount of frames that are kept until they are popped.
+        """
+        if downscale < 1:
+            raise ValueError("The downscale factor should be at least 1")
+
+        if orientation is None:
+            orientation = PybulletAPI.getQuaternionFromEuler(Vec3([0, 0, 0]))
+
+        self.width = max(1, width // downscale)
+        self.height = max(1, height // downscale)
+        self.near = near
+        self.far = far
+
+        self._camera_to_robot = np.asarray(orientation.get_rotation_matrix(), dtype=float)
+        self._projection_matrix = PybulletAPI.computeProjectionMatrixFOV(fov, self.width / self.height, near, far)
+
+        # The view matrix with the pose of the robot it belongs to.
+        self._view_matrix: Optional[List[float]] = None
+        self._view_pose: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        self._frames = np.zeros((buffer_capacity, self.height, self.width, 3), dtype=np.uint8)
+        self._depths = np.zeros((buffer_capacity, self.height, self.width), dtype=np.float32) if depth else None
+        self._frame_count = 0
+
+        super().__init__(robot, position=position, time_step=time_step, time=time, orientation=orientation,
+                         noise_stds=None, buffer_capacity=buffer_capacity)
+
+    # The camera doesn't use the base sensor update method, because interpolating between frames isn't meaningful.
+    def update(self, time: SimulationTime, dt: SimulationTime) -> None:
+        self._has_new_value = False
+
+        if self._next_sample_time <= time:
+            sample_times = np.arange(self._next_sample_time.microseconds, time.microseconds + 1,
+                                     self._time_step.microseconds, dtype=np.int64)
+            self._next_sample_time = SimulationTime(int(sample_times[-1])) + self._time_step
+
+            if self.generates_samples:
+                # Only the newest frame that is due is rendered, since they would all show the same scene.
+                self._add_samples(sample_times[-1:], np.array([[self._render()]], dtype=float))
+
+        self._previous_update_time = SimulationTime(time.microseconds)
+
+        self._dispatch()
+
+    def _render(self) -> int:
+        """
+        Renders a frame into the next slot of the frames.
+        :return: The number of the frame.
+        """
+        state = self._robot.state
+        pose = (state.position_array, state.rotation_matrix)
+        if self._view_pose is None or not (np.array_equal(pose[0], self._view_pose[0])
+                                           and np.array_equal(pose[1], self._view_pose[1])):
+            position = state.local_to_world_array(self._sensor_position.numpy()[None, :])[0]
+            self._view_matrix = PybulletAPI.computeViewMatrixFromPose(position,
+                                                                      state.rotation_matrix.dot(self._camera_to_robot))
+            self._view_pose = (pose[0].copy(), pose[1].copy())
+
+        rgba, depth_buffer = PybulletAPI.getCameraImage(self.width, self.height, self._view_matrix,
+                                                        self._projection_matrix,
+                                                        physicsClientId=self._physics_client_id)
+
+        frame_number = self._frame_count
+        slot = frame_number % len(self._frames)
+        np.copyto(self._frames[slot], rgba[:, :, :3])
+        if self._depths is not None:
+            # The depth buffer is non linear, this turns it into the distance along the viewing direction.
+            np.divide(self.far * self.near, self.far - (self.far - self.near) * depth_buffer, out=self._depths[slot])
+
+        self._frame_count += 1
+        return frame_number
+
+    def get_frame(self) -> Optional[Tuple[float, np.ndarray]]:
+        """
+        Gives the latest frame, if the last update rendered one.
+        :return: The time in seconds and the (height, width, 3) RGB image.
+        """
+        value = self.get_latest_value()
+        if value is None:
+            return None
+
+        return value[0], value[1][0]
+
+    @property
+    def frame_shape(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    def _get_real_values(self, dt: SimulationTime) -> List[float]:
+        # The number of the frame stands in for the frame itself.
+        return [float(self._frame_count)]
+
+    def _unpack(self, row: np.ndarray) -> List[np.ndarray]:
+        slot = int(row[0]) % len(self._frames)
+        if self._depths is None:
+            return [self._frames[slot]]
+        return [self._frames[slot], self._depths[slot]]
+
+    @property
+    def sample_dtype(self) -> np.dtype:
+        fields = [('time', np.int64), ('frame', np.int64), ('image', np.uint8, (self.height, self.width, 3))]
+        if self._depths is not None:
+            fields.append(('depth', np.float32, (self.height, self.width)))
+        return np.dtype(fields)
+
+    def _to_records(self, times: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        records = np.empty(len(times), dtype=self.sample_dtype)
+        records['time'] = times
+        records['frame'] = samples[:, 0]
+
+        slots = records['frame'] % len(self._frames)
+        records['image'] = self._frames[slots]
+        if self._depths is not None:
+            records['depth'] = self._depths[slots]
+        return records
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import math
-from typing import List, TYPE_CHECKING, Optional
+from typing import List, TYPE_CHECKING, Optional, Dict, Any, Tuple
+
+import numpy as np
 
 from lobster_simulator.common.calculations import *
 from lobster_simulator.common.pybullet_api import PybulletAPI
@@ -20,20 +22,24 @@ MAXIMUM_ALTITUDE = 50  # meters
 MINIMUM_TIME_STEP = SimulationTime(int(seconds_to_microseconds(1 / 26)))
 MAXIMUM_TIME_STEP = SimulationTime(int(seconds_to_microseconds(1 / 4)))
 
+# The numerical fields of the output of the DVL, in the order they are stored in the sensor buffer.
+_SAMPLE_FIELDS = ['time', 'vx', 'vy', 'vz', 'altitude', 'velocity_valid']
+
+# Length of the ray that measures the actual altitude of the robot, the ray itself is twice as long.
+_ALTITUDE_RAY_LENGTH = 100
+
 RED = [1, 0, 0]
 GREEN = [0, 1, 0]
 
 
 class DVL(Sensor):
 
+    _STATE_ATTRIBUTES = Sensor._STATE_ATTRIBUTES + ['_previous_altitudes', '_previous_velocity']
+
     def __init__(self, robot: AUV, position: Vec3, time_step: SimulationTime, time: SimulationTime,
                  orientation: Quaternion = None):
-        super().__init__(robot, position=position, time_step=time_step, orientation=orientation, noise_stds=None,
-                         time=time)
-
-        self._previous_altitudes = [2 * MAXIMUM_ALTITUDE, 2 * MAXIMUM_ALTITUDE, 2 * MAXIMUM_ALTITUDE,
-                                    2 * MAXIMUM_ALTITUDE]
-        self._previous_velocity = Vec3([0, 0, 0])
+        if orientation is None:
+            orientation = PybulletAPI.getQuaternionFromEuler(Vec3([0, 0, 0]))
 
         angle = math.radians(22.5)
         beam_offset = 50 * math.tan(angle)
@@ -44,30 +50,32 @@ class DVL(Sensor):
             Vec3([-beam_offset, 0, 50])
         ]
 
+        # The rays of the 4 beams and the ray that measures the actual altitude (see AUV.get_altitude) in the robot
+        #  frame, so they can be cast in one batch. The beam rays are twice as long as the range of the dvl, because
+        #  this makes it possible to smoothly interpolate between the transition between not having a lock and having a
+        #  lock.
+        beam_ends = [vec3_local_to_world(position, orientation, 2 * end_point) for end_point in self.beam_end_points]
+        self._ray_starts = np.array([position.numpy()] * 4 + [[0, 0, 0]])
+        self._ray_ends = np.array([end.numpy() for end in beam_ends] + [[0, 0, 2 * _ALTITUDE_RAY_LENGTH]])
+
+        super().__init__(robot, position=position, time_step=time_step, orientation=orientation, noise_stds=None,
+                         time=time)
+
+        self._previous_altitudes = [2 * MAXIMUM_ALTITUDE, 2 * MAXIMUM_ALTITUDE, 2 * MAXIMUM_ALTITUDE,
+                                    2 * MAXIMUM_ALTITUDE]
+        self._previous_velocity = Vec3([0, 0, 0])
+
         self.beamVisualizers = [DebugLine(self._sensor_position, self.beam_end_points[i], color=[1, 0, 0], width=2,
-                                          parentIndex=self._robot.object_id) for i in range(4)]
+                                          parentIndex=self._robot.object_id,
+                                          physics_client_id=self._physics_client_id) for i in range(4)]
 
     # The dvl doesn't use the base sensor update method, because it has a variable frequency which is not supported.
     def update(self, time: SimulationTime, dt: SimulationTime) -> None:
 
-        altitudes = list()
-
-        actual_altitude, current_velocity = self._get_real_values(dt)
+        altitudes, actual_altitude = self._cast_rays()
+        current_velocity = self._robot.state.velocity
 
         for i in range(4):
-            # The raytest endpoint is twice as far as the range of the dvl, because this makes it possible to
-            # smoothly interpolate between the transition between not having a lock and having a lock
-            raytest_endpoint = 2 * self.beam_end_points[i]
-
-            auv_frame_endpoint = vec3_local_to_world(self._sensor_position, self._sensor_orientation,
-                                                     raytest_endpoint)
-            world_frame_endpoint = vec3_local_to_world(self._robot.get_position(), self._robot.get_orientation(),
-                                                       auv_frame_endpoint)
-
-            result = PybulletAPI.rayTest(self._get_position(), world_frame_endpoint)
-
-            altitudes.append(result[0] * 2 * MAXIMUM_ALTITUDE)
-
             # Change the color of the beam visualizer only if the state of the lock changes.
             if (self._previous_altitudes[i] >= MAXIMUM_ALTITUDE) != (altitudes[i] >= MAXIMUM_ALTITUDE):
                 color = RED if altitudes[i] >= MAXIMUM_ALTITUDE else GREEN
@@ -75,7 +83,7 @@ class DVL(Sensor):
                 self.beamVisualizers[i].update(self._sensor_position, self.beam_end_points[i], color=color,
                                                frame_id=self._robot.object_id)
 
-        self._queue = list()
+        self._has_new_value = False
 
         while self._next_sample_time <= time:
             interpolated_altitudes = list()
@@ -95,9 +103,9 @@ class DVL(Sensor):
             else:
                 interpolated_velocity = Vec3((0, 0, 0))
 
-            self._queue.append(
-                (
-                    self._next_sample_time.seconds,
+            if self.generates_samples:
+                self._add_sample(
+                    self._next_sample_time,
                     {
                         'time': self._time_step.milliseconds,
                         'vx': interpolated_velocity[X],
@@ -108,7 +116,6 @@ class DVL(Sensor):
                         "format": "json_v1"
                     }
                 )
-            )
 
             # The timestep of the DVL depends on the altitude (higher altitude is lower frequency)
             if actual_altitude is None:
@@ -128,19 +135,67 @@ class DVL(Sensor):
         self._previous_altitudes = altitudes
         self._previous_velocity = current_velocity
 
+        self._dispatch()
+
+    def _sample_width(self) -> int:
+        return len(_SAMPLE_FIELDS)
+
+    def _pack(self, value: Dict[str, Any]) -> np.ndarray:
+        # A missing altitude is stored as nan.
+        return np.array([np.nan if value[field] is None else value[field] for field in _SAMPLE_FIELDS], dtype=float)
+
+    def _unpack(self, row: np.ndarray) -> Dict[str, Any]:
+        value = {field: float(row[i]) for i, field in enumerate(_SAMPLE_FIELDS)}
+        if math.isnan(value['altitude']):
+            value['altitude'] = None
+        value['velocity_valid'] = bool(value['velocity_valid'])
+        value['format'] = "json_v1"
+        return value
+
+    @property
+    def sample_dtype(self) -> np.dtype:
+        # The time of the sample is called time, so the time step of the dvl (the 'time' of the json output) is called
+        #  time_step.
+        return np.dtype([('time', np.int64), ('time_step', np.float64), ('vx', np.float64), ('vy', np.float64),
+                         ('vz', np.float64), ('altitude', np.float64), ('velocity_valid', np.bool_)])
+
+    def _to_records(self, times: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        records = np.empty(len(times), dtype=self.sample_dtype)
+        records['time'] = times
+        for name, column in zip(records.dtype.names[1:], samples.T):
+            records[name] = column
+        return records
+
     def _get_position(self):
         """Returns the position of the DVL in the world frame."""
-        return vec3_local_to_world(self._robot.get_position(), self._robot.get_orientation(), self._sensor_position)
+        return self._robot.state.local_to_world(self._sensor_position)
 
-    def _get_real_values(self, dt: SimulationTime) -> List:
+    def _cast_rays(self) -> Tuple[List[float], Optional[float]]:
+        """
+        Casts the rays of the 4 beams and the ray for the actual altitude in a single batch.
+        :return: The altitudes measured by the beams (twice the maximum altitude when they don't hit anything) and the
+            actual altitude of the dvl (None when it is out of range).
+        """
+        state = self._robot.state
+        _, hit_fractions, _, _ = PybulletAPI.rayTestBatch(state.local_to_world_array(self._ray_starts),
+                                                          state.local_to_world_array(self._ray_ends),
+                                                          physicsClientId=self._physics_client_id)
+
+        altitudes = (hit_fractions[:4] * 2 * MAXIMUM_ALTITUDE).tolist()
 
-        robot_altitude = self._robot.get_altitude()
-        if robot_altitude is not None:
-            altitude = robot_altitude - self._sensor_position[Z]
+        # Same as AUV.get_altitude
+        robot_altitude = hit_fractions[4] * _ALTITUDE_RAY_LENGTH
+        if robot_altitude >= _ALTITUDE_RAY_LENGTH:
+            actual_altitude = None
         else:
-            altitude = None
+            actual_altitude = robot_altitude - self._sensor_position[Z]
+
+        return altitudes, actual_altitude
+
+    def _get_real_values(self, dt: SimulationTime) -> List:
+        _, altitude = self._cast_rays()
 
-        velocity = self._robot.get_velocity()
+        velocity = self._robot.state.velocity
 
         return [altitude, velocity]
 
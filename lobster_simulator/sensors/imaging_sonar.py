@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from lobster_simulator.robot.auv import AUV
+
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common.simulation_time import SimulationTime, microseconds_to_seconds
+from lobster_simulator.sensors.sensor import Sensor
+
+# Imaging sonars produce big samples, so only a few of them are kept until they are popped.
+DEFAULT_SONAR_BUFFER_CAPACITY = 32
+
+
+class ImagingSonar(Sensor):
+    """
+    Forward looking imaging sonar: a fan of beams around the x axis of the sensor that measures the range and the
+    intensity of the echo of every beam.
+
+    The directions of the beams are computed once in the frame of the robot, so every ping is a single transformation
+    of all the beams to the world frame and a single (multi threaded) batch of ray casts. The intensity of an echo is the
+    cosine of the angle between the beam and the surface it hits. Beams without an echo have a range of nan and an
+    intensity of 0.
+    """
+
+    OUTPUT_NAMES = ['range', 'intensity']
+
+    def __init__(self, robot: AUV, position: Vec3, time_step: SimulationTime, time: SimulationTime,
+                 orientation: Quaternion = None, horizontal_beams: int = 256, vertical_beams: int = 1,
+                 horizontal_fov: float = math.radians(130), vertical_fov: float = math.radians(20),
+                 max_range: float = 50, buffer_capacity: int = DEFAULT_SONAR_BUFFER_CAPACITY):
+        """
+        ImagingSonar
+        :param robot: Robot the sonar is attached to.
+        :param position: Position of the sonar on the robot.
+        :param time_step: Time between two pings.
+        :param time: Current time of the simulator.
+        :param orientation: Orientation of the sonar on the robot, the sonar looks along its x axis.
+        :param horizontal_beams: Amount of beams in the horizontal direction (the columns of the images).
+        :param vertical_beams: Amount of beams in the vertical direction (the rows of the images).
+        :param horizontal_fov: Horizontal field of view in radians.
+        :param vertical_fov: Vertical field of view in radians, it isn't used when there is only 1 vertical beam.
+        :param max_range: Range of the sonar in meters.
+        :param buffer_capacity: Amount of images that are kept until they are popped.
+        """
+        if horizontal_beams < 1 or vertical_beams < 1:
+            raise ValueError("The sonar should have at least one beam in both directions")
+        if max_range <= 0:
+            raise ValueError("The range of the sonar should be bigger than zero")
+
+        if orientation is None:
+            orientation = PybulletAPI.getQuaternionFromEuler(Vec3([0, 0, 0]))
+
+        self.max_range = max_range
+        self.image_shape = (vertical_beams, horizontal_beams)
+
+        # Directions of the beams in the sensor frame (x forward, y right, z down), row by row.
+        azimuths = _beam_angles(horizontal_beams, horizontal_fov)
+        elevations = _beam_angles(vertical_beams, vertical_fov)
+        elevation, azimuth = np.meshgrid(elevations, azimuths, indexing='ij')
+        directions = np.stack([np.cos(elevation) * np.cos(azimuth),
+                               np.cos(elevation) * np.sin(azimuth),
+                               np.sin(elevation)], axis=-1).reshape(-1, 3)
+
+        # The beam table in the robot frame.
+        sensor_to_robot = np.asarray(orientation.get_rotation_matrix(), dtype=float)
+        self._beam_directions = directions.dot(sensor_to_robot.T)
+        self._ray_starts = np.broadcast_to(position.numpy(), self._beam_directions.shape)
+        self._ray_ends = self._ray_starts + self._beam_directions * max_range
+
+        # The images are written in place on every ping.
+        self.range_image = np.full(self.image_shape, np.nan)
+        self.intensity_image = np.zeros(self.image_shape)
+
+        super().__init__(robot, position=position, time_step=time_step, time=time, orientation=orientation,
+                         noise_stds=None, buffer_capacity=buffer_capacity)
+
+    # The sonar doesn't use the base sensor update method, because interpolating between images isn't meaningful.
+    def update(self, time: SimulationTime, dt: SimulationTime) -> None:
+        self._has_new_value = False
+
+        if self._next_sample_time <= time:
+            sample_times = np.arange(self._next_sample_time.microseconds, time.microseconds + 1,
+                                     self._time_step.microseconds, dtype=np.int64)
+            self._next_sample_time = SimulationTime(int(sample_times[-1])) + self._time_step
+
+            if self.generates_samples:
+                # A single ping is enough for all the samples that are due, usually that is only one.
+                self._ping()
+                row = self._pack([self.range_image, self.intensity_image])
+                self._add_samples(sample_times, np.broadcast_to(row, (len(sample_times), len(row))))
+
+        self._previous_update_time = SimulationTime(time.microseconds)
+
+        self._dispatch()
+
+    def _ping(self) -> None:
+        """
+        Casts all the beams and writes the result into the images.
+        """
+        state = self._robot.state
+        object_ids, hit_fractions, _, hit_normals = PybulletAPI.rayTestBatch(
+            state.local_to_world_array(self._ray_starts),
+            state.local_to_world_array(self._ray_ends),
+            physicsClientId=self._physics_client_id)
+
+        hit = (object_ids >= 0).reshape(self.image_shape)
+
+        ranges = self.range_image.reshape(-1)
+        np.multiply(hit_fractions, self.max_range, out=ranges)
+        self.range_image[~hit] = np.nan
+
+        world_directions = self._beam_directions.dot(state.rotation_matrix.T)
+        intensities = self.intensity_image.reshape(-1)
+        np.abs(np.einsum('ij,ij->i', hit_normals, world_directions), out=intensities)
+        self.intensity_image[~hit] = 0
+
+    def get_image(self) -> Optional[Tuple[float, np.ndarray, np.ndarray]]:
+        """
+        Gives the latest image, if the last update pinged.
+        :return: The time in seconds, the range image and the intensity image. The images are reused on every ping.
+        """
+        if not self._has_new_value:
+            return None
+
+        return microseconds_to_seconds(self._latest_sample[0]), self.range_image, self.intensity_image
+
+    def _get_real_values(self, dt: SimulationTime) -> List[np.ndarray]:
+        self._ping()
+        return [self.range_image.copy(), self.intensity_image.copy()]
+
+    def _unpack(self, row: np.ndarray) -> List[np.ndarray]:
+        size = self.range_image.size
+        return [row[:size].reshape(self.image_shape), row[size:].reshape(self.image_shape)]
+
+    @property
+    def sample_dtype(self) -> np.dtype:
+        return np.dtype([('time', np.int64), ('range', np.float64, self.image_shape),
+                         ('intensity', np.float64, self.image_shape)])
+
+    def _to_records(self, times: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        records = np.empty(len(times), dtype=self.sample_dtype)
+        records['time'] = times
+
+        size = self.range_image.size
+        records['range'] = samples[:, :size].reshape((-1,) + self.image_shape)
+        records['intensity'] = samples[:, size:].reshape((-1,) + self.image_shape)
+        return records
+
+
+def _beam_angles(count: int, fov: float) -> np.ndarray:
+    """
+    Angles of the centers of count beams that evenly divide the field of view.
+    """
+    return (np.arange(count) + 0.5 - count / 2) * fov / count
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Union, Optional, Tuple, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from lobster_simulator.robot.auv import AUV
+
+from lobster_common.constants import *
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.calculations import quadratic_interpolation_weights, interpolate_rotations
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common.simulation_time import SimulationTime, MICROSECONDS_IN_SECONDS, microseconds_to_seconds
+from lobster_simulator.sensors.sensor import Sensor, Interpolation
+
+# Index of the outputs of the IMU.
+ACCELEROMETER = 0
+GYROSCOPE = 1
+MAGNETOMETER = 2
+
+MagneticFieldVec3 = Vec3(MAGNETIC_FIELD)
+
+# The gravity the accelerometer measures when the robot stays in the same position (pointing up in ENU).
+_GRAVITY_ACCELERATION = Vec3.fromENU([0, 0, GRAVITY]).numpy()
+
+
+class IMU(Sensor):
+    """
+    Accelerometer, gyroscope and magnetometer at the same position on the robot, sampled at the same time.
+
+    The three vectors are rotated from the world frame to the frame of the sensor with a single matrix, and they share
+    one interpolation and noise pipeline. The separate sensors are available as thin views (accelerometer, gyroscope and
+    magnetometer).
+
+    With quadratic interpolation the samples aren't interpolated from the outputs of the last physics steps, but from
+    the motion of the robot: the acceleration is the derivative of the parabola through the last three velocities (so
+    it integrates exactly to the change in velocity over a step), the angular velocity follows the parabola through the
+    last three angular velocities and the orientation rotates uniformly between the last two steps. This gives
+    realistic high rate output while the physics runs at a much lower rate.
+    """
+
+    OUTPUT_NAMES = ['acceleration', 'angular_velocity', 'magnetic_field']
+
+    _STATE_ATTRIBUTES = Sensor._STATE_ATTRIBUTES + ['_previous_linear_velocity', '_motion_history', '_view_positions']
+
+    def __init__(self, robot: AUV, position: Vec3, time_step: SimulationTime, time: SimulationTime,
+                 orientation: Quaternion = None, noise_stds: Union[List[float], float] = None,
+                 noise_seed: Optional[Union[int, np.random.SeedSequence]] = None,
+                 interpolation: Interpolation = Interpolation.LINEAR):
+        """
+        IMU
+        :param noise_stds: Standard deviation of the noise of the acceleration, the angular velocity and the magnetic
+            field.
+        :param noise_seed: Seed of the random generator of the noise.
+        :param interpolation: How the samples between two updates are computed.
+        """
+        if orientation is None:
+            orientation = PybulletAPI.getQuaternionFromEuler(Vec3([0, 0, 0]))
+
+        # Rotation from the robot frame to the sensor frame.
+        self._robot_to_sensor = np.asarray(orientation.get_rotation_matrix(), dtype=float).T
+
+        self._previous_linear_velocity = Vec3([0, 0, 0])
+
+        # Time in microseconds, velocity, rotation matrix and angular velocity of the robot on the last two updates.
+        self._motion_history: List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]] = []
+
+        super().__init__(robot, position=position, time_step=time_step, time=time, orientation=orientation,
+                         noise_stds=noise_stds, noise_seed=noise_seed, interpolation=interpolation)
+
+        # Every view reads the buffer from its own position (see RingBuffer.read), so the IMU and each of the views pop
+        #  every sample once, independent of each other.
+        self._view_positions: List[int] = [self._buffer.written] * len(self._output_sizes)
+        self._view_columns = np.cumsum([0] + self._output_sizes)
+
+        self.accelerometer = AccelerometerView(self)
+        self.gyroscope = GyroscopeView(self)
+        self.magnetometer = MagnetometerView(self)
+
+    def update(self, time: SimulationTime, dt: SimulationTime):
+        super().update(time, dt)
+
+        state = self._robot.state
+        self._previous_linear_velocity = state.velocity
+        self._motion_history = self._motion_history[-1:] + [(time.microseconds, state.velocity.numpy(),
+                                                              state.rotation_matrix, state.angular_velocity.numpy())]
+
+    def _interpolate(self, sample_times: np.ndarray, time: SimulationTime, real_values: List[Vec3]) -> np.ndarray:
+        if not self._uses_quadratic_interpolation() or len(self._motion_history) < 2:
+            return super()._interpolate(sample_times, time, real_values)
+
+        state = self._robot.state
+        (older_time, older_velocity, _, older_angular_velocity), \
+            (previous_time, previous_velocity, previous_rotation, previous_angular_velocity) = self._motion_history
+        times = [older_time, previous_time, time.microseconds]
+
+        velocities = np.stack([older_velocity, previous_velocity, state.velocity.numpy()])
+        accelerations = quadratic_interpolation_weights(times, sample_times, derivative=True).dot(velocities) \
+            * MICROSECONDS_IN_SECONDS + _GRAVITY_ACCELERATION
+
+        angular_velocities = quadratic_interpolation_weights(times, sample_times).dot(
+            np.stack([older_angular_velocity, previous_angular_velocity, state.angular_velocity.numpy()]))
+
+        fractions = (sample_times - previous_time) / (time.microseconds - previous_time)
+        rotations = interpolate_rotations(previous_rotation, state.rotation_matrix, fractions)
+
+        # (N, output, component) vectors in the world frame, rotated to the sensor frame of every sample.
+        world_vectors = np.stack([accelerations, angular_velocities,
+                                  np.broadcast_to(MagneticFieldVec3.numpy(), accelerations.shape)], axis=1)
+        robot_vectors = np.einsum('nji,nkj->nki', rotations, world_vectors)
+        sensor_vectors = np.einsum('ij,nkj->nki', self._robot_to_sensor, robot_vectors)
+
+        return sensor_vectors.reshape(len(sample_times), -1)
+
+    def _pop_view_samples(self, output: int, count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pops the samples of one output for its view, from the position of the view in the buffer. The samples that were
+        overwritten before the view popped them are skipped.
+        :param count: Maximum amount of samples to pop, all of them when None.
+        :return: Views of the times in microseconds and the values of the output, from oldest to newest.
+        """
+        position = max(self._view_positions[output], self._buffer.oldest_position)
+        times, values = self._buffer.read(position, count)
+        self._view_positions[output] = position + len(times)
+
+        return times, values[:, self._view_columns[output]:self._view_columns[output + 1]]
+
+    def _oldest_needed_sample(self) -> Optional[int]:
+        return min(self._view_positions)
+
+    def _get_real_values(self, dt: SimulationTime) -> List[Vec3]:
+        state = self._robot.state
+
+        acceleration = (state.velocity - self._previous_linear_velocity).numpy() * MICROSECONDS_IN_SECONDS \
+            / dt.microseconds + _GRAVITY_ACCELERATION
+
+        # The three vectors in the world frame as columns, rotated to the sensor frame at once.
+        world_vectors = np.column_stack([acceleration, state.angular_velocity.numpy(), MagneticFieldVec3.numpy()])
+        sensor_vectors = self._robot_to_sensor.dot(state.rotation_matrix.T).dot(world_vectors)
+
+        return [Vec3(sensor_vectors[:, ACCELEROMETER].tolist()),
+                Vec3(sensor_vectors[:, GYROSCOPE].tolist()),
+                Vec3(sensor_vectors[:, MAGNETOMETER].tolist())]
+
+
+class IMUView:
+    """
+    One of the outputs of an IMU, so it can be used like a separate sensor. The values are read from the buffer of the
+    IMU, but the view keeps its own position in it: the IMU and each of its views can pop every value once, no matter in
+    which order they are popped. Like the IMU, a view only keeps the newest values up to the capacity of the buffer.
+    """
+
+    def __init__(self, imu: IMU, output: int):
+        self._imu = imu
+        self._output = output
+
+    def get_latest_value(self) -> Optional[Tuple[float, List[Vec3]]]:
+        value = self._imu.get_latest_value()
+        if value is None:
+            return None
+
+        return value[0], [value[1][self._output]]
+
+    def pop_next_value(self) -> Optional[Tuple[float, List[Vec3]]]:
+        """Pops the oldest value of this output"""
+        times, values = self._imu._pop_view_samples(self._output, 1)
+        if len(times) == 0:
+            return None
+        return microseconds_to_seconds(int(times[0])), [Vec3(values[0].tolist())]
+
+    def pop_all_values(self) -> List[Tuple[float, List[Vec3]]]:
+        """Gives a list with all the values of this output, from oldest to newest."""
+        times, values = self.drain()
+        return [(microseconds_to_seconds(int(time)), [Vec3(row.tolist())]) for time, row in zip(times, values)]
+
+    def drain(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Removes all the values of this output at once, see Sensor.drain.
+        :return: The (N,) times in microseconds and the (N, 3) values, from oldest to newest.
+        """
+        return self._imu._pop_view_samples(self._output)
+
+    def get_value(self) -> Vec3:
+        """
+        The real (noise free) value on the latest update.
+        """
+        return self._imu._previous_real_value[self._output]
+
+    @property
+    def sensor_position(self) -> Vec3:
+        return self._imu.sensor_position
+
+    @property
+    def sensor_orientation(self) -> Quaternion:
+        return self._imu.sensor_orientation
+
+
+class AccelerometerView(IMUView):
+
+    def __init__(self, imu: IMU):
+        super().__init__(imu, ACCELEROMETER)
+
+    def get_accelerometer_value(self) -> Vec3:
+        return self.get_value()
+
+
+class GyroscopeView(IMUView):
+
+    def __init__(self, imu: IMU):
+        super().__init__(imu, GYROSCOPE)
+
+    def get_gyroscope_value(self) -> Vec3:
+        return self.get_value()
+
+
+class MagnetometerView(IMUView):
+
+    def __init__(self, imu: IMU):
+        super().__init__(imu, MAGNETOMETER)
+
+    def get_magnetometer_value(self) -> Vec3:
+        return self.get_value()
@@ -0,0 +1,134 @@
+from typing import Optional, Union, Dict, Any
+
+import numpy as np
+
+from lobster_simulator.common.simulation_time import MICROSECONDS_IN_SECONDS
+
+# Amount of samples of random numbers that are generated at once.
+DEFAULT_BLOCK_SIZE = 4096
+
+Channels = Optional[Union[float, np.ndarray]]
+
+
+class NoiseModel:
+    """
+    Noise of the channels of a sensor: white noise, a constant bias, a bias that changes by a random walk and
+    quantization.
+
+    Every noise model has its own random generator, so runs are reproducible when the seed is given, regardless of other
+    code that uses random numbers. The standard normal numbers are generated in large blocks that are consumed by the
+    samples, which amortizes the cost of generating them.
+    """
+
+    def __init__(self, width: int, white_stds: Channels = None, bias: Channels = None,
+                 bias_random_walk_stds: Channels = None, quantization: Channels = None,
+                 rng: Optional[np.random.Generator] = None, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        NoiseModel, every parameter is either a single value for all the channels or an array with a value per channel.
+        :param width: Amount of channels.
+        :param white_stds: Standard deviation of the white noise.
+        :param bias: Initial bias.
+        :param bias_random_walk_stds: Standard deviation of the change of the bias after 1 second.
+        :param quantization: Resolution of the output, 0 is not quantized.
+        :param rng: Random generator, a new unseeded one is used when None.
+        :param block_size: Amount of samples of random numbers that are generated at once.
+        """
+        self.width = width
+        self.white_stds = self._channels(white_stds)
+        self.bias = self._channels(bias)
+        self.bias_random_walk_stds = self._channels(bias_random_walk_stds)
+        self.quantization = self._channels(quantization)
+
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self._block_size = block_size
+        self._block = np.zeros((0, 2 * width))
+        self._block_position = 0
+
+        # Time of the last sample in microseconds, the random walk of the next sample starts from there.
+        self._previous_time: Optional[int] = None
+
+    @property
+    def rng(self) -> np.random.Generator:
+        return self._rng
+
+    def save_state(self, include_rng: bool = True) -> Dict[str, Any]:
+        """
+        Captures the state of the noise: the biases, the time of the last sample and the position in the pregenerated
+        block of random numbers. The block itself is never written to, so it is shared instead of copied.
+        :param include_rng: Whether the state of the random generator is captured as well, this can be left out when the
+            owner of a shared generator captures it.
+        :return: State that can be given to restore_state.
+        """
+        state = {'bias': self.bias.copy(), 'previous_time': self._previous_time, 'block': self._block,
+                 'block_position': self._block_position}
+        if include_rng:
+            state['rng'] = self._rng.bit_generator.state
+        return state
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restores a state that was captured with save_state.
+        """
+        self.bias = state['bias'].copy()
+        self._previous_time = state['previous_time']
+        self._block = state['block']
+        self._block_position = state['block_position']
+        if 'rng' in state:
+            self._rng.bit_generator.state = state['rng']
+
+    def _channels(self, value: Channels) -> np.ndarray:
+        if value is None:
+            return np.zeros(self.width)
+        return np.broadcast_to(np.asarray(value, dtype=float), (self.width,)).copy()
+
+    def apply(self, times: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        """
+        Adds the noise to the samples.
+        :param times: (N,) times of the samples in microseconds.
+        :param samples: (N, width) noise free samples.
+        :return: The (N, width) samples with noise.
+        """
+        # Every sample takes a standard normal number for the white noise and for the random walk of every channel, so
+        #  the noise doesn't depend on how the samples are split up over the calls.
+        normals = self._standard_normals(len(times))
+
+        if self.bias_random_walk_stds.any():
+            previous_time = times[0] if self._previous_time is None else self._previous_time
+            dt = np.diff(times, prepend=previous_time) / MICROSECONDS_IN_SECONDS
+
+            steps = normals[:, self.width:] * self.bias_random_walk_stds * np.sqrt(dt)[:, None]
+            biases = self.bias + np.cumsum(steps, axis=0)
+            self.bias = biases[-1].copy()
+        else:
+            biases = self.bias
+
+        samples = samples + biases
+
+        if self.white_stds.any():
+            samples += normals[:, :self.width] * self.white_stds
+
+        quantized = self.quantization > 0
+        if quantized.any():
+            resolution = np.where(quantized, self.quantization, 1)
+            samples = np.where(quantized, np.round(samples / resolution) * resolution, samples)
+
+        self._previous_time = int(times[-1])
+
+        return samples
+
+    def _standard_normals(self, count: int) -> np.ndarray:
+        """
+        Takes count samples of standard normal numbers from the pregenerated blocks.
+        """
+        parts = []
+        while count > 0:
+            if self._block_position == len(self._block):
+                self._block = self._rng.standard_normal((max(self._block_size, count), 2 * self.width))
+                self._block_position = 0
+
+            taken = min(count, len(self._block) - self._block_position)
+            parts.append(self._block[self._block_position:self._block_position + taken])
+            self._block_position += taken
+            count -= taken
+
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
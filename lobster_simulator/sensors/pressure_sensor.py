@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import List, TYPE_CHECKING, Union
+from typing import List, TYPE_CHECKING, Union, Optional
+
+import numpy as np
 
 from lobster_common.quaternion import Quaternion
 from lobster_common.vec3 import Vec3
@@ -9,26 +11,30 @@ from lobster_simulator.common.simulation_time import SimulationTime
 if TYPE_CHECKING:
     from lobster_simulator.robot.auv import AUV
 
-from lobster_simulator.sensors.sensor import Sensor
+from lobster_simulator.sensors.sensor import Sensor, Interpolation
 from lobster_common.constants import *
-from lobster_simulator.common.translation import vec3_local_to_world_id
 
 
 class PressureSensor(Sensor):
 
+    OUTPUT_NAMES = ['pressure']
+
     def __init__(self, robot: AUV, position: Vec3, time_step: SimulationTime, time: SimulationTime,
                  orientation: Quaternion = None,
-                 saltwater=False, noise_stds: Union[List[float], float] = None):
+                 saltwater=False, noise_stds: Union[List[float], float] = None,
+                 noise_seed: Optional[Union[int, np.random.SeedSequence]] = None,
+                 interpolation: Interpolation = Interpolation.LINEAR):
         if saltwater:
             self._water_density = DENSITY_SALTWATER
         else:
             self._water_density = DENSITY_FRESHWATER
 
         super(PressureSensor, self).__init__(robot=robot, position=position, time_step=time_step, time=time,
-                                             orientation=orientation, noise_stds=noise_stds)
+                                             orientation=orientation, noise_stds=noise_stds, noise_seed=noise_seed,
+                                             interpolation=interpolation)
 
     def _get_real_values(self, dt: int) -> List[float]:
-        depth = vec3_local_to_world_id(self._robot.object_id, self._sensor_position)[2]
+        depth = self._robot.state.local_to_world(self._sensor_position)[Z]
         pa_to_kPa = 0.001
         # Pressure in Kilo pascal
         pressure = (depth * (self._water_density * GRAVITY) + STANDARD_ATMOSPHERE_PASCAL) * pa_to_kPa
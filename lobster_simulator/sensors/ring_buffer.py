@@ -0,0 +1,232 @@
+from enum import Enum, auto
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class OverflowPolicy(Enum):
+    """
+    What happens when a sample is added to a full ring buffer. The dropped samples are counted in both cases.
+    """
+    # The oldest sample is overwritten, so the buffer always holds the newest samples.
+    DROP_OLDEST = auto()
+    # The new sample is dropped, so the samples that are in the buffer are never lost.
+    DROP_NEWEST = auto()
+
+
+class RingBuffer:
+    """
+    Preallocated queue of samples, which consist of a timestamp in microseconds and a fixed amount of values.
+
+    Every sample is stored twice, at its index and at its index plus the capacity. Because of that the samples that are
+    in the buffer always lie contiguous in memory, so they can be given out as views without copying.
+
+    Besides the queue, other readers can follow the samples by their position: the amount of samples that were stored
+    before them (see written and read). Removing samples from the queue doesn't affect these readers, only overwriting
+    them does.
+    """
+
+    def __init__(self, capacity: int, width: int, overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST):
+        """
+        RingBuffer
+        :param capacity: Maximum amount of samples in the buffer.
+        :param width: Amount of values per sample.
+        :param overflow: What happens when a sample is added to a full buffer.
+        """
+        if capacity <= 0:
+            raise ValueError("The capacity should be bigger than zero")
+
+        self.capacity = capacity
+        self.overflow = overflow
+
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((2 * capacity, width))
+
+        self._start = 0
+        self._size = 0
+
+        # Amount of samples that were stored so far, the sample at a position is always stored at the position modulo
+        #  the capacity.
+        self._written = 0
+        # Position of the oldest sample that is known, older ones were never stored or weren't restored.
+        self._known_from = 0
+
+        # Amount of samples that were dropped because the buffer was full.
+        self.dropped_count = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def width(self) -> int:
+        return self._values.shape[1]
+
+    def append(self, timestamp: int, values) -> None:
+        """
+        Adds a sample.
+        :param timestamp: Time of the sample in microseconds.
+        :param values: The values of the sample.
+        """
+        if self._size == self.capacity:
+            self.dropped_count += 1
+            if self.overflow == OverflowPolicy.DROP_NEWEST:
+                return
+            self._start = (self._start + 1) % self.capacity
+            self._size -= 1
+
+        index = (self._start + self._size) % self.capacity
+        self._timestamps[index] = self._timestamps[index + self.capacity] = timestamp
+        self._values[index] = self._values[index + self.capacity] = values
+        self._size += 1
+        self._written += 1
+
+    def extend(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        """
+        Adds multiple samples at once.
+        :param timestamps: (N,) times of the samples in microseconds.
+        :param values: (N, width) values of the samples.
+        """
+        count = len(timestamps)
+        if count == 0:
+            return
+
+        if self.overflow == OverflowPolicy.DROP_NEWEST:
+            kept = min(count, self.capacity - self._size)
+            self.dropped_count += count - kept
+            timestamps = timestamps[:kept]
+            values = values[:kept]
+        else:
+            overwritten = max(self._size + count - self.capacity, 0)
+            self.dropped_count += overwritten
+
+            # Only the newest samples that fit are written, the rest would be overwritten right away.
+            timestamps = timestamps[-self.capacity:]
+            values = values[-self.capacity:]
+
+            dropped_from_buffer = min(overwritten, self._size)
+            self._start = (self._start + dropped_from_buffer) % self.capacity
+            self._size -= dropped_from_buffer
+
+        indices = (self._start + self._size + np.arange(len(timestamps))) % self.capacity
+        for offset in (0, self.capacity):
+            self._timestamps[indices + offset] = timestamps
+            self._values[indices + offset] = values
+        self._size += len(timestamps)
+        self._written += len(timestamps)
+
+    def pop(self) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Removes the oldest sample.
+        :return: The timestamp and a copy of the values of the sample or None when the buffer is empty.
+        """
+        if self._size == 0:
+            return None
+
+        timestamp = int(self._timestamps[self._start])
+        values = self._values[self._start].copy()
+
+        self._start = (self._start + 1) % self.capacity
+        self._size -= 1
+
+        return timestamp, values
+
+    def latest(self) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Gives the newest sample without removing it.
+        :return: The timestamp and a view of the values of the sample or None when the buffer is empty.
+        """
+        if self._size == 0:
+            return None
+
+        index = self._start + self._size - 1
+        return int(self._timestamps[index]), self._values[index]
+
+    def peek(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gives all the samples from oldest to newest without removing them.
+        :return: Views of the (N,) timestamps and the (N, width) values, these are only valid until the next sample is
+            added.
+        """
+        return self._timestamps[self._start:self._start + self._size], \
+            self._values[self._start:self._start + self._size]
+
+    def drain(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Removes all the samples.
+        :return: Views of the (N,) timestamps and the (N, width) values from oldest to newest, these are only valid until
+            the next sample is added.
+        """
+        timestamps, values = self.peek()
+
+        self._start = (self._start + self._size) % self.capacity
+        self._size = 0
+
+        return timestamps, values
+
+    def clear(self) -> None:
+        # The start moves on instead of going back to zero, so the positions of the samples stay the same.
+        self._start = (self._start + self._size) % self.capacity
+        self._size = 0
+
+    @property
+    def written(self) -> int:
+        """
+        Amount of samples that were stored so far, this is the position the next sample gets.
+        """
+        return self._written
+
+    @property
+    def oldest_position(self) -> int:
+        """
+        Position of the oldest sample that can still be read, the samples before it were overwritten.
+        """
+        return max(self._known_from, self._written - self.capacity)
+
+    def read(self, position: int, count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gives the samples from a position on, without removing them from the queue.
+        :param position: Position of the first sample, at least oldest_position.
+        :param count: Maximum amount of samples, all the samples up to the newest one when None.
+        :return: Views of the (N,) timestamps and the (N, width) values, these are only valid until the next sample is
+            added.
+        """
+        if position < self.oldest_position:
+            raise ValueError(f"The sample at position {position} was overwritten")
+
+        available = self._written - position
+        if count is None or count > available:
+            count = available
+
+        index = position % self.capacity
+        return self._timestamps[index:index + count], self._values[index:index + count]
+
+    def save_state(self, since: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, int, int, int]:
+        """
+        Captures the samples that are in the queue, only these are copied and not the whole preallocated storage.
+        :param since: Position of the oldest sample that is captured as well, when a reader still needs samples that
+            were already removed from the queue.
+        :return: State that can be given to restore_state.
+        """
+        first = self._written - self._size
+        if since is not None:
+            first = max(min(since, first), self.oldest_position)
+
+        timestamps, values = self.read(first)
+        return timestamps.copy(), values.copy(), self._size, self._written, self.dropped_count
+
+    def restore_state(self, state: Tuple[np.ndarray, np.ndarray, int, int, int]) -> None:
+        """
+        Restores a state that was captured with save_state, the samples get back their positions.
+        """
+        timestamps, values, size, written, dropped_count = state
+
+        indices = np.arange(written - len(timestamps), written) % self.capacity
+        for offset in (0, self.capacity):
+            self._timestamps[indices + offset] = timestamps
+            self._values[indices + offset] = values
+
+        self._written = written
+        self._known_from = written - len(timestamps)
+        self._start = (written - size) % self.capacity
+        self._size = size
+        self.dropped_count = dropped_count
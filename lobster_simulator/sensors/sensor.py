@@ -1,13 +1,18 @@
 # This is needed to resolve the Lobster class type, since it can't be imported due to a cyclic dependency
 from __future__ import annotations
 
+import copy
 from abc import ABC, abstractmethod
-from typing import List, TYPE_CHECKING, Union, Optional, Tuple, Any
+from enum import Enum
+from typing import List, TYPE_CHECKING, Union, Optional, Tuple, Any, Dict, Callable
 import numpy as np
 
-from lobster_simulator.common.calculations import interpolate
+from lobster_simulator.common.calculations import quadratic_interpolation_weights
 from lobster_simulator.common.general_exceptions import ArgumentLengthError
 from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.sensors.noise import NoiseModel
+from lobster_simulator.sensors.ring_buffer import RingBuffer, OverflowPolicy
+from lobster_simulator.sensors.subscription import Subscription
 
 if TYPE_CHECKING:
     from lobster_simulator.robot.auv import AUV
@@ -15,13 +20,38 @@ if TYPE_CHECKING:
 
 from lobster_common.vec3 import Vec3
 
-from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.common.simulation_time import SimulationTime, microseconds_to_seconds
+
+# Default amount of samples a sensor keeps until they are popped, about 16 seconds of a 250 Hz sensor.
+DEFAULT_BUFFER_CAPACITY = 4096
+
+
+class Interpolation(Enum):
+    """
+    How the samples of a sensor between two physics steps are computed.
+    """
+    # Straight line between the values of the last two steps.
+    LINEAR = 1
+    # Parabola through the values of the last three steps, this makes it possible to sample a sensor at a much higher
+    #  rate than the physics runs at.
+    QUADRATIC = 2
 
 
 class Sensor(ABC):
 
+    # Names of the outputs of the sensor, these are the fields of the samples that are given to subscribers.
+    OUTPUT_NAMES: Optional[List[str]] = None
+
+    # Small attributes that change while the simulation runs, these are copied by save_state. The buffer, the noise and
+    #  the random generator are captured separately, so only what is needed of them is copied.
+    _STATE_ATTRIBUTES = ['_has_new_value', '_latest_sample', '_time_step', '_next_sample_time', '_previous_update_time',
+                         '_previous_real_value', '_older_update_time', '_older_real_value']
+
     def __init__(self, robot: AUV, position: Vec3, time_step: SimulationTime, time: SimulationTime, orientation: Quaternion,
-                 noise_stds: Optional[Union[List[float], float]]):
+                 noise_stds: Optional[Union[List[float], float]], buffer_capacity: int = DEFAULT_BUFFER_CAPACITY,
+                 overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 noise_seed: Optional[Union[int, np.random.SeedSequence]] = None,
+                 interpolation: Interpolation = Interpolation.LINEAR):
         """
         Parameters
         ----------
@@ -37,26 +67,57 @@ class Sensor(ABC):
             Orientation of the sensor w.r.t. the robot.
         noise_stds :Union[List[float], float]
             Number or list of numbers with the standard deviation for each of the outputs of the sensor.
+        buffer_capacity : int
+            Amount of samples that are kept until they are popped.
+        overflow : OverflowPolicy
+            What happens with new samples when the buffer is full.
+        noise_seed : Union[int, SeedSequence]
+            Seed of the random generator of the noise of the sensor, makes the noise reproducible.
+        interpolation : Interpolation
+            How the samples between two updates are computed.
         """
 
         if orientation is None:
             orientation = PybulletAPI.getQuaternionFromEuler(Vec3([0, 0, 0]))
 
         self._robot: AUV = robot
+        self._physics_client_id: int = robot.physics_client_id
         self._sensor_position: Vec3 = position
         self._sensor_orientation: Quaternion = orientation
         self._time_step = time_step
 
-        self._queue = list()
-
         self._next_sample_time: SimulationTime = SimulationTime(initial_microseconds=time.microseconds)
         self._previous_update_time: SimulationTime = SimulationTime(initial_microseconds=time.microseconds)
         self._previous_real_value = self._get_real_values(SimulationTime(1))
 
+        # The update before the previous one, needed for the quadratic interpolation.
+        self._older_update_time: Optional[SimulationTime] = None
+        self._older_real_value = None
+        self.interpolation = interpolation
+
+        # The samples are stored as rows of floats, the sizes of the outputs are needed to turn them back into values.
+        self._output_sizes = [len(_output_as_array(output)) for output in self._previous_real_value]
+        self._buffer = RingBuffer(buffer_capacity, self._sample_width(), overflow)
+
+        # The newest sample and whether the last update produced it.
+        self._latest_sample: Optional[Tuple[int, np.ndarray]] = None
+        self._has_new_value = False
+
+        self._noise_rng = np.random.default_rng(noise_seed)
+        self._noise: Optional[NoiseModel] = None
+
         self.noise_stds = None
         if noise_stds:
             self.set_noise(noise_stds)
 
+        # Whether the samples are kept to be popped. When it is disabled and nothing is subscribed to the sensor, no
+        #  samples are generated at all.
+        self.polling = True
+
+        self._subscriptions: List[Subscription] = []
+        # Samples generated in the current update that still have to be given to the subscribers.
+        self._new_samples: List[Tuple[np.ndarray, np.ndarray]] = []
+
     def update(self, time: SimulationTime, dt: SimulationTime) -> None:
         """
         Updates a sensor, by generating new outputs by interpolating between values on the current and previous time
@@ -65,32 +126,58 @@ class Sensor(ABC):
         :param time: Current time in the simulator
         """
 
-        # Empty the queue to prevent it from growing too large.
-        self._queue: List[(float, Any)] = list()
+        self._has_new_value = False
 
         real_values = self._get_real_values(dt)
 
-        while self._next_sample_time <= time:
-
-            value_outputs = list()
-            for i in range(len(real_values)):
-                value = interpolate(x=self._next_sample_time.microseconds,
-                                    x1=self._previous_update_time.microseconds,
-                                    x2=time.microseconds,
-                                    y1=self._previous_real_value[i],
-                                    y2=real_values[i])
+        if self._next_sample_time <= time:
+            # All the samples that are due are generated at once, as rows of floats.
+            sample_times = np.arange(self._next_sample_time.microseconds, time.microseconds + 1,
+                                     self._time_step.microseconds, dtype=np.int64)
+            self._next_sample_time = SimulationTime(int(sample_times[-1])) + self._time_step
 
-                if self.noise_stds:
-                    value += np.random.normal(0, self.noise_stds[i])
+            if self.generates_samples:
+                samples = self._interpolate(sample_times, time, real_values)
 
-                value_outputs.append(value)
+                if self._noise is not None:
+                    samples = self._noise.apply(sample_times, samples)
 
-            self._queue.append((self._next_sample_time.seconds, value_outputs))
-            self._next_sample_time += self._time_step
+                self._add_samples(sample_times, samples)
 
+        self._older_real_value = self._previous_real_value
+        self._older_update_time = self._previous_update_time
         self._previous_real_value = real_values
         self._previous_update_time = SimulationTime(time.microseconds)
 
+        self._dispatch()
+
+    def _interpolate(self, sample_times: np.ndarray, time: SimulationTime, real_values: Any) -> np.ndarray:
+        """
+        Computes the noise free samples between the previous update and this one.
+        :param sample_times: (N,) times of the samples in microseconds.
+        :param time: Time of this update.
+        :param real_values: The real values on this update.
+        :return: (N, width) samples as rows of floats.
+        """
+        values = self._pack(real_values)
+        previous_values = self._pack(self._previous_real_value)
+
+        if self._uses_quadratic_interpolation():
+            times = [self._older_update_time.microseconds, self._previous_update_time.microseconds, time.microseconds]
+            weights = quadratic_interpolation_weights(times, sample_times)
+            return weights.dot(np.stack([self._pack(self._older_real_value), previous_values, values]))
+
+        weights = (sample_times - self._previous_update_time.microseconds) \
+            / (time.microseconds - self._previous_update_time.microseconds)
+        return previous_values + weights[:, None] * (values - previous_values)
+
+    def _uses_quadratic_interpolation(self) -> bool:
+        """
+        Whether the quadratic interpolation is used, until there have been three updates the interpolation is linear.
+        """
+        return self.interpolation == Interpolation.QUADRATIC and self._older_update_time is not None \
+            and self._older_update_time.microseconds < self._previous_update_time.microseconds
+
     def set_noise(self, noise_stds: Union[List[float], float]) -> None:
         if not isinstance(noise_stds, List):
             noise_stds = [noise_stds]
@@ -101,17 +188,98 @@ class Sensor(ABC):
 
         self.noise_stds = noise_stds
 
+        # Every component of a vector gets its own noise.
+        self.set_noise_model(NoiseModel(self._sample_width(), white_stds=np.repeat(noise_stds, self._output_sizes),
+                                        rng=self._noise_rng))
+
+    def set_noise_model(self, noise: Optional[NoiseModel]) -> None:
+        """
+        Sets the noise that is added to the outputs (bias, random walk, quantization), None removes all noise.
+        :param noise: Noise model with a channel for every float of the output, the random generator of the sensor can be
+            used through create_noise_model.
+        """
+        if noise is not None and noise.width != self._sample_width():
+            raise ArgumentLengthError("The noise model should have a channel for every value the sensor produces.")
+
+        self._noise = noise
+
+    def create_noise_model(self, **kwargs) -> NoiseModel:
+        """
+        Creates a noise model that fits the outputs of this sensor and uses its (seeded) random generator.
+        :param kwargs: Parameters of the NoiseModel.
+        """
+        return NoiseModel(self._sample_width(), rng=self._noise_rng, **kwargs)
+
+    @property
+    def noise(self) -> Optional[NoiseModel]:
+        return self._noise
+
+    def save_state(self) -> Dict[str, Any]:
+        """
+        Captures the state of the sensor (queue, sample times, the values that are used for the interpolation and the
+        noise). Only the samples that are in the queue are copied, and the random generator is captured once even when
+        the noise model shares it.
+        :return: State that can be given to restore_state.
+        """
+        state = {name: copy.deepcopy(getattr(self, name)) for name in self._STATE_ATTRIBUTES}
+        state['_buffer'] = self._buffer.save_state(since=self._oldest_needed_sample())
+        state['_noise_rng'] = self._noise_rng.bit_generator.state
+
+        noise_state = None
+        if self._noise is not None:
+            noise_state = self._noise.save_state(include_rng=self._noise.rng is not self._noise_rng)
+        state['_noise'] = (self._noise, noise_state)
+
+        return state
+
+    def _oldest_needed_sample(self) -> Optional[int]:
+        """
+        Position in the buffer of the oldest sample that is still needed besides the queue (see RingBuffer.read), None
+        when only the queue is needed.
+        """
+        return None
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restores a state that was captured with save_state.
+        """
+        for name in self._STATE_ATTRIBUTES:
+            # Copying again, so the same state can be restored multiple times.
+            setattr(self, name, copy.deepcopy(state[name]))
+
+        self._buffer.restore_state(state['_buffer'])
+        self._noise_rng.bit_generator.state = state['_noise_rng']
+
+        self._noise, noise_state = state['_noise']
+        if self._noise is not None:
+            self._noise.restore_state(noise_state)
+
     def pop_next_value(self) -> Optional[Tuple[float, Any]]:
-        """Pops the oldest sensor value from the list"""
-        if len(self._queue) == 0:
+        """Pops the oldest sensor value from the buffer"""
+        sample = self._buffer.pop()
+        if sample is None:
             return None
-        return self._queue.pop(0)
+        return microseconds_to_seconds(sample[0]), self._unpack(sample[1])
 
     def pop_all_values(self) -> List[Tuple[float, Any]]:
         """Gives a list with all the sensors values, from oldest to newest."""
-        values = self._queue
-        self._queue = list()
-        return values
+        timestamps, values = self._buffer.drain()
+        return [(microseconds_to_seconds(int(timestamp)), self._unpack(row)) for timestamp, row in zip(timestamps, values)]
+
+    def drain(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Removes all the sensor values at once, without creating an object per value.
+        :return: The (N,) times in microseconds and the (N, width) values as rows of floats (see _pack), from oldest to
+            newest. These are views that are only valid until the next update of the sensor.
+        """
+        return self._buffer.drain()
+
+    @property
+    def dropped_count(self) -> int:
+        """
+        Amount of sensor values that were lost because they weren't popped before the buffer was full.
+        """
+        return self._buffer.dropped_count
 
     @property
     def sensor_position(self) -> Vec3:
@@ -124,11 +292,124 @@ class Sensor(ABC):
     def sensor_orientation(self) -> Quaternion:
         return self._sensor_orientation
 
+    @property
+    def generates_samples(self) -> bool:
+        """
+        Whether the sensor generates samples, which is only needed when they are polled or something is subscribed.
+        """
+        return self.polling or len(self._subscriptions) > 0
+
+    def subscribe(self, callback: Callable[[np.ndarray], None], decimation: int = 1,
+                  batch_size: Optional[int] = None) -> Subscription:
+        """
+        Calls the callback with the new samples of the sensor, as a structured array with the fields of sample_dtype.
+        :param callback: Called with the samples, from oldest to newest.
+        :param decimation: Only every decimation-th sample is delivered.
+        :param batch_size: The samples are delivered in batches of this size, when None the samples are delivered once
+            per update of the sensor (if there are any).
+        :return: The subscription, which can be given to unsubscribe.
+        """
+        subscription = Subscription(callback, decimation, batch_size)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.remove(subscription)
+
+    @property
+    def sample_dtype(self) -> np.dtype:
+        """
+        Type of the structured arrays given to the subscribers: the time in microseconds and a field per output.
+        """
+        names = self.OUTPUT_NAMES or [f'value{i}' for i in range(len(self._output_sizes))]
+        return np.dtype([('time', np.int64)] + [(name, np.float64) if size == 1 else (name, np.float64, (size,))
+                                                for name, size in zip(names, self._output_sizes)])
+
+    def _to_records(self, times: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        """
+        Turns samples stored as rows of floats into a structured array with sample_dtype.
+        """
+        dtype = self.sample_dtype
+        records = np.empty(len(times), dtype=dtype)
+        records['time'] = times
+
+        index = 0
+        for name, size in zip(dtype.names[1:], self._output_sizes):
+            records[name] = samples[:, index] if size == 1 else samples[:, index:index + size]
+            index += size
+
+        return records
+
+    def _dispatch(self) -> None:
+        """
+        Gives the samples generated in this update to the subscribers.
+        """
+        if not self._new_samples:
+            return
+
+        times = np.concatenate([times for times, _ in self._new_samples])
+        samples = np.concatenate([samples for _, samples in self._new_samples])
+        self._new_samples = []
+
+        records = self._to_records(times, samples)
+        for subscription in self._subscriptions:
+            subscription.deliver(records)
+
     def get_latest_value(self) -> Optional[Tuple[float, Any]]:
-        if self._queue:
-            return self._queue[-1]
+        """
+        Gives the newest sensor value if the last update produced one, popping values doesn't affect this.
+        """
+        if not self._has_new_value:
+            return None
 
-        return None
+        timestamp, values = self._latest_sample
+        return microseconds_to_seconds(timestamp), self._unpack(values)
+
+    def _add_sample(self, time: SimulationTime, value: Any) -> None:
+        self._add_samples(np.array([time.microseconds], dtype=np.int64), self._pack(value)[None, :])
+
+    def _add_samples(self, times: np.ndarray, samples: np.ndarray) -> None:
+        """
+        Adds multiple samples at once.
+        :param times: (N,) times of the samples in microseconds.
+        :param samples: (N, width) samples as rows of floats.
+        """
+        if self.polling:
+            self._buffer.extend(times, samples)
+        if self._subscriptions:
+            self._new_samples.append((times, samples))
+
+        self._latest_sample = (int(times[-1]), samples[-1].copy())
+        self._has_new_value = True
+
+    def _sample_width(self) -> int:
+        """
+        Amount of floats a value is stored as.
+        """
+        return sum(self._output_sizes)
+
+    def _pack(self, value: Any) -> np.ndarray:
+        """
+        Turns a value of the sensor (the list of outputs) into a row of floats.
+        """
+        return np.concatenate([_output_as_array(output) for output in value])
+
+    def _unpack(self, row: np.ndarray) -> Any:
+        """
+        Turns a row of floats back into a value of the sensor, outputs with 3 values become a Vec3.
+        """
+        value = []
+        index = 0
+        for size in self._output_sizes:
+            value.append(float(row[index]) if size == 1 else Vec3(row[index:index + size].tolist()))
+            index += size
+        return value
+
+    def remove(self) -> None:
+        """
+        Removes everything the sensor added to the simulation, like debug visualizations.
+        """
+        pass
 
     @abstractmethod
     def _get_real_values(self, dt: SimulationTime) -> List[float]:
@@ -137,3 +418,11 @@ class Sensor(ABC):
         :return: The real values of the data that the sensor meassures.
         """
         raise NotImplementedError("This method should be implemented")
+
+
+def _output_as_array(output: Union[float, Vec3, np.ndarray]) -> np.ndarray:
+    if isinstance(output, Vec3):
+        return output.numpy()
+    if isinstance(output, np.ndarray):
+        return output.ravel().astype(float, copy=False)
+    return np.array([output], dtype=float)
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+from typing import Dict, Optional, List, TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from lobster_simulator.robot.auv import AUV
+
+INDEX_FILE_NAME = 'index.json'
+
+# Amount of samples of a stream that are collected before they are appended to the column files.
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# Amount of batches of samples that can wait for the writer thread, the simulation blocks when it is full.
+DEFAULT_MAX_QUEUED_BATCHES = 1024
+
+_CLOSE = object()
+
+
+class SensorLogWriter:
+    """
+    Writes streams of sensor samples (structured arrays, see Sensor.subscribe) to disk on a background thread.
+
+    Every field of a stream is appended to its own raw binary column file in chunks, so a column can be read back as a
+    single memory map (see SensorLog). The index file tells how many samples of every stream are completely written and
+    where the chunks start, it is only updated after the chunk itself is written, so a log that is cut off (for example
+    by a crash) can still be read up to its last chunk.
+
+    The time of a stream can go backwards, for example when the robot is reset (Simulator.reset_robot) or a snapshot is
+    restored. The samples from such a moment on are a new episode of the stream, within an episode the time only
+    increases.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_queued_batches: int = DEFAULT_MAX_QUEUED_BATCHES):
+        """
+        SensorLogWriter
+        :param directory: Directory the log is written to, it is created when it doesn't exist.
+        :param chunk_size: Amount of samples of a stream that are written at once.
+        :param max_queued_batches: Amount of batches that can wait to be written, writing blocks when there are more.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self._chunk_size = chunk_size
+
+        self._streams: Dict[str, _StreamWriter] = dict()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued_batches)
+        self._error: Optional[BaseException] = None
+
+        self._thread = threading.Thread(target=self._run, name='SensorLogWriter', daemon=True)
+        self._thread.start()
+
+    def attach(self, robot: AUV, decimation: int = 1) -> None:
+        """
+        Logs all the sensors of a robot, every sensor is written to the stream with its name.
+        :param robot: The robot.
+        :param decimation: Only every decimation-th sample of every sensor is logged.
+        """
+        for name, sensor in robot.sensors.items():
+            self.add_stream(name, sensor.sample_dtype)
+
+        robot.subscribe_all(self.write_all, decimation=decimation)
+
+    def add_stream(self, name: str, dtype: np.dtype) -> None:
+        """
+        Adds a stream, this has to be done before samples of it are written.
+        :param name: Name of the stream, this is used as the name of its directory.
+        :param dtype: Structured type of the samples.
+        """
+        if name in self._streams:
+            raise ValueError(f"The sensor log already has a stream called {name}")
+
+        self._streams[name] = _StreamWriter(os.path.join(self.directory, name), np.dtype(dtype))
+
+    def write(self, name: str, records: np.ndarray) -> None:
+        """
+        Queues samples to be written, this only blocks when the writer thread can't keep up.
+        :param name: Name of the stream.
+        :param records: Structured array with the samples, it shouldn't be changed afterwards.
+        """
+        self._raise_error()
+        if name not in self._streams:
+            raise KeyError(f"The sensor log has no stream called {name}")
+
+        self._queue.put((name, records))
+
+    def write_all(self, samples: Dict[str, np.ndarray]) -> None:
+        """
+        Queues the samples of multiple streams, in the form AUV.subscribe_all delivers them.
+        """
+        for name, records in samples.items():
+            self.write(name, records)
+
+    def close(self) -> None:
+        """
+        Writes everything that is queued and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+
+        self._raise_error()
+
+    def __enter__(self) -> SensorLogWriter:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Writing the sensor log failed") from self._error
+
+    def _run(self) -> None:
+        closing = False
+        try:
+            while not closing:
+                item = self._queue.get()
+                if item is _CLOSE:
+                    closing = True
+                    continue
+
+                name, records = item
+                stream = self._streams[name]
+                stream.add(records)
+                if stream.pending_count >= self._chunk_size:
+                    stream.write_chunk()
+                    self._write_index()
+
+            for stream in self._streams.values():
+                stream.write_chunk()
+            self._write_index()
+        except BaseException as e:
+            self._error = e
+
+            # Keep emptying the queue, so the simulation doesn't block on it. The error is raised on the next write.
+            while not closing:
+                closing = self._queue.get() is _CLOSE
+        finally:
+            for stream in self._streams.values():
+                stream.close()
+
+    def _write_index(self) -> None:
+        index = {'streams': {name: stream.index() for name, stream in self._streams.items()}}
+
+        temporary_path = os.path.join(self.directory, INDEX_FILE_NAME + '.tmp')
+        with open(temporary_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(temporary_path, os.path.join(self.directory, INDEX_FILE_NAME))
+
+
+class _StreamWriter:
+
+    def __init__(self, directory: str, dtype: np.dtype):
+        os.makedirs(directory, exist_ok=True)
+
+        self.dtype = dtype
+        self.length = 0
+        self.chunks: List[List[int]] = []
+
+        # Position of the first sample of every episode, a new one starts when the time goes backwards.
+        self.episodes: List[int] = [0]
+        self._last_time: Optional[int] = None
+
+        self._pending: List[np.ndarray] = []
+        self.pending_count = 0
+
+        self._files = {name: open(os.path.join(directory, name + '.bin'), 'wb') for name in dtype.names}
+
+    def add(self, records: np.ndarray) -> None:
+        if len(records) == 0:
+            return
+
+        times = records['time']
+        previous_time = times[0] if self._last_time is None else self._last_time
+        rewinds = np.flatnonzero(np.diff(times, prepend=previous_time) < 0)
+        self.episodes.extend((self.length + self.pending_count + rewinds).tolist())
+        self._last_time = int(times[-1])
+
+        self._pending.append(records)
+        self.pending_count += len(records)
+
+    def write_chunk(self) -> None:
+        if self.pending_count == 0:
+            return
+
+        records = np.concatenate(self._pending)
+        for name, f in self._files.items():
+            f.write(np.ascontiguousarray(records[name]).tobytes())
+            f.flush()
+
+        # A chunk never spans multiple episodes, so the time increases within every chunk.
+        end = self.length + len(records)
+        boundaries = [self.length] + [start for start in self.episodes if self.length < start < end] + [end]
+        for start, stop in zip(boundaries[:-1], boundaries[1:]):
+            times = records['time'][start - self.length:stop - self.length]
+            self.chunks.append([start, stop - start, int(times[0]), int(times[-1])])
+        self.length = end
+
+        self._pending = []
+        self.pending_count = 0
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+    def index(self) -> Dict[str, Any]:
+        return {
+            'length': self.length,
+            'fields': [{'name': name, 'dtype': self.dtype[name].base.str, 'shape': list(self.dtype[name].shape)}
+                       for name in self.dtype.names],
+            # Start, length, first time and last time of every chunk.
+            'chunks': self.chunks,
+            # Start of every episode that is written.
+            'episodes': [0] + [start for start in self.episodes[1:] if start < self.length]
+        }
+
+
+class SensorLog:
+    """
+    Reads a log written by SensorLogWriter. The columns are memory maps of the files, so nothing is read until it is
+    used, no matter how long the log is.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, INDEX_FILE_NAME)) as f:
+            self._index = json.load(f)['streams']
+
+        self.directory = directory
+
+    @property
+    def stream_names(self) -> List[str]:
+        return list(self._index.keys())
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def length(self, name: str) -> int:
+        """
+        Amount of samples of a stream.
+        """
+        return self._index[name]['length']
+
+    def columns(self, name: str) -> Dict[str, np.ndarray]:
+        """
+        Gives the columns of a stream.
+        :param name: Name of the stream.
+        :return: Read only memory maps by the name of their field, the time is in microseconds.
+        """
+        stream = self._index[name]
+        columns = dict()
+        for field in stream['fields']:
+            path = os.path.join(self.directory, name, field['name'] + '.bin')
+            shape = (stream['length'],) + tuple(field['shape'])
+            if stream['length'] == 0:
+                columns[field['name']] = np.zeros(shape, dtype=field['dtype'])
+            else:
+                columns[field['name']] = np.memmap(path, dtype=field['dtype'], mode='r', shape=shape)
+        return columns
+
+    def __getitem__(self, name: str) -> Dict[str, np.ndarray]:
+        return self.columns(name)
+
+    def episodes(self, name: str) -> List[slice]:
+        """
+        Gives the episodes of a stream, a new episode starts every time the time goes backwards (see SensorLogWriter).
+        :param name: Name of the stream.
+        :return: Slice of the samples of every episode that can be used on the columns.
+        """
+        stream = self._index[name]
+        # Logs without episodes in the index never go back in time.
+        starts = stream.get('episodes', [0])
+        return [slice(start, end) for start, end in zip(starts, starts[1:] + [stream['length']])]
+
+    def time_slice(self, name: str, start_time: int, end_time: int, episode: int = 0) -> slice:
+        """
+        Finds the samples of a stream within a time range, using the chunks to only touch the part of the time column
+        that is needed. The time can go backwards between the episodes of a stream, so a range is searched within a
+        single episode.
+        :param name: Name of the stream.
+        :param start_time: Start of the range in microseconds.
+        :param end_time: End of the range in microseconds (exclusive).
+        :param episode: Index of the episode (see episodes), negative indices count from the last one.
+        :return: Slice of the samples that can be used on the columns.
+        """
+        samples = self.episodes(name)[episode]
+        chunks = np.array(self._index[name]['chunks'], dtype=np.int64).reshape(-1, 4)
+        chunks = chunks[(chunks[:, 0] >= samples.start) & (chunks[:, 0] < samples.stop)]
+        times = self.columns(name)['time']
+
+        def position(time: int) -> int:
+            # The first chunk that ends at or after the time contains the position.
+            chunk = int(np.searchsorted(chunks[:, 3], time, side='left'))
+            if chunk == len(chunks):
+                return samples.stop
+            start, length = int(chunks[chunk, 0]), int(chunks[chunk, 1])
+            return start + int(np.searchsorted(times[start:start + length], time, side='left'))
+
+        return slice(position(start_time), position(end_time))
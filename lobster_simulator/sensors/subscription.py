@@ -0,0 +1,65 @@
+from typing import Callable, Optional, List
+
+import numpy as np
+
+
+class Subscription:
+    """
+    Delivers the samples of a sensor to a callback as structured arrays (with a 'time' field in microseconds and a
+    field per output of the sensor).
+    """
+
+    def __init__(self, callback: Callable[[np.ndarray], None], decimation: int = 1, batch_size: Optional[int] = None):
+        """
+        Subscription
+        :param callback: Called with the samples, from oldest to newest.
+        :param decimation: Only every decimation-th sample of the sensor is delivered.
+        :param batch_size: The samples are delivered in batches of this size, when None the samples are delivered once
+            per step (if there are any).
+        """
+        if decimation < 1:
+            raise ValueError("The decimation should be at least 1")
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("The batch size should be at least 1")
+
+        self.callback = callback
+        self.decimation = decimation
+        self.batch_size = batch_size
+
+        # Amount of samples that were skipped since the last sample that was kept.
+        self._skipped = decimation - 1
+        self._pending: List[np.ndarray] = []
+        self._pending_count = 0
+
+    def deliver(self, records: np.ndarray) -> None:
+        """
+        Hands new samples to the subscription, which passes them to the callback according to its decimation and batch
+        size.
+        :param records: Structured array with the new samples.
+        """
+        if self.decimation > 1:
+            first = self.decimation - 1 - self._skipped
+            kept = records[first::self.decimation]
+            self._skipped = (self._skipped + len(records)) % self.decimation if len(kept) == 0 \
+                else len(records) - 1 - (first + (len(kept) - 1) * self.decimation)
+            records = kept
+
+        if len(records) == 0:
+            return
+
+        if self.batch_size is None:
+            self.callback(records)
+            return
+
+        self._pending.append(records)
+        self._pending_count += len(records)
+        if self._pending_count < self.batch_size:
+            return
+
+        pending = np.concatenate(self._pending)
+        full_batches = len(pending) // self.batch_size * self.batch_size
+        for start in range(0, full_batches, self.batch_size):
+            self.callback(pending[start:start + self.batch_size])
+
+        self._pending = [pending[full_batches:]]
+        self._pending_count = len(pending) - full_batches
@@ -1,16 +1,18 @@
 import copy
 
 import json
+import math
 import time as t
-from typing import Optional
+from typing import Optional, Dict, Any
 
 from pkg_resources import resource_stream, resource_filename
 
 from lobster_common.vec3 import Vec3
 from lobster_simulator.environment.water_surface import WaterSurface
+from lobster_simulator.common.general_exceptions import StateRestoreError
 from lobster_simulator.common.pybullet_api import PybulletAPI
 from lobster_simulator.robot.auv import AUV
-from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.common.simulation_time import SimulationTime, seconds_to_microseconds
 from enum import Enum, auto
 
 
@@ -19,11 +21,47 @@ class Models(Enum):
     PTV = auto()
 
 
+def load_robot_config(model: Models = Models.SCOUT_ALPHA, **kwargs) -> Dict:
+    """
+    Loads the config of a robot model.
+    :param model: Model of the robot. (Scout-alpha, PTV)
+    :param kwargs: Extra arguments that are added to (or override) the config.
+    :return: Config of the robot
+    """
+    if model == Models.SCOUT_ALPHA:
+        model_config = 'scout-alpha.json'
+    else:
+        model_config = 'ptv.json'
+
+    with resource_stream('lobster_simulator', f'data/{model_config}') as f:
+        robot_config = json.load(f)
+
+    # Add extra arguments to the robot config
+    robot_config.update(kwargs)
+
+    return robot_config
+
+
+class SimulatorState:
+    """
+    Handle to a snapshot of the simulator, created by Simulator.save_state.
+    """
+
+    def __init__(self, robot: AUV, robot_state: Dict[str, Any], time: SimulationTime, cycle: int,
+                 camera_position: Vec3):
+        self.robot = robot
+        self.robot_state = robot_state
+        self.time = time
+        self.cycle = cycle
+        self.camera_position = camera_position
+
+
 class Simulator:
 
     def __init__(self, time_step: int, config=None, gui=True):
         """
-        Simulator
+        Simulator. Every simulator owns its own physics client, so multiple (headless) simulators can run side by side
+        in one process.
         :param time_step: duration of a step in microseconds
         :param config: config of the robot.
         :param gui: start the PyBullet gui when true
@@ -37,6 +75,7 @@ class Simulator:
         config = base_config
 
         self.rotate_camera_with_robot = bool(config['rotate_camera_with_robot'])
+        self._gui = gui
 
         self._time: SimulationTime = SimulationTime(0)
         self._previous_update_time: SimulationTime = SimulationTime(0)
@@ -45,26 +84,37 @@ class Simulator:
 
         self._cycle = 0
 
-        PybulletAPI.initialize(self._time_step, gui)
+        self._physics_client_id = PybulletAPI.initialize(self._time_step, gui)
 
-        self.water_surface = WaterSurface(self._time)
+        self.water_surface = WaterSurface(self._time, physics_client_id=self._physics_client_id)
 
         self._simulator_frequency_slider = PybulletAPI.addUserDebugParameter("simulation frequency", 10, 1000,
-                                                                             1 / self._time_step.microseconds)
-        self._buoyancy_force_slider = PybulletAPI.addUserDebugParameter("buoyancyForce", 0, 1000, 550)
+                                                                             1 / self._time_step.microseconds,
+                                                                             physicsClientId=self._physics_client_id)
+        self._buoyancy_force_slider = PybulletAPI.addUserDebugParameter("buoyancyForce", 0, 1000, 550,
+                                                                        physicsClientId=self._physics_client_id)
 
         self._model = None
         self.robot_config = None
+        self._initial_state: Optional[SimulatorState] = None
 
         self._camera_position = Vec3([0, 0, 0])
         self._robot: Optional[AUV] = None
 
     def add_ocean_floor(self, depth=100):
         id = PybulletAPI.loadURDF(resource_filename("lobster_simulator", "data/plane1000.urdf"),
-                                  base_position=Vec3((0, 0, depth)))
+                                  base_position=Vec3((0, 0, depth)), physicsClientId=self._physics_client_id)
 
-        texture = PybulletAPI.loadTexture(resource_filename("lobster_simulator", "data/checker_blue.png"))
-        PybulletAPI.changeVisualShape(id, texture, rgbaColor=[1,1,1,1])
+        texture = PybulletAPI.loadTexture(resource_filename("lobster_simulator", "data/checker_blue.png"),
+                                          physicsClientId=self._physics_client_id)
+        PybulletAPI.changeVisualShape(id, texture, rgbaColor=[1,1,1,1], physicsClientId=self._physics_client_id)
+
+    @property
+    def physics_client_id(self) -> int:
+        """
+        Id of the physics client this simulator runs in.
+        """
+        return self._physics_client_id
 
     def get_time_in_seconds(self) -> float:
         return self._time.seconds
@@ -76,40 +126,85 @@ class Simulator:
         """
 
         self._time_step = SimulationTime(time_step_microseconds)
-        PybulletAPI.setTimeStep(self._time_step)
+        PybulletAPI.setTimeStep(self._time_step, physicsClientId=self._physics_client_id)
 
     def do_step(self):
         """Progresses the simulation by exactly one time step."""
 
         self._time.add_time_step(self._time_step.microseconds)
 
-        self.update_camera_position()
+        if self._gui:
+            self.update_camera_position()
 
         self._robot.update(self._time_step, self._time)
 
-        PybulletAPI.stepSimulation()
+        PybulletAPI.stepSimulation(physicsClientId=self._physics_client_id)
+        self._robot.invalidate_state()
 
         self._cycle += 1
         if self._cycle % 50 == 0:
             self._previous_update_time = copy.copy(self._time)
             self._previous_update_real_time = t.perf_counter()
 
+    def step_n(self, n: int) -> None:
+        """
+        Progresses the simulation by n time steps in a tight loop. Everything that only serves the GUI (camera tracking
+        and the real time bookkeeping) is skipped inside the loop and done once after the last step.
+        :param n: Amount of time steps to execute
+        """
+        if n <= 0:
+            return
+
+        time = self._time
+        time_step = self._time_step
+        time_step_microseconds = time_step.microseconds
+        robot_update = self._robot.update
+        invalidate_state = self._robot.invalidate_state
+        step_simulation = PybulletAPI.stepSimulation
+        physics_client_id = self._physics_client_id
+
+        for _ in range(n):
+            time.add_time_step(time_step_microseconds)
+            robot_update(time_step, time)
+            step_simulation(physicsClientId=physics_client_id)
+            invalidate_state()
+
+        self._cycle += n
+        self._previous_update_time = copy.copy(time)
+        self._previous_update_real_time = t.perf_counter()
+
+        if self._gui:
+            self.update_camera_position()
+
+    def step_for(self, duration: float) -> None:
+        """
+        Executes as many whole time steps as fit in the given duration (in seconds).
+        :param duration: Duration (in seconds) the simulator should run
+        """
+        self.step_n(int(self._to_microseconds(duration) // self._time_step.microseconds))
+
     def step_until(self, time: float):
         """
         Execute steps until time (in seconds) has reached. The given time will never be exceeded, but could be slightly
         less than the specified time (at most 1 time step off).
         :param time: Time (in seconds) to which the simulator should run
         """
-        while (self._time + self._time_step).seconds <= time:
-            self.do_step()
+        remaining_microseconds = self._to_microseconds(time) - self._time.microseconds
+        self.step_n(remaining_microseconds // self._time_step.microseconds)
+
+    @staticmethod
+    def _to_microseconds(seconds: float) -> int:
+        # The small tolerance prevents losing a step when the seconds can't be represented exactly as a float.
+        return int(math.floor(seconds_to_microseconds(seconds) + 1e-6))
 
     def update_camera_position(self):
         smoothing = 0.95
         self._camera_position = smoothing * self._camera_position + (1 - smoothing) * self._robot.get_position()
         if self.rotate_camera_with_robot:
-            PybulletAPI.moveCameraToPosition(self._camera_position, self._robot.get_orientation())
+            PybulletAPI.moveCameraToPosition(self._camera_position, self._robot.get_orientation(),
+                                             physicsClientId=self._physics_client_id)
         else:
-            PybulletAPI.moveCameraToPosition(self._camera_position)
+            PybulletAPI.moveCameraToPosition(self._camera_position, physicsClientId=self._physics_client_id)
 
     @property
     def robot(self) -> AUV:
@@ -128,26 +223,57 @@ class Simulator:
         if self._robot:
             self._robot.remove()
 
-        if model == Models.SCOUT_ALPHA:
-            model_config = 'scout-alpha.json'
-        else:
-            model_config = 'ptv.json'
+        self._model = model
+        self.robot_config = load_robot_config(model, **kwargs)
 
-        with resource_stream('lobster_simulator', f'data/{model_config}') as f:
-            self.robot_config = json.load(f)
+        self._robot = AUV(self._time, self.robot_config, physics_client_id=self._physics_client_id)
 
-        # Add extra arguments to the robot config
-        self.robot_config.update(kwargs)
-
-        self._robot = AUV(self._time, self.robot_config)
+        # Used to quickly reset the robot without rebuilding it.
+        self._initial_state = self.save_state()
 
         return self._robot
 
     def reset_robot(self):
         """
-        Resets the robot using the same configuration.
+        Resets the robot to the moment it was created, by restoring the snapshot that was taken then. The robot
+        instance stays the same, and the rest of the physics world (like a loaded terrain) is left as it is.
+
+        The simulation time and the cycle count are reset as well, so after a reset the time starts again from the time
+        at which the robot was created. Anything that keeps the sensor samples over time (like a SensorLog) sees the
+        time go backwards.
+        """
+        self.restore_state(self._initial_state)
+
+    def save_state(self) -> SimulatorState:
+        """
+        Takes a snapshot of the robot (the pose and velocities of its body, its sensors and thrusters) and the
+        simulation time. The rest of the physics world isn't part of the snapshot.
+        :return: Handle that can be given to restore_state.
+        """
+        return SimulatorState(robot=self._robot,
+                              robot_state=self._robot.save_state(),
+                              time=SimulationTime(self._time.microseconds),
+                              cycle=self._cycle,
+                              camera_position=self._camera_position)
+
+    def restore_state(self, state: SimulatorState) -> None:
         """
-        self.create_robot(self._model, **self.robot_config)
+        Restores a snapshot that was taken with save_state, this rewinds the simulation time to the time of the
+        snapshot. The same snapshot can be restored multiple times.
+        :param state: Handle returned by save_state
+        """
+        if state is None or state.robot is not self._robot:
+            raise StateRestoreError("The state belongs to a robot that doesn't exist anymore")
+
+        self._robot.restore_state(state.robot_state)
+        self._set_time(state.time, state.cycle)
+        self._camera_position = state.camera_position
+
+    def _set_time(self, time: SimulationTime, cycle: int) -> None:
+        self._time = SimulationTime(time.microseconds)
+        self._previous_update_time = SimulationTime(time.microseconds)
+        self._previous_update_real_time = t.perf_counter()
+        self._cycle = cycle
 
     def shutdown(self):
         """
@@ -155,4 +281,4 @@ class Simulator:
         it doesn't automatically closes in between tests)
         :return:
         """
-        PybulletAPI.disconnect()
+        PybulletAPI.disconnect(physicsClientId=self._physics_client_id)
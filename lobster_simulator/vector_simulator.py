@@ -0,0 +1,261 @@
+import multiprocessing
+from threading import BrokenBarrierError
+from typing import Optional, Dict
+
+import numpy as np
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.simulator import Simulator, Models, load_robot_config
+
+# Layout of the observation of a single simulator, all values are given in the NED world frame. The sensor values are
+#  NaN (and dvl_velocity_valid is False) until the sensor gives its first value after the start or a reset.
+OBSERVATION_DTYPE = np.dtype([
+    ('time', np.float64),  # seconds
+    ('position', np.float64, (3,)),
+    ('orientation', np.float64, (3,)),  # euler angles
+    ('velocity', np.float64, (3,)),
+    ('angular_velocity', np.float64, (3,)),
+    ('pressure', np.float64),  # kPa
+    ('accelerometer', np.float64, (3,)),
+    ('gyroscope', np.float64, (3,)),
+    ('magnetometer', np.float64, (3,)),
+    ('dvl_velocity', np.float64, (3,)),
+    ('dvl_altitude', np.float64),  # NaN when the dvl has no altitude
+    ('dvl_velocity_valid', np.bool_),
+])
+
+# The fields of the observation that are filled in by the sensors.
+_SENSOR_FIELDS = ['pressure', 'accelerometer', 'gyroscope', 'magnetometer', 'dvl_velocity', 'dvl_altitude']
+
+_STEP = 0
+_RESET = 1
+_CLOSE = 2
+_IDLE = 3
+
+
+class VectorSimulator:
+    """
+    Runs a batch of headless simulators, each in its own worker process. Thruster commands and observations are
+    exchanged through preallocated shared memory arrays and the workers are synchronized with a barrier, so nothing is
+    pickled per step.
+    """
+
+    def __init__(self, num_simulators: int, time_step: int, steps_per_action: int = 1,
+                 model: Models = Models.SCOUT_ALPHA, robot_config: Optional[Dict] = None,
+                 start_method: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        VectorSimulator
+        :param num_simulators: Amount of simulators (and thus worker processes)
+        :param time_step: Duration of a physics step in microseconds
+        :param steps_per_action: Amount of physics steps that are executed for every call to step
+        :param model: Model of the robot
+        :param robot_config: Extra arguments for the robot config (see Simulator.create_robot)
+        :param start_method: Multiprocessing start method, uses the platform default when None
+        :param timeout: Time in seconds to wait for the workers before giving up, waits forever when None
+        """
+        if num_simulators <= 0:
+            raise ValueError("The amount of simulators should be bigger than zero")
+        if steps_per_action <= 0:
+            raise ValueError("The amount of steps per action should be bigger than zero")
+
+        if robot_config is None:
+            robot_config = dict()
+
+        self._num_simulators = num_simulators
+        self._timeout = timeout
+        self._closed = False
+
+        context = multiprocessing.get_context(start_method)
+
+        num_thrusters = len(load_robot_config(model, **robot_config)['thrusters'])
+
+        # The raw arrays are handed to the workers when they start, after that they are only accessed as numpy views.
+        shared_actions = context.RawArray('b', num_simulators * num_thrusters * np.dtype(np.float64).itemsize)
+        shared_observations = context.RawArray('b', num_simulators * OBSERVATION_DTYPE.itemsize)
+        shared_commands = context.RawArray('b', num_simulators * np.dtype(np.int64).itemsize)
+
+        self._actions = _as_array(shared_actions, np.float64, (num_simulators, num_thrusters))
+        self._observations = _as_array(shared_observations, OBSERVATION_DTYPE, (num_simulators,))
+        self._commands = _as_array(shared_commands, np.int64, (num_simulators,))
+        self._commands[:] = _IDLE
+
+        self._barrier = context.Barrier(num_simulators + 1)
+
+        self._workers = [context.Process(target=_worker,
+                                         args=(i, time_step, steps_per_action, model, robot_config,
+                                               shared_actions, shared_observations, shared_commands,
+                                               num_thrusters, self._barrier),
+                                         daemon=True)
+                         for i in range(num_simulators)]
+
+        for worker in self._workers:
+            worker.start()
+
+        # Wait until all the workers have created their simulator and written their initial observation.
+        self._synchronize()
+
+    def _synchronize(self) -> None:
+        try:
+            self._barrier.wait(self._timeout)
+        except BrokenBarrierError:
+            self.close()
+            raise RuntimeError("A simulator worker failed or didn't respond in time")
+
+    def _run(self, command: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        if self._closed:
+            raise RuntimeError("The vector simulator has been closed")
+
+        if mask is None:
+            self._commands[:] = command
+        else:
+            self._commands[:] = np.where(mask, command, _IDLE)
+
+        # The first barrier starts the workers, the second one waits for them to finish.
+        self._synchronize()
+        self._synchronize()
+
+        return self._observations
+
+    def step(self, thrusts: np.ndarray) -> np.ndarray:
+        """
+        Sets the desired thrust of every thruster of every simulator and progresses all simulators.
+        :param thrusts: Array with shape (num_simulators, num_thrusters) with the desired thrust in Newton
+        :return: The observations (see OBSERVATION_DTYPE). This is the shared buffer, so it is overwritten by the next
+            call to step or reset.
+        """
+        self._actions[:] = thrusts
+        return self._run(_STEP)
+
+    def reset(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Resets the robots of the simulators. The sensor values of the observations of those simulators are cleared, so no
+        values of the previous episode are given.
+        :param mask: Boolean array that selects the simulators to reset, resets all of them when None.
+        :return: The observations (see OBSERVATION_DTYPE).
+        """
+        return self._run(_RESET, mask)
+
+    @property
+    def observations(self) -> np.ndarray:
+        return self._observations
+
+    @property
+    def num_simulators(self) -> int:
+        return self._num_simulators
+
+    @property
+    def num_thrusters(self) -> int:
+        return self._actions.shape[1]
+
+    def close(self) -> None:
+        """
+        Stops all the workers.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        if not self._barrier.broken:
+            self._commands[:] = _CLOSE
+            try:
+                self._barrier.wait(self._timeout)
+            except BrokenBarrierError:
+                pass
+
+        for worker in self._workers:
+            worker.join(self._timeout)
+            if worker.is_alive():
+                worker.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _as_array(shared_array, dtype, shape) -> np.ndarray:
+    return np.frombuffer(shared_array, dtype=dtype).reshape(shape)
+
+
+def _clear_sensor_observation(observation: np.ndarray) -> None:
+    for field in _SENSOR_FIELDS:
+        observation[field] = np.nan
+    observation['dvl_velocity_valid'] = False
+
+
+def _write_observation(simulator: Simulator, observation: np.ndarray) -> None:
+    robot = simulator.robot
+    state = robot.state
+
+    observation['time'] = simulator.get_time_in_seconds()
+    observation['position'] = state.position_array
+    observation['orientation'] = PybulletAPI.getEulerFromQuaternion(state.orientation).numpy()
+    observation['velocity'] = state.velocity.numpy()
+    observation['angular_velocity'] = state.angular_velocity.numpy()
+
+    # Sensors only produce values at their own rate, so the previous value of the episode is kept when there is no new
+    #  one.
+    pressure = robot.pressure_sensor.get_latest_value()
+    if pressure is not None:
+        observation['pressure'] = pressure[1][0]
+
+    imu = robot.imu.get_latest_value()
+    if imu is not None:
+        acceleration, angular_velocity, magnetic_field = imu[1]
+        observation['accelerometer'] = acceleration.numpy()
+        observation['gyroscope'] = angular_velocity.numpy()
+        observation['magnetometer'] = magnetic_field.numpy()
+
+    dvl = robot.dvl.get_latest_value()
+    if dvl is not None:
+        dvl = dvl[1]
+        observation['dvl_velocity'] = [dvl['vx'], dvl['vy'], dvl['vz']]
+        observation['dvl_altitude'] = np.nan if dvl['altitude'] is None else dvl['altitude']
+        observation['dvl_velocity_valid'] = dvl['velocity_valid']
+
+
+def _worker(index: int, time_step: int, steps_per_action: int, model: Models, robot_config: Dict,
+            shared_actions, shared_observations, shared_commands, num_thrusters: int, barrier) -> None:
+    num_simulators = barrier.parties - 1
+    try:
+        actions = _as_array(shared_actions, np.float64, (num_simulators, num_thrusters))
+        observations = _as_array(shared_observations, OBSERVATION_DTYPE, (num_simulators,))
+        commands = _as_array(shared_commands, np.int64, (num_simulators,))
+
+        simulator = Simulator(time_step, gui=False)
+        robot = simulator.create_robot(model, **robot_config)
+        observation = observations[index:index + 1]
+        _clear_sensor_observation(observation)
+        _write_observation(simulator, observation)
+
+        barrier.wait()
+
+        while True:
+            barrier.wait()
+
+            command = commands[index]
+            if command == _CLOSE:
+                break
+
+            if command == _RESET:
+                simulator.reset_robot()
+                robot = simulator.robot
+                _clear_sensor_observation(observation)
+                _write_observation(simulator, observation)
+            elif command == _STEP:
+                for thruster, thrust in zip(robot.thrusters.values(), actions[index]):
+                    thruster.set_desired_thrust(thrust)
+
+                simulator.step_n(steps_per_action)
+                _write_observation(simulator, observation)
+
+            barrier.wait()
+
+        simulator.shutdown()
+    except BrokenBarrierError:
+        pass
+    except BaseException:
+        # Let the parent (and the other workers) know that something went wrong instead of letting them wait forever.
+        barrier.abort()
+        raise
@@ -64,7 +64,7 @@ def main():
 
         lobster_pos, lobster_orn = simulator.robot.get_position_and_orientation()
 
-        terrain_loader.update(lobster_pos)
+        terrain_loader.update(lobster_pos, simulator.robot.get_velocity())
 
         if not paused:
 
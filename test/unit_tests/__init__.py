@@ -0,0 +1,23 @@
+import os
+import tempfile
+from unittest import mock
+
+from lobster_simulator.common import disk_cache
+
+
+class TemporaryCacheMixin:
+    """
+    Points the disk cache at a temporary directory during every test, so the tests don't use the cache in the home
+    directory. It should come before unittest.TestCase in the bases, the directory is available as cache_dir.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+        environment = mock.patch.dict(os.environ,
+                                      {disk_cache.CACHE_DIRECTORY_ENVIRONMENT_VARIABLE: self.cache_dir.name})
+        environment.start()
+        self.addCleanup(environment.stop)
@@ -0,0 +1,44 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from lobster_simulator.common import disk_cache
+from .. import TemporaryCacheMixin
+
+
+class DiskCacheTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def test_save_and_load(self):
+        array = np.arange(12, dtype=float).reshape(4, 3)
+        key = disk_cache.cache_key(1, 0.5)
+
+        self.assertIsNone(disk_cache.load_array('test', key))
+        disk_cache.save_array('test', key, array)
+        np.testing.assert_array_equal(array, disk_cache.load_array('test', key))
+
+    def test_key_depends_on_file_content(self):
+        file = os.path.join(self.cache_dir.name, 'model.urdf')
+        with open(file, 'w') as f:
+            f.write('a')
+        key = disk_cache.cache_key(1, files=[file])
+
+        with open(file, 'w') as f:
+            f.write('b')
+
+        self.assertNotEqual(key, disk_cache.cache_key(1, files=[file]))
+
+    def test_empty_directory_disables_cache(self):
+        with mock.patch.dict(os.environ, {disk_cache.CACHE_DIRECTORY_ENVIRONMENT_VARIABLE: ''}):
+            disk_cache.save_array('test', 'key', np.zeros(3))
+            self.assertIsNone(disk_cache.load_array('test', 'key'))
+
+    def test_save_and_load_multiple_arrays(self):
+        arrays = {'a': np.arange(3), 'b': np.ones((2, 2))}
+        disk_cache.save_arrays('test', 'key', arrays)
+
+        loaded = disk_cache.load_arrays('test', 'key')
+        self.assertEqual(set(arrays), set(loaded))
+        for name in arrays:
+            np.testing.assert_array_equal(arrays[name], loaded[name])
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from lobster_simulator.common.mesh import voxelize, mesh_volume
+
+
+def box_triangles(size):
+    """Closed mesh of an axis aligned box centered at the origin with outward facing triangles."""
+    corners = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)]) * np.array(size) / 2
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    triangles = []
+    for a, b, c, d in faces:
+        triangles.append(corners[[a, b, c]])
+        triangles.append(corners[[a, c, d]])
+    return np.array(triangles, dtype=float)
+
+
+class MeshTest(unittest.TestCase):
+
+    def test_mesh_volume_of_box(self):
+        self.assertAlmostEqual(0.4 * 0.2 * 0.1, mesh_volume(box_triangles([0.4, 0.2, 0.1])))
+
+    def test_voxelize_box(self):
+        triangles = box_triangles([0.4, 0.2, 0.1])
+        centers, volumes = voxelize(triangles, 0.02)
+
+        self.assertAlmostEqual(mesh_volume(triangles), volumes.sum(), delta=1e-4)
+        np.testing.assert_allclose([0, 0, 0], (centers * volumes[:, None]).sum(axis=0) / volumes.sum(), atol=2e-3)
+        self.assertTrue(np.all(np.abs(centers) < np.array([0.2, 0.1, 0.05]) + 0.02))
@@ -2,31 +2,53 @@ import unittest
 from unittest import mock
 from unittest.mock import Mock
 
+import numpy as np
+from lobster_common.vec3 import Vec3
+from pkg_resources import resource_filename
+
 from lobster_simulator.common.pybullet_api import PybulletAPI
 from lobster_simulator.common.simulation_time import SimulationTime
 
 
 class PybulletApiTest(unittest.TestCase):
 
-    def test_resetting(self):
-        PybulletAPI._INSTANCE = Mock()
-        # Reset is called when old instance is still connected to a physics server
-        with mock.patch("pybullet.isConnected", return_value=True):
-            with mock.patch("pybullet.resetSimulation", return_value=True) as resetSimulationMock:
-                p = PybulletAPI(SimulationTime(1000))
-                resetSimulationMock.assert_called_once()
-
-        # Reset is not called when not connected
-        with mock.patch("pybullet.isConnected", return_value=False):
-            with mock.patch("pybullet.resetSimulation", return_value=True) as resetSimulationMock:
-                p = PybulletAPI(SimulationTime(1000))
-                resetSimulationMock.assert_not_called()
-
-        PybulletAPI._INSTANCE = None
+    def test_new_instance_does_not_reset_existing_clients(self):
+        previous_instance = PybulletAPI._INSTANCE
 
         with mock.patch("pybullet.resetSimulation", return_value=True) as resetSimulationMock:
-            PybulletAPI(SimulationTime(1000))
+            first = PybulletAPI(SimulationTime(1000))
+            second = PybulletAPI(SimulationTime(1000))
             resetSimulationMock.assert_not_called()
 
-        # Checking for no side effects
-        self.assertIsNone(PybulletAPI._INSTANCE)
+        # Every instance has its own physics client
+        self.assertNotEqual(first.physics_client_id, second.physics_client_id)
+
+        # Checking for no side effects on the default instance
+        self.assertIs(previous_instance, PybulletAPI._INSTANCE)
+
+        PybulletAPI.disconnect(first.physics_client_id)
+        PybulletAPI.disconnect(second.physics_client_id)
+
+    def test_initialize_sets_default_client(self):
+        physics_client_id = PybulletAPI.initialize(SimulationTime(1000), False)
+        self.addCleanup(PybulletAPI.disconnect, physics_client_id)
+
+        self.assertEqual(physics_client_id, PybulletAPI.get_pybullet_id())
+        self.assertFalse(PybulletAPI.gui())
+
+    def test_ray_test_batch_matches_ray_test(self):
+        physics_client_id = PybulletAPI.initialize(SimulationTime(1000), False)
+        self.addCleanup(PybulletAPI.disconnect, physics_client_id)
+        PybulletAPI.loadURDF(resource_filename("lobster_simulator", "data/plane1000.urdf"), Vec3([0, 0, 10]),
+                             physicsClientId=physics_client_id)
+
+        starts = np.array([[0, 0, 0], [5, 3, 0], [0, 0, 0]], dtype=float)
+        ends = np.array([[0, 0, 20], [5, 3, 40], [0, 0, -20]], dtype=float)
+
+        _, hit_fractions, hit_positions, _ = PybulletAPI.rayTestBatch(starts, ends, physicsClientId=physics_client_id)
+
+        for i in range(len(starts)):
+            hit_fraction, hit_position, _ = PybulletAPI.rayTest(Vec3(starts[i]), Vec3(ends[i]),
+                                                                physicsClientId=physics_client_id)
+            self.assertAlmostEqual(hit_fraction, hit_fractions[i])
+            np.testing.assert_almost_equal(hit_position.numpy(), hit_positions[i])
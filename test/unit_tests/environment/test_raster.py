@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.environment.raster import BathymetryRaster
+from lobster_simulator.environment.terrain import Terrain
+from .. import TemporaryCacheMixin
+
+
+def plane(x, y):
+    return 0.5 * x - 0.25 * y - 40
+
+
+class BathymetryRasterTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.directory = tempfile.TemporaryDirectory()
+
+        # A tilted plane, which bilinear interpolation reproduces exactly.
+        self.cell_size = 2.5
+        self.origin = (-100, -50)
+        rows, columns = np.mgrid[0:120, 0:80]
+        self.grid = plane(self.origin[0] + rows * self.cell_size,
+                          self.origin[1] + columns * self.cell_size).astype(np.float32)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_grid_file_is_memory_mapped(self):
+        path = os.path.join(self.directory.name, 'survey.grid')
+        BathymetryRaster.write_grid(path, self.grid, self.cell_size, self.origin)
+
+        raster = BathymetryRaster.open(path)
+        self.assertIsInstance(raster.grid, np.memmap)
+        self.assertEqual(self.grid.shape, raster.grid.shape)
+        self.assertEqual((-100, -100 + 119 * 2.5, -50, -50 + 79 * 2.5), raster.bounds)
+
+        rng = np.random.default_rng(0)
+        x = rng.uniform(-100, 190, (20, 30))
+        y = rng.uniform(-50, 140, (20, 30))
+        np.testing.assert_allclose(plane(x, y), raster(x, y), atol=1e-4)
+
+    def test_npy_grid(self):
+        path = os.path.join(self.directory.name, 'survey.npy')
+        np.save(path, -self.grid)
+
+        raster = BathymetryRaster.open(path, cell_size=self.cell_size, origin=self.origin, positive_down=True)
+        self.assertIsInstance(raster.grid, np.memmap)
+        np.testing.assert_allclose(plane(np.array([0, 10.3]), np.array([0, 7.1])), raster([0, 10.3], [0, 7.1]),
+                                   atol=1e-4)
+
+        with self.assertRaises(ValueError):
+            BathymetryRaster.open(path)
+
+    def test_edges_and_missing_data(self):
+        grid = np.array([[0, 10, -9999],
+                         [20, 30, -9999],
+                         [-9999, -9999, -9999]], dtype=float)
+        raster = BathymetryRaster(grid, 1, nodata=-9999, fill_value=-50)
+
+        # The edges are extended beyond the grid.
+        np.testing.assert_allclose([0, 20, 5], raster([-5, 1, -5], [-5, -5, 0.5]))
+
+        # Cells without data are left out, unless there are only such cells.
+        np.testing.assert_allclose([15, 10, 30, -50], raster([0.5, 0, 1.5, 2], [0.5, 1.5, 1.5, 2]))
+
+    def test_terrain_of_raster(self):
+        path = os.path.join(self.directory.name, 'survey.grid')
+        BathymetryRaster.write_grid(path, self.grid, self.cell_size, self.origin)
+
+        PybulletAPI(SimulationTime(4000))
+        try:
+            terrain = Terrain.bathymetry_terrain(path, depth=20, cache_tiles=True)
+            terrain.load_chunk(0, 0)
+            terrain.close()
+
+            points = terrain.points_per_chunk
+            steps = terrain.point_spacing * np.arange(points)
+            expected = plane(steps[:, None], steps[None, :]).reshape(-1)
+            np.testing.assert_allclose(expected, terrain.get_height_field(0, 0), atol=1e-4)
+
+            # The chunk is stored, and stored under another key when the survey changes.
+            np.testing.assert_array_equal(terrain.get_height_field(0, 0), terrain._tile_store(0).get((0, 0)))
+            BathymetryRaster.write_grid(path, self.grid + 1, self.cell_size, self.origin)
+            os.utime(path, ns=(0, 0))
+            self.assertNotEqual(terrain._tile_key, BathymetryRaster.open(path).key)
+        finally:
+            PybulletAPI.disconnect()
+
+    def test_cells_are_at_their_world_position(self):
+        path = os.path.join(self.directory.name, 'survey.grid')
+        BathymetryRaster.write_grid(path, self.grid, self.cell_size, self.origin)
+
+        PybulletAPI(SimulationTime(4000))
+        try:
+            terrain = Terrain.bathymetry_terrain(path, depth=20)
+            terrain.load_chunk(0, 0)
+            terrain.load_chunk(0, -1)
+            terrain.close()
+
+            # Row r and column c of the grid are r cells north and c cells east of the origin, a ray down onto that
+            #  point of the world hits the seabed at the depth of the cell.
+            for row, column in [(48, 60), (76, 8)]:
+                north = self.origin[0] + row * self.cell_size
+                east = self.origin[1] + column * self.cell_size
+
+                _, _, hit_positions, _ = PybulletAPI.rayTestBatch(np.array([[north, east, -200]]),
+                                                                  np.array([[north, east, 400]]))
+                self.assertAlmostEqual(20 - self.grid[row, column], hit_positions[0, 2], places=3)
+        finally:
+            PybulletAPI.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import math
+import threading
+import time
+import unittest
+
+import noise
+import numpy as np
+
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.environment import perlin
+from lobster_simulator.environment.terrain import Terrain
+from .. import TemporaryCacheMixin
+
+
+class PerlinTest(unittest.TestCase):
+
+    def test_matches_noise_package(self):
+        rng = np.random.default_rng(0)
+        x = rng.uniform(-20, 20, 1000)
+        y = rng.uniform(-20, 20, 1000)
+
+        for parameters in [dict(), dict(octaves=6, persistence=0.5, lacunarity=2.0, base=1),
+                           dict(octaves=3, persistence=0.7, lacunarity=2.5, repeatx=8, repeaty=16)]:
+            expected = [noise.pnoise2(float(a), float(b), **parameters) for a, b in zip(x, y)]
+            np.testing.assert_allclose(expected, perlin.pnoise2(x, y, **parameters), atol=1e-6)
+
+    def test_keeps_shape(self):
+        x, y = np.meshgrid(np.linspace(0, 1, 4), np.linspace(0, 1, 3))
+        self.assertEqual((3, 4), perlin.pnoise2(x, y, octaves=2).shape)
+
+
+class TerrainTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        PybulletAPI(SimulationTime(4000))
+
+    def tearDown(self) -> None:
+        PybulletAPI.disconnect()
+
+    def test_height_field_matches_scalar_height_function(self):
+        def height(x, y):
+            return math.sin(x / 20) * 30 + math.sin(y / 30) * 10
+
+        terrain = Terrain.sine_wave_terrain()
+        scalar_terrain = Terrain(height, vectorized=False)
+
+        heights = terrain.get_height_field(2, -3)
+
+        # The height function gets world coordinates, point i along y and j along x is at index i + j * points.
+        expected = []
+        for j in range(terrain.points_per_chunk):
+            for i in range(terrain.points_per_chunk):
+                expected.append(height(2 * terrain.chunk_size + terrain.point_spacing * j,
+                                       -3 * terrain.chunk_size + terrain.point_spacing * i))
+
+        np.testing.assert_allclose(expected, heights)
+        np.testing.assert_allclose(expected, scalar_terrain.get_height_field(2, -3))
+
+    def test_load_chunk(self):
+        terrain = Terrain.perlin_noise_terrain(30)
+        self.assertGreaterEqual(terrain.load_chunk(0, 0), 0)
+
+    def update_until_loaded(self, terrain: Terrain, position: Vec3, velocity: Vec3 = None) -> int:
+        updates = 0
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            terrain.update(position, velocity)
+            updates += 1
+            if terrain._complete:
+                return updates
+            time.sleep(0.001)
+        self.fail("The terrain wasn't loaded in time")
+
+    def test_height_fields_are_generated_in_the_background(self):
+        threads = set()
+
+        def height(x, y):
+            threads.add(threading.current_thread())
+            return np.sin(x / 20) * 30
+
+        terrain = Terrain(height, load_budget=0)
+        try:
+            updates = self.update_until_loaded(terrain, Vec3([0, 0, 0]))
+
+            self.assertNotIn(threading.current_thread(), threads)
+            # Without a budget only one chunk is added per update.
+            self.assertGreaterEqual(updates, 9)
+            self.assertEqual({(i, j) for i in range(-1, 2) for j in range(-1, 2)}, set(terrain.chunks))
+
+            # Moving a chunk removes the chunks that are out of range.
+            self.update_until_loaded(terrain, Vec3([terrain.chunk_size + 1, 0, 0]))
+            self.assertEqual({(i, j) for i in range(0, 3) for j in range(-1, 2)}, set(terrain.chunks))
+        finally:
+            terrain.close()
+
+    def test_chunks_are_prefetched_along_the_velocity(self):
+        terrain = Terrain.sine_wave_terrain(prefetch_time=10)
+        try:
+            self.update_until_loaded(terrain, Vec3([0, 0, 0]), Vec3([2 * terrain.chunk_size / 10, 0, 0]))
+
+            # The chunks around the chunk the robot reaches in 10 seconds are generated, but not loaded yet.
+            self.assertIn((3, 0, 0), terrain._height_fields)
+            self.assertNotIn((3, 0), terrain.chunks)
+
+            # Only the chunks ahead of the robot are prefetched.
+            prefetched = {key[:2] for key in terrain._height_fields}
+            self.assertTrue(all(chunk_x >= 1 for chunk_x, _ in prefetched))
+
+            # The prefetched height field is the terrain at the point the robot reaches, ahead of it along x.
+            x, y = 2.5 * terrain.chunk_size, 10
+            self.update_until_loaded(terrain, Vec3([0, 0, 0]), Vec3([x / 10, y / 10, 0]))
+            body = terrain._create_chunk(2, 0, terrain._height_fields[(2, 0, 0)].result(timeout=10))
+
+            object_ids, _, hit_positions, _ = PybulletAPI.rayTestBatch(np.array([[x, y, -200]]),
+                                                                      np.array([[x, y, 400]]))
+            self.assertEqual(body, object_ids[0])
+            self.assertAlmostEqual(terrain.depth - terrain.height_function(x, y), hit_positions[0, 2], delta=0.5)
+        finally:
+            terrain.close()
+
+    def test_level_of_detail(self):
+        terrain = Terrain.sine_wave_terrain(render_distance=5, lod_distances=(1,), load_budget=1)
+        try:
+            self.update_until_loaded(terrain, Vec3([0, 0, 0]))
+            self.assertEqual({key: 0 if max(abs(key[0]), abs(key[1])) <= 1 else 1
+                              for key in terrain._chunks_around((0, 0))}, terrain.chunk_levels)
+
+            # The corners of a coarser chunk are the same.
+            fine = terrain.get_height_field(2, 0, 0).reshape(32, 32)
+            coarse = terrain.get_height_field(2, 0, 1).reshape(16, 16)
+            np.testing.assert_allclose(fine[::31, ::31], coarse[::15, ::15])
+
+            # Moving closer to a chunk replaces it by a chunk with more detail, and the other way around.
+            self.update_until_loaded(terrain, Vec3([terrain.chunk_size + 1, 0, 0]))
+            self.assertEqual(0, terrain.chunk_levels[(2, 0)])
+            self.assertEqual(1, terrain.chunk_levels[(-1, 0)])
+            self.assertEqual(25, len(terrain.chunks))
+        finally:
+            terrain.close()
+
+    def test_chunk_under_the_robot_has_full_detail(self):
+        terrain = Terrain.sine_wave_terrain(render_distance=5, lod_distances=(0,), load_budget=1)
+        try:
+            for x, y in [(560, 40), (60, 60), (-200, 300)]:
+                self.update_until_loaded(terrain, Vec3([x, y, 0]))
+                self.assertEqual(0, terrain.chunk_levels[terrain.current_chunk])
+
+                object_ids, _, hit_positions, _ = PybulletAPI.rayTestBatch(np.array([[x, y, -200]]),
+                                                                          np.array([[x, y, 400]]))
+                self.assertEqual(terrain.chunks[terrain.current_chunk], object_ids[0])
+                self.assertAlmostEqual(terrain.depth - terrain.height_function(x, y), hit_positions[0, 2], delta=0.5)
+        finally:
+            terrain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
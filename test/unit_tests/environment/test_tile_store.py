@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.environment import tile_store
+from lobster_simulator.environment.terrain import Terrain
+from lobster_simulator.environment.tile_store import TileStore
+from .. import TemporaryCacheMixin
+
+
+class TileStoreTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_tiles_are_persistent(self):
+        store = TileStore(self.directory.name, (4, 3))
+        tiles = {(x, -x): np.arange(12, dtype=float).reshape(4, 3) * x for x in range(5)}
+        for coordinates, tile in tiles.items():
+            store.put(coordinates, tile)
+
+        self.assertIsNone(store.get((1, 1)))
+
+        reopened = TileStore(self.directory.name, (4, 3))
+        self.assertEqual(5, len(reopened))
+        for coordinates, tile in tiles.items():
+            np.testing.assert_array_equal(tile, reopened.get(coordinates))
+
+    def test_tiles_of_other_stores_are_seen(self):
+        first = TileStore(self.directory.name, (2,))
+        second = TileStore(self.directory.name, (2,))
+
+        first.put((0, 0), np.array([1, 2]))
+        second.put((1, 0), np.array([3, 4]))
+
+        np.testing.assert_array_equal([3, 4], first.get((1, 0)))
+        np.testing.assert_array_equal([1, 2], second.get((0, 0)))
+        self.assertEqual(2, len(first))
+
+    def test_resident_tiles_are_bounded(self):
+        store = TileStore(self.directory.name, (2,), max_resident_tiles=3)
+        for x in range(10):
+            store.put((x, 0), np.array([x, x]))
+
+        self.assertEqual(3, store.resident_count)
+        np.testing.assert_array_equal([0, 0], store.get((0, 0)))
+        self.assertEqual(3, store.resident_count)
+
+    def test_partially_written_tile_is_ignored(self):
+        store = TileStore(self.directory.name, (2,))
+        store.put((0, 0), np.array([1, 2]))
+
+        # A tile whose index entry was never written, like after a crash.
+        with open(os.path.join(self.directory.name, tile_store.TILES_FILE_NAME), 'ab') as f:
+            f.write(b'\0' * 5)
+
+        reopened = TileStore(self.directory.name, (2,))
+        self.assertIsNone(reopened.get((1, 0)))
+        reopened.put((1, 0), np.array([3, 4]))
+
+        np.testing.assert_array_equal([3, 4], TileStore(self.directory.name, (2,)).get((1, 0)))
+
+
+class TerrainTileStoreTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        PybulletAPI(SimulationTime(4000))
+
+    def tearDown(self) -> None:
+        PybulletAPI.disconnect()
+
+    def test_chunks_are_reused_between_runs(self):
+        terrain = Terrain.perlin_noise_terrain(30, cache_tiles=True)
+        terrain.load_chunk(2, -1)
+        expected = terrain.get_height_field(2, -1)
+
+        terrain = Terrain.perlin_noise_terrain(30, cache_tiles=True)
+        with mock.patch.object(terrain, 'get_height_field') as get_height_field:
+            terrain.load_chunk(2, -1)
+            get_height_field.assert_not_called()
+
+        np.testing.assert_array_equal(expected, terrain._height_field(2, -1))
+
+    def test_different_terrains_use_different_stores(self):
+        Terrain.perlin_noise_terrain(30, cache_tiles=True).load_chunk(0, 0)
+
+        terrain = Terrain.sine_wave_terrain(30, cache_tiles=True)
+        np.testing.assert_array_equal(terrain.get_height_field(0, 0), terrain._height_field(0, 0))
+
+    def test_stored_tiles_are_read_in_the_background(self):
+        Terrain.sine_wave_terrain(30, cache_tiles=True, render_distance=1).load_chunk(0, 0)
+
+        terrain = Terrain.sine_wave_terrain(30, cache_tiles=True, render_distance=1)
+        threads = set()
+        tile_store = terrain._tile_store
+
+        def record_thread(level):
+            threads.add(threading.current_thread())
+            return tile_store(level)
+
+        try:
+            with mock.patch.object(terrain, '_tile_store', side_effect=record_thread):
+                terrain.update(Vec3([1, 1, 0]))
+                terrain._height_fields[(0, 0, 0)].result(timeout=10)
+                terrain.update(Vec3([1, 1, 0]))
+
+            self.assertIn((0, 0), terrain.chunks)
+            self.assertTrue(threads)
+            self.assertNotIn(threading.current_thread(), threads)
+        finally:
+            terrain.close()
+
+    def test_tiles_are_only_stored_when_asked(self):
+        Terrain.perlin_noise_terrain(30).load_chunk(0, 0)
+
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir.name, 'terrain')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,12 @@
 import json
+import math
 import unittest
 from unittest import mock
 from unittest.mock import Mock, MagicMock
 
-from lobster_common.constants import Z
+import numpy as np
+
+from lobster_common.constants import X, Z
 from lobster_common.quaternion import Quaternion
 from lobster_common.vec3 import Vec3
 from pkg_resources import resource_stream
@@ -12,9 +15,11 @@ from lobster_simulator.common.pybullet_api import PybulletAPI
 from lobster_simulator.common.simulation_time import SimulationTime
 from lobster_simulator.robot import buoyancy, auv
 from lobster_simulator.robot.buoyancy import NoTestPointsCreated
+from lobster_simulator.robot.robot_state import RobotState
+from .. import TemporaryCacheMixin
 
 
-class BuoyancyTest(unittest.TestCase):
+class BuoyancyTest(TemporaryCacheMixin, unittest.TestCase):
 
     def test_creating_test_points_scout_alpha(self):
         PybulletAPI.initialize(SimulationTime(1000), False)
@@ -68,3 +73,52 @@ class BuoyancyTest(unittest.TestCase):
         robot_mock.apply_force.assert_called_once()
         self.assertEqual(buoyancy_obj._buoyancy, -robot_mock.apply_force.call_args[0][1][Z],
                          msg="buoyancy force is not as expected to be when robot is fully underwater.")
+
+    def test_buoyancy_point_is_centroid_of_submerged_test_points(self):
+        robot_mock = MagicMock()
+        with mock.patch("lobster_simulator.robot.buoyancy.Buoyancy._check_ray_hits_robot", return_value=True):
+            buoyancy_obj = buoyancy.Buoyancy(robot_mock, 0.5, 1, resolution=0.1)
+
+        robot_mock.apply_force = Mock()
+        robot_mock.get_position_and_orientation = Mock(return_value=(Vec3((0, 0, 0)), Quaternion((0, 0, 0, 1))))
+
+        buoyancy_obj.update()
+
+        submerged = buoyancy_obj.test_points[buoyancy_obj.test_points[:, Z] > 0]
+        buoyancy_point, buoyancy_force = robot_mock.apply_force.call_args[0][:2]
+
+        self.assertAlmostEqual(submerged[:, Z].mean(), buoyancy_point[Z])
+        self.assertAlmostEqual(-buoyancy_obj._buoyancy * len(submerged) / len(buoyancy_obj.test_points),
+                               buoyancy_force[Z])
+
+    def test_cylinder_model_half_submerged(self):
+        radius = 0.1
+        robot_mock = MagicMock()
+        buoyancy_obj = buoyancy.Buoyancy(robot_mock, radius, 2, model=buoyancy.BuoyancyModel.CYLINDER)
+
+        robot_mock.apply_force = Mock()
+        robot_mock.get_position_and_orientation = Mock(return_value=(Vec3((0, 0, 0)), Quaternion((0, 0, 0, 1))))
+
+        buoyancy_obj.update()
+
+        buoyancy_point, buoyancy_force = robot_mock.apply_force.call_args[0][:2]
+
+        self.assertAlmostEqual(-buoyancy_obj._buoyancy / 2, buoyancy_force[Z])
+        # The center of a half disk lies 4r/(3 pi) from its straight edge
+        self.assertAlmostEqual(4 * radius / (3 * math.pi), buoyancy_point[Z])
+        self.assertAlmostEqual(0, buoyancy_point[X])
+
+    def test_cylinder_model_matches_sampled_model(self):
+        robot_mock = MagicMock()
+        with mock.patch("lobster_simulator.robot.buoyancy.Buoyancy._check_ray_hits_robot", return_value=True):
+            sampled = buoyancy.Buoyancy(robot_mock, 0.1, 2, resolution=0.01)
+        cylinder = buoyancy.Buoyancy(robot_mock, 0.1, 2, model=buoyancy.BuoyancyModel.CYLINDER)
+
+        # Pitched by 0.1 radians
+        state = RobotState(Vec3((0, 0, 0.05)), Quaternion((0, math.sin(0.05), 0, math.cos(0.05))))
+
+        sampled_point, sampled_fraction = sampled._sampled_buoyancy(state)
+        cylinder_point, cylinder_fraction = cylinder._cylinder_buoyancy(state)
+
+        self.assertAlmostEqual(sampled_fraction, cylinder_fraction, delta=0.01)
+        np.testing.assert_allclose(sampled_point.numpy(), cylinder_point.numpy(), atol=0.02)
@@ -0,0 +1,64 @@
+import math
+import unittest
+
+import numpy as np
+
+from lobster_simulator.robot.hull_volume import HullVolume
+
+
+class HullVolumeTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # Voxels of a box of 1 x 0.2 x 0.2 meter
+        self.voxel_size = 0.02
+        axes = [np.arange(-half + self.voxel_size / 2, half, self.voxel_size) for half in (0.5, 0.1, 0.1)]
+        self.centers = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+        self.volumes = np.full(len(self.centers), self.voxel_size ** 3)
+
+        self.hull_volume = HullVolume.from_voxels(self.centers, self.volumes, self.voxel_size)
+
+    def test_completely_submerged_and_dry(self):
+        volume, center = self.hull_volume.submerged(np.array([0, 0, 1]), 2)
+        self.assertAlmostEqual(self.volumes.sum(), volume)
+        np.testing.assert_allclose([0, 0, 0], center, atol=1e-9)
+
+        volume, _ = self.hull_volume.submerged(np.array([0, 0, 1]), -2)
+        self.assertEqual(0, volume)
+
+    def test_matches_voxels(self):
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            down = rng.normal(size=3)
+            down /= np.linalg.norm(down)
+            depth = rng.uniform(-0.3, 0.3)
+
+            volume, center = self.hull_volume.submerged(down, depth)
+
+            submerged = self.centers.dot(down) > -depth
+            expected_volume = self.volumes[submerged].sum()
+
+            self.assertAlmostEqual(expected_volume, volume, delta=0.02 * self.volumes.sum())
+            if expected_volume > 0.1 * self.volumes.sum():
+                np.testing.assert_allclose(self.centers[submerged].mean(axis=0), center, atol=0.03)
+
+    def test_half_submerged_level(self):
+        volume, center = self.hull_volume.submerged(np.array([0, 0, 1]), 0)
+
+        self.assertAlmostEqual(self.volumes.sum() / 2, volume)
+        self.assertAlmostEqual(0.05, center[2])
+        self.assertAlmostEqual(0, center[0])
+
+    def test_matches_exact_cut_between_axes(self):
+        # Every voxel is split into sub voxels, so cutting those approximates the exact cut of the voxels by a plane.
+        steps = (np.arange(4) + 0.5) * self.voxel_size / 4 - self.voxel_size / 2
+        offsets = np.stack(np.meshgrid(steps, steps, steps, indexing='ij'), axis=-1).reshape(-1, 3)
+        points = (self.centers[:, None, :] + offsets[None, :, :]).reshape(-1, 3)
+
+        for angle, pitch, depth in [(math.pi / 32, 0.1, 0.02), (0.7, 0.3, -0.05), (2, -0.2, 0.1)]:
+            down = np.array([math.sin(pitch), math.cos(pitch) * math.cos(angle), math.cos(pitch) * math.sin(angle)])
+            submerged = points.dot(down) > -depth
+
+            volume, center = self.hull_volume.submerged(down, depth)
+
+            self.assertAlmostEqual(submerged.mean() * self.volumes.sum(), volume, delta=1e-3 * self.volumes.sum())
+            np.testing.assert_allclose(points[submerged].mean(axis=0), center, atol=1e-3)
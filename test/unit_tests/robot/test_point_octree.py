@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+
+from lobster_simulator.robot.point_octree import PointOctree
+
+
+class PointOctreeTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.points = rng.uniform([-1, -0.1, -0.1], [1, 0.1, 0.1], size=(5000, 3))
+        self.octree = PointOctree(self.points, 0.02)
+
+    def test_above_plane_matches_testing_every_point(self):
+        rng = np.random.default_rng(1)
+        for _ in range(50):
+            normal = rng.normal(size=3)
+            normal /= np.linalg.norm(normal)
+            offset = rng.uniform(-0.5, 0.5)
+
+            count, total = self.octree.above_plane(normal, offset)
+
+            above = self.points[self.points.dot(normal) + offset > 0]
+            self.assertEqual(len(above), count)
+            np.testing.assert_allclose(above.sum(axis=0), total, atol=1e-9)
+
+    def test_completely_above_and_below(self):
+        count, total = self.octree.above_plane(np.array([0, 0, 1]), 1)
+        self.assertEqual(len(self.points), count)
+        np.testing.assert_allclose(self.points.sum(axis=0), total)
+
+        count, total = self.octree.above_plane(np.array([0, 0, 1]), -1)
+        self.assertEqual(0, count)
+        np.testing.assert_allclose([0, 0, 0], total)
+
+    def test_incorrect_leaf_size_raises(self):
+        with self.assertRaises(ValueError):
+            PointOctree(self.points, 0)
@@ -0,0 +1,34 @@
+import math
+import unittest
+
+import numpy as np
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.translation import vec3_local_to_world, vec3_world_to_local, vec3_rotate_vector_to_local
+from lobster_simulator.robot.robot_state import RobotState
+
+
+class RobotStateTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # Rotated 90 degrees around the z axis
+        self.orientation = Quaternion([0, 0, math.sin(math.pi / 4), math.cos(math.pi / 4)])
+        self.position = Vec3([1, 2, 3])
+        self.state = RobotState(self.position, self.orientation, velocity=Vec3([1, 0, 0]),
+                                angular_velocity=Vec3([0, 0, 1]))
+
+    def test_local_to_world_matches_translation(self):
+        local = Vec3([1, 2, 0.5])
+        np.testing.assert_almost_equal(self.state.local_to_world(local).numpy(),
+                                       vec3_local_to_world(self.position, self.orientation, local).numpy())
+
+    def test_world_to_local_matches_translation(self):
+        world = Vec3([-4, 2, 1])
+        np.testing.assert_almost_equal(self.state.world_to_local(world).numpy(),
+                                       vec3_world_to_local(self.position, self.orientation, world).numpy())
+
+    def test_body_velocity(self):
+        np.testing.assert_almost_equal(self.state.body_velocity.numpy(),
+                                       vec3_rotate_vector_to_local(self.orientation, Vec3([1, 0, 0])).numpy())
+        np.testing.assert_almost_equal(self.state.body_angular_velocity.numpy(), [0, 0, 1])
@@ -0,0 +1,110 @@
+import math
+import unittest
+from unittest import mock
+
+import numpy as np
+import pybullet
+
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.sensors.camera import Camera
+from lobster_simulator.simulator import Simulator
+from .. import TemporaryCacheMixin
+
+
+class CameraTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.simulator = Simulator(4000, gui=False)
+        PybulletAPI.loadURDF("plane.urdf", Vec3([0, 0, 30]))
+        self.simulator.create_robot()
+        self.robot = self.simulator.robot
+
+    def add_camera(self, **kwargs) -> Camera:
+        # Looking down at the plane, from below the hull.
+        orientation = PybulletAPI.getQuaternionFromEuler(Vec3([0, -math.pi / 2, 0]))
+        camera = Camera(self.robot, Vec3([0, 0, 0.5]), SimulationTime(100000), SimulationTime(0),
+                        orientation=orientation, **kwargs)
+        self.robot.add_sensor('camera', camera)
+        return camera
+
+    def test_depth(self):
+        camera = self.add_camera(width=64, height=48, depth=True)
+        self.simulator.do_step()
+
+        _, (image, depth) = camera.get_latest_value()
+        self.assertEqual((48, 64, 3), image.shape)
+
+        expected_depth = 30 - self.robot.state.position_array[2] - 0.5
+        self.assertAlmostEqual(expected_depth, float(depth[24, 32]), delta=0.05)
+
+    def test_downscale_and_rate(self):
+        camera = self.add_camera(width=64, height=48, downscale=4)
+
+        frames = []
+        for _ in range(100):
+            self.simulator.do_step()
+            frame = camera.get_frame()
+            if frame is not None:
+                frames.append(frame)
+
+        # 10 Hz for 0.4 seconds.
+        self.assertIn(len(frames), [4, 5])
+        self.assertEqual((12, 16, 3), frames[-1][1].shape)
+        self.assertEqual(len(frames), len(camera.pop_all_values()))
+
+    def test_view_matrix_is_cached(self):
+        camera = self.add_camera(width=16, height=12, buffer_capacity=2)
+
+        with mock.patch.object(PybulletAPI, 'computeViewMatrixFromPose',
+                               wraps=PybulletAPI.computeViewMatrixFromPose) as compute_view_matrix:
+            camera._render()
+            camera._render()
+            self.assertEqual(1, compute_view_matrix.call_count)
+
+            self.robot.set_position_and_orientation(position=Vec3([0, 0, 5]))
+            camera._render()
+            self.assertEqual(2, compute_view_matrix.call_count)
+
+    def test_no_rendering_without_consumers(self):
+        camera = self.add_camera(width=16, height=12)
+        camera.polling = False
+
+        with mock.patch.object(PybulletAPI, 'getCameraImage') as get_camera_image:
+            for _ in range(50):
+                self.simulator.do_step()
+            get_camera_image.assert_not_called()
+
+    def test_restore_state_keeps_the_frames(self):
+        camera = self.add_camera(width=16, height=12)
+        state = self.simulator.save_state()
+        frames = camera._frames
+
+        for _ in range(50):
+            self.simulator.do_step()
+        self.simulator.restore_state(state)
+
+        # Only the frame number is restored, the frames aren't copied.
+        self.assertIs(frames, camera._frames)
+        self.assertEqual(0, camera._frame_count)
+        self.assertEqual([], camera.pop_all_values())
+
+    def test_view_matrix_matches_bullet(self):
+        rotation = np.reshape(pybullet.getMatrixFromQuaternion(pybullet.getQuaternionFromEuler([0.3, -0.4, 1.2])),
+                              (3, 3))
+        position = np.array([1, 2, -3])
+
+        eye = Vec3(position.tolist()).asENU()
+        target = Vec3((position + rotation[:, 0]).tolist()).asENU()
+        up = Vec3((-rotation[:, 2]).tolist()).asENU()
+        expected = pybullet.computeViewMatrix(eye, target, up)
+
+        np.testing.assert_allclose(expected, PybulletAPI.computeViewMatrixFromPose(position, rotation), atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,9 +4,10 @@ from lobster_common.constants import Z
 
 from lobster_simulator.simulator import Simulator
 from lobster_common.vec3 import Vec3
+from .. import TemporaryCacheMixin
 
 
-class DepthSensorTest(unittest.TestCase):
+class DepthSensorTest(TemporaryCacheMixin, unittest.TestCase):
 
     def test_pressure_at_surface(self):
         simulator = Simulator(4000, gui=False)
@@ -35,4 +36,18 @@ class DepthSensorTest(unittest.TestCase):
             current_pressure = simulator.robot.pressure_sensor.get_pressure()
 
             self.assertLess(previous_pressure, current_pressure)
-            previous_pressure = current_pressure
\ No newline at end of file
+            previous_pressure = current_pressure
+
+    def test_values_are_kept_between_polls(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+        robot.pressure_sensor.pop_all_values()
+
+        for _ in range(10):
+            simulator.do_step()
+
+        # The pressure sensor runs at the same rate as the simulator, so no step should be missing.
+        timestamps, values = robot.pressure_sensor.drain()
+        self.assertGreaterEqual(len(timestamps), 10)
+        self.assertTrue(all(difference == 4000 for difference in timestamps[1:] - timestamps[:-1]))
+        self.assertAlmostEqual(robot.pressure_sensor.get_latest_value()[1][0], values[-1][0])
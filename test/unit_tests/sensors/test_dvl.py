@@ -6,8 +6,9 @@ from lobster_simulator.common.pybullet_api import PybulletAPI
 from lobster_simulator.common.simulation_time import SimulationTime
 from lobster_simulator.simulator import Simulator
 from lobster_common.vec3 import Vec3
+from .. import TemporaryCacheMixin
 
-class DVLTest(unittest.TestCase):
+class DVLTest(TemporaryCacheMixin, unittest.TestCase):
 
     def test_altitude(self):
         dt = SimulationTime(4000)
@@ -97,4 +98,21 @@ class DVLTest(unittest.TestCase):
             previous_velocity = Vec3(actual_velocity)
 
         # If there weren't at least 10 sensor updates the there went something wrong with the test.
-        self.assertGreater(amount_sensor_updates, 10)
\ No newline at end of file
+        self.assertGreater(amount_sensor_updates, 10)
+
+    def test_batched_rays_match_single_rays(self):
+        simulator = Simulator(4000, gui=False)
+        PybulletAPI.loadURDF("plane.urdf", Vec3([0, 0, 30]))
+        robot = simulator.create_robot()
+        simulator.do_step()
+
+        dvl = robot.dvl
+        altitudes, actual_altitude = dvl._cast_rays()
+
+        self.assertAlmostEqual(robot.get_altitude() - dvl.sensor_position[Z], actual_altitude)
+
+        state = robot.state
+        for i, end_point in enumerate(dvl.beam_end_points):
+            ray_end = state.local_to_world(dvl.sensor_position + 2 * end_point)
+            hit_fraction = PybulletAPI.rayTest(state.local_to_world(dvl.sensor_position), ray_end)[0]
+            self.assertAlmostEqual(hit_fraction * 2 * 50, altitudes[i], places=5)
@@ -0,0 +1,78 @@
+import math
+import unittest
+
+import numpy as np
+
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.sensors.imaging_sonar import ImagingSonar
+from lobster_simulator.simulator import Simulator
+from .. import TemporaryCacheMixin
+
+
+class ImagingSonarTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.simulator = Simulator(4000, gui=False)
+        PybulletAPI.loadURDF("plane.urdf", Vec3([0, 0, 30]))
+        self.simulator.create_robot()
+        self.robot = self.simulator.robot
+
+        # Looking down, so the plane is in front of the sonar.
+        orientation = PybulletAPI.getQuaternionFromEuler(Vec3([0, -math.pi / 2, 0]))
+        self.sonar = ImagingSonar(self.robot, Vec3([0.5, 0, 0]), SimulationTime(50000), SimulationTime(0),
+                                  orientation=orientation, horizontal_beams=64, vertical_beams=8, max_range=100)
+        self.robot.add_sensor('sonar', self.sonar)
+
+    def test_image_matches_single_rays(self):
+        self.simulator.do_step()
+
+        _, range_image, intensity_image = self.sonar.get_image()
+        self.assertEqual((8, 64), range_image.shape)
+
+        state = self.robot.state
+        starts = state.local_to_world_array(self.sonar._ray_starts)
+        ends = state.local_to_world_array(self.sonar._ray_ends)
+        for i in range(0, len(starts), 37):
+            hit_fraction, _, hit_normal = PybulletAPI.rayTest(Vec3(starts[i].tolist()), Vec3(ends[i].tolist()))
+            row, column = np.unravel_index(i, range_image.shape)
+            self.assertLess(hit_fraction, 1)
+            self.assertAlmostEqual(hit_fraction * 100, range_image[row, column], places=3)
+
+            direction = (ends[i] - starts[i]) / 100
+            self.assertAlmostEqual(abs(np.dot(direction, hit_normal.numpy())), intensity_image[row, column], places=5)
+
+    def test_rate_and_missing_echoes(self):
+        self.robot.set_position_and_orientation(position=Vec3([0, 0, -80]))
+
+        images = 0
+        for _ in range(100):
+            self.simulator.do_step()
+            if self.sonar.get_image() is not None:
+                images += 1
+
+        # 20 Hz for 0.4 seconds.
+        self.assertIn(images, [8, 9])
+
+        # The plane is out of range.
+        range_image, intensity_image = self.sonar.get_latest_value()[1]
+        self.assertTrue(np.isnan(range_image).all())
+        self.assertTrue((intensity_image == 0).all())
+
+    def test_subscribe(self):
+        images = []
+        self.robot.subscribe(self.sonar, images.append)
+        for _ in range(25):
+            self.simulator.do_step()
+
+        records = np.concatenate(images)
+        self.assertEqual((8, 64), records['range'].shape[1:])
+        np.testing.assert_array_equal(records['time'][-1], self.sonar.get_latest_value()[0] * 1e6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import math
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import numpy as np
+from lobster_common.constants import GRAVITY
+from lobster_common.quaternion import Quaternion
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.common.translation import vec3_rotate_vector_to_local
+from lobster_simulator.sensors.imu import IMU, ACCELEROMETER, GYROSCOPE, MAGNETOMETER, MagneticFieldVec3
+from lobster_simulator.sensors.sensor import Interpolation
+from lobster_simulator.simulator import Simulator
+from .. import TemporaryCacheMixin
+
+
+class IMUTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def test_values_in_the_sensor_frame(self):
+        acceleration = Vec3([1, 0.5, 0.2])
+        angular_velocity = Vec3([0.3, -0.2, 0.1])
+        # Rotated 90 degrees around the z axis
+        robot_orientation = Quaternion([0, 0, math.sin(math.pi / 4), math.cos(math.pi / 4)])
+
+        robot = Mock()
+
+        def set_state(seconds):
+            robot.state = SimpleNamespace(velocity=acceleration * seconds, angular_velocity=angular_velocity,
+                                          rotation_matrix=np.asarray(robot_orientation.get_rotation_matrix()))
+
+        set_state(0)
+        # Rotated 30 degrees around the x axis of the robot
+        orientation = Quaternion([math.sin(math.pi / 12), 0, 0, math.cos(math.pi / 12)])
+        time = SimulationTime(0)
+        time_step = SimulationTime(4000)
+        imu = IMU(robot, Vec3([1, 0, 0]), time_step, time, orientation=orientation)
+
+        for _ in range(5):
+            time += time_step
+            set_state(time.seconds)
+            imu.update(time, time_step)
+
+        def in_sensor_frame(world_vector):
+            return vec3_rotate_vector_to_local(orientation,
+                                               vec3_rotate_vector_to_local(robot_orientation, world_vector)).numpy()
+
+        gravity = Vec3.fromENU([0, 0, GRAVITY])
+        expected = [in_sensor_frame(acceleration + gravity), in_sensor_frame(angular_velocity),
+                    in_sensor_frame(MagneticFieldVec3)]
+
+        np.testing.assert_allclose(expected[ACCELEROMETER], imu.accelerometer.get_accelerometer_value().numpy(),
+                                   atol=1e-9)
+        np.testing.assert_allclose(expected[GYROSCOPE], imu.gyroscope.get_gyroscope_value().numpy(), atol=1e-9)
+        np.testing.assert_allclose(expected[MAGNETOMETER], imu.magnetometer.get_magnetometer_value().numpy(),
+                                   atol=1e-9)
+
+        seconds, values = imu.get_latest_value()
+        self.assertAlmostEqual(time.seconds, seconds)
+        np.testing.assert_allclose(expected, [value.numpy() for value in values], atol=1e-9)
+
+    def test_pop_from_views(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+        robot.set_velocity(linear_velocity=Vec3([1, 0.5, 0.2]), angular_velocity=Vec3([0.3, -0.2, 0.1]))
+        simulator.step_n(5)
+
+        # The IMU and each of the views get every value, no matter in which order they are popped.
+        times, values = robot.imu.drain()
+        times, values = times.copy(), values.copy()
+
+        first_time, (first_acceleration,) = robot.accelerometer.pop_next_value()
+        angular_velocities = robot.gyroscope.pop_all_values()
+        magnetic_field_times, magnetic_fields = robot.magnetometer.drain()
+        accelerations = robot.accelerometer.pop_all_values()
+
+        self.assertEqual(6, len(times))
+        self.assertAlmostEqual(times[0] / 1e6, first_time)
+        np.testing.assert_allclose(values[0, 0:3], first_acceleration.numpy())
+        np.testing.assert_allclose(values[1:, 0:3], [value[0].numpy() for _, value in accelerations])
+        np.testing.assert_allclose(values[:, 3:6], [value[0].numpy() for _, value in angular_velocities])
+        np.testing.assert_array_equal(times, magnetic_field_times)
+        np.testing.assert_allclose(values[:, 6:9], magnetic_fields)
+        self.assertIsNone(robot.accelerometer.pop_next_value())
+
+        # Popping from the views doesn't take the values from the IMU.
+        simulator.step_n(3)
+        gyroscope_times, _ = robot.gyroscope.drain()
+        imu_times, imu_values = robot.imu.drain()
+        np.testing.assert_array_equal(imu_times, gyroscope_times)
+        np.testing.assert_allclose(imu_values[:, 0:3], [value[0].numpy() for _, value in
+                                                        robot.accelerometer.pop_all_values()])
+        self.assertEqual(3, len(imu_times))
+        self.assertIsNone(robot.imu.pop_next_value())
+
+    def test_views_keep_their_values_over_a_restore(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+        simulator.step_n(4)
+        robot.imu.drain()
+
+        state = simulator.save_state()
+        times, _ = robot.accelerometer.drain()
+        times = times.copy()
+        simulator.step_n(2)
+        simulator.restore_state(state)
+
+        # The values the IMU popped before the snapshot are still there for the views, but not for the IMU.
+        np.testing.assert_array_equal(times, robot.accelerometer.drain()[0])
+        self.assertEqual(5, len(times))
+        self.assertIsNone(robot.imu.pop_next_value())
+
+    def test_quadratic_interpolation_follows_the_motion(self):
+        yaw_rate = 2
+
+        def set_state(seconds):
+            yaw = yaw_rate * seconds
+            robot.state = SimpleNamespace(
+                velocity=Vec3([seconds ** 2, 0, 0]),
+                angular_velocity=Vec3([0, 0, yaw_rate]),
+                rotation_matrix=np.array([[math.cos(yaw), -math.sin(yaw), 0], [math.sin(yaw), math.cos(yaw), 0],
+                                          [0, 0, 1]]))
+
+        robot = Mock()
+        set_state(0)
+        time = SimulationTime(0)
+        # The physics runs at 50 Hz and the IMU at 1 kHz.
+        time_step = SimulationTime(20000)
+        imu = IMU(robot, Vec3([1, 0, 0]), SimulationTime(1000), time, orientation=Quaternion([0, 0, 0, 1]),
+                  interpolation=Interpolation.QUADRATIC)
+
+        for _ in range(4):
+            time += time_step
+            set_state(time.seconds)
+            imu.update(time, time_step)
+
+        times, samples = imu.drain()
+        # The first two steps don't have enough history.
+        seconds = times[times > 40000] / 1e6
+        samples = samples[times > 40000].reshape(-1, 3, 3)
+
+        for t, sample in zip(seconds, samples):
+            yaw = yaw_rate * t
+            world_to_robot = np.array([[math.cos(yaw), math.sin(yaw), 0], [-math.sin(yaw), math.cos(yaw), 0],
+                                       [0, 0, 1]])
+            gravity = Vec3.fromENU([0, 0, GRAVITY]).numpy()
+
+            # The derivative of the velocity, plus gravity.
+            np.testing.assert_allclose(world_to_robot.dot(np.array([2 * t, 0, 0]) + gravity), sample[ACCELEROMETER],
+                                       atol=1e-9)
+            np.testing.assert_allclose([0, 0, yaw_rate], sample[GYROSCOPE], atol=1e-9)
+            np.testing.assert_allclose(world_to_robot.dot(MagneticFieldVec3.numpy()), sample[MAGNETOMETER], atol=1e-9)
+
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from lobster_simulator.sensors.noise import NoiseModel
+
+
+class NoiseModelTest(unittest.TestCase):
+
+    def test_same_seed_gives_same_noise(self):
+        times = np.arange(0, 1000000, 4000)
+        samples = np.zeros((len(times), 2))
+
+        noise = [NoiseModel(2, white_stds=[0.1, 1], bias_random_walk_stds=0.5, rng=np.random.default_rng(3),
+                            block_size=64) for _ in range(2)]
+
+        np.testing.assert_array_equal(noise[0].apply(times, samples), noise[1].apply(times, samples))
+
+        # Consuming the same samples in smaller batches gives the same noise.
+        first = noise[0].apply(times + 1000000, samples)
+        second = np.concatenate([noise[1].apply(times[:100] + 1000000, samples[:100]),
+                                 noise[1].apply(times[100:] + 1000000, samples[100:])])
+        np.testing.assert_allclose(first, second)
+
+    def test_white_noise_and_bias(self):
+        times = np.arange(0, 10000000, 1000)
+        noise = NoiseModel(2, white_stds=[0.5, 2], bias=[1, -1], rng=np.random.default_rng(0))
+
+        samples = noise.apply(times, np.zeros((len(times), 2)))
+
+        np.testing.assert_allclose([1, -1], samples.mean(axis=0), atol=0.05)
+        np.testing.assert_allclose([0.5, 2], samples.std(axis=0), rtol=0.05)
+
+    def test_bias_random_walk(self):
+        noise = NoiseModel(1000, bias_random_walk_stds=0.2, rng=np.random.default_rng(0))
+
+        # After 4 seconds the standard deviation of the bias is 0.2 * sqrt(4)
+        noise.apply(np.arange(0, 4000001, 10000), np.zeros((401, 1000)))
+        self.assertAlmostEqual(0.4, noise.bias.std(), delta=0.03)
+
+    def test_quantization(self):
+        noise = NoiseModel(2, quantization=[0.5, 0])
+
+        samples = noise.apply(np.array([0, 1]), np.array([[0.3, 0.3], [1.1, 1.1]]))
+        np.testing.assert_allclose([[0.5, 0.3], [1, 1.1]], samples)
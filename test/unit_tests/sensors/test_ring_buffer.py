@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+
+from lobster_simulator.sensors.ring_buffer import RingBuffer, OverflowPolicy
+
+
+class RingBufferTest(unittest.TestCase):
+
+    def test_pop_in_order(self):
+        buffer = RingBuffer(4, 2)
+        for i in range(3):
+            buffer.append(i * 10, [i, -i])
+
+        self.assertEqual(3, len(buffer))
+        timestamp, values = buffer.pop()
+        self.assertEqual(0, timestamp)
+        np.testing.assert_array_equal([0, 0], values)
+        self.assertEqual(10, buffer.pop()[0])
+        self.assertEqual(20, buffer.pop()[0])
+        self.assertIsNone(buffer.pop())
+
+    def test_drop_oldest(self):
+        buffer = RingBuffer(3, 1)
+        for i in range(5):
+            buffer.append(i, [i])
+
+        timestamps, values = buffer.drain()
+        np.testing.assert_array_equal([2, 3, 4], timestamps)
+        np.testing.assert_array_equal([[2], [3], [4]], values)
+        self.assertEqual(2, buffer.dropped_count)
+        self.assertEqual(0, len(buffer))
+
+    def test_drop_newest(self):
+        buffer = RingBuffer(3, 1, overflow=OverflowPolicy.DROP_NEWEST)
+        buffer.extend(np.arange(2), np.arange(2)[:, None])
+        buffer.extend(np.arange(2, 5), np.arange(2, 5)[:, None])
+
+        timestamps, _ = buffer.drain()
+        np.testing.assert_array_equal([0, 1, 2], timestamps)
+        self.assertEqual(2, buffer.dropped_count)
+
+    def test_drain_is_contiguous_after_wrapping(self):
+        buffer = RingBuffer(4, 1)
+        for i in range(3):
+            buffer.append(i, [i])
+        buffer.drain()
+
+        buffer.extend(np.arange(3, 10), np.arange(3, 10)[:, None])
+
+        timestamps, values = buffer.drain()
+        np.testing.assert_array_equal([6, 7, 8, 9], timestamps)
+        np.testing.assert_array_equal([6, 7, 8, 9], values[:, 0])
+        self.assertEqual(3, buffer.dropped_count)
+
+    def test_read_from_position(self):
+        buffer = RingBuffer(4, 1)
+        buffer.extend(np.arange(3), np.arange(3)[:, None])
+        buffer.drain()
+
+        # Removing samples from the queue doesn't affect reading them by their position.
+        timestamps, _ = buffer.read(1)
+        np.testing.assert_array_equal([1, 2], timestamps)
+
+        buffer.extend(np.arange(3, 6), np.arange(3, 6)[:, None])
+        self.assertEqual(6, buffer.written)
+        self.assertEqual(2, buffer.oldest_position)
+        np.testing.assert_array_equal([2, 3], buffer.read(2, count=2)[0])
+        with self.assertRaises(ValueError):
+            buffer.read(1)
+
+    def test_restore_state(self):
+        buffer = RingBuffer(4, 1)
+        buffer.extend(np.arange(3), np.arange(3)[:, None])
+        buffer.pop()
+        state = buffer.save_state(since=0)
+
+        buffer.extend(np.arange(3, 9), np.arange(3, 9)[:, None])
+        buffer.restore_state(state)
+
+        np.testing.assert_array_equal([0, 1, 2], buffer.read(0)[0])
+        np.testing.assert_array_equal([1, 2], buffer.drain()[0])
+        self.assertEqual(3, buffer.written)
+
+    def test_incorrect_capacity_raises(self):
+        with self.assertRaises(ValueError):
+            RingBuffer(0, 1)
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import Mock
+
+import numpy as np
+
+from lobster_common.vec3 import Vec3
+
+from lobster_simulator.common.simulation_time import SimulationTime
+from lobster_simulator.sensors.sensor import Sensor, Interpolation
+
+
+class LinearSensor(Sensor):
+    """Sensor whose real values increase by 1 every millisecond."""
+
+    def __init__(self, time_step: SimulationTime, noise_stds=None, noise_seed=None,
+                 interpolation=Interpolation.LINEAR):
+        self.time = SimulationTime(0)
+        super().__init__(Mock(), Vec3([0, 0, 0]), time_step, SimulationTime(0), orientation=Mock(),
+                         noise_stds=noise_stds, noise_seed=noise_seed, interpolation=interpolation)
+
+    def _get_real_values(self, dt: SimulationTime):
+        value = self.time.milliseconds
+        return [value, Vec3([value, 2 * value, -value])]
+
+
+class QuadraticSensor(LinearSensor):
+    """Sensor whose real value is the square of the time in milliseconds."""
+
+    def _get_real_values(self, dt: SimulationTime):
+        value = self.time.milliseconds
+        return [value ** 2, Vec3([value, value ** 2, 0])]
+
+
+class SensorTest(unittest.TestCase):
+
+    def test_samples_faster_than_updates_are_interpolated(self):
+        sensor = LinearSensor(SimulationTime(1000))
+
+        for _ in range(3):
+            sensor.time += SimulationTime(4000)
+            sensor.update(sensor.time, SimulationTime(4000))
+
+        values = sensor.pop_all_values()
+
+        self.assertEqual(13, len(values))
+        for i, (seconds, (value, vector)) in enumerate(values):
+            self.assertAlmostEqual(i / 1000, seconds)
+            self.assertAlmostEqual(i, value)
+            np.testing.assert_allclose([i, 2 * i, -i], vector.numpy())
+
+    def test_quadratic_interpolation(self):
+        sensor = QuadraticSensor(SimulationTime(1000), interpolation=Interpolation.QUADRATIC)
+
+        for _ in range(4):
+            sensor.time += SimulationTime(4000)
+            sensor.update(sensor.time, SimulationTime(4000))
+
+        # The first step is interpolated linearly, since there is no history yet.
+        values = sensor.pop_all_values()[5:]
+
+        self.assertEqual(12, len(values))
+        for seconds, (value, vector) in values:
+            milliseconds = seconds * 1000
+            self.assertAlmostEqual(milliseconds ** 2, value)
+            np.testing.assert_allclose([milliseconds, milliseconds ** 2, 0], vector.numpy(), atol=1e-9)
+
+    def test_noise_is_added_to_every_component(self):
+        sensor = LinearSensor(SimulationTime(10), noise_stds=[0.5, 2], noise_seed=0)
+
+        sensor.time += SimulationTime(100000)
+        sensor.update(sensor.time, SimulationTime(100000))
+
+        timestamps, samples = sensor.drain()
+        errors = samples - (timestamps / 1000)[:, None] * np.array([1, 1, 2, -1])
+
+        np.testing.assert_allclose([0.5, 2, 2, 2], errors.std(axis=0), rtol=0.1)
+
+    def test_noise_is_reproducible_with_seed(self):
+        sensors = [LinearSensor(SimulationTime(1000), noise_stds=[0.5, 2], noise_seed=42) for _ in range(2)]
+        sensors[1].set_noise_model(sensors[1].create_noise_model(white_stds=[0.5, 2, 2, 2], bias=0.1))
+        sensors[0].set_noise_model(sensors[0].create_noise_model(white_stds=[0.5, 2, 2, 2], bias=0.1))
+
+        for sensor in sensors:
+            sensor.time += SimulationTime(20000)
+            sensor.update(sensor.time, SimulationTime(20000))
+
+        np.testing.assert_array_equal(sensors[0].drain()[1], sensors[1].drain()[1])
@@ -0,0 +1,98 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from lobster_simulator.sensors.sensor_log import SensorLogWriter, SensorLog
+from lobster_simulator.simulator import Simulator
+from .. import TemporaryCacheMixin
+
+
+class SensorLogTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.dtype = np.dtype([('time', np.int64), ('value', np.float64), ('vector', np.float64, (3,))])
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def records(self, start, count):
+        records = np.zeros(count, dtype=self.dtype)
+        records['time'] = np.arange(start, start + count) * 1000
+        records['value'] = np.arange(start, start + count)
+        records['vector'] = np.arange(start, start + count)[:, None] * [1, 2, 3]
+        return records
+
+    def test_write_and_read(self):
+        with SensorLogWriter(self.directory.name, chunk_size=100) as writer:
+            writer.add_stream('sensor', self.dtype)
+            for start in range(0, 1000, 30):
+                writer.write('sensor', self.records(start, 30))
+
+        log = SensorLog(self.directory.name)
+        self.assertEqual(['sensor'], log.stream_names)
+        self.assertEqual(1020, log.length('sensor'))
+
+        columns = log['sensor']
+        self.assertIsInstance(columns['time'], np.memmap)
+        np.testing.assert_array_equal(np.arange(1020), columns['value'])
+        np.testing.assert_array_equal(np.arange(1020)[:, None] * [1, 2, 3], columns['vector'])
+
+        selection = log.time_slice('sensor', 250500, 500000)
+        np.testing.assert_array_equal(np.arange(251, 500), columns['value'][selection])
+
+    def test_log_robot_sensors(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+
+        with SensorLogWriter(self.directory.name) as writer:
+            writer.attach(robot)
+            for _ in range(50):
+                simulator.do_step()
+
+        log = SensorLog(self.directory.name)
+        self.assertEqual(set(robot.sensors.keys()), set(log.stream_names))
+
+        times = log['imu']['time']
+        self.assertGreaterEqual(len(times), 50)
+        self.assertTrue(np.all(np.diff(times) == 4000))
+        self.assertEqual((len(times), 3), log['imu']['acceleration'].shape)
+
+    def test_episodes_within_a_chunk(self):
+        with SensorLogWriter(self.directory.name, chunk_size=100) as writer:
+            writer.add_stream('sensor', self.dtype)
+            writer.write('sensor', self.records(0, 30))
+            # The time goes back within a batch and between batches.
+            writer.write('sensor', np.concatenate([self.records(30, 10), self.records(0, 20)]))
+            writer.write('sensor', self.records(5, 20))
+
+        log = SensorLog(self.directory.name)
+        self.assertEqual([slice(0, 40), slice(40, 60), slice(60, 80)], log.episodes('sensor'))
+
+        values = log['sensor']['value']
+        np.testing.assert_array_equal(np.arange(10, 20), values[log.time_slice('sensor', 10000, 20000, episode=1)])
+        np.testing.assert_array_equal(np.arange(10, 20), values[log.time_slice('sensor', 10000, 20000, episode=-1)])
+        np.testing.assert_array_equal(np.arange(35, 40), values[log.time_slice('sensor', 35000, 100000)])
+
+    def test_log_spans_reset(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+
+        with SensorLogWriter(self.directory.name) as writer:
+            writer.attach(robot)
+            simulator.step_n(50)
+            simulator.reset_robot()
+            simulator.step_n(50)
+
+        log = SensorLog(self.directory.name)
+        episodes = log.episodes('imu')
+        self.assertEqual(2, len(episodes))
+
+        times = log['imu']['time']
+        for episode, samples in enumerate(episodes):
+            self.assertTrue(np.all(np.diff(times[samples]) == 4000))
+            self.assertEqual(samples, log.time_slice('imu', 0, 1000000, episode=episode))
+
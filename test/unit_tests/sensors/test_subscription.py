@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+
+from lobster_simulator.simulator import Simulator
+from lobster_simulator.sensors.subscription import Subscription
+from .. import TemporaryCacheMixin
+
+
+class SubscriptionTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def records(self, times):
+        records = np.zeros(len(times), dtype=[('time', np.int64), ('value', np.float64)])
+        records['time'] = times
+        return records
+
+    def test_decimation_over_multiple_deliveries(self):
+        delivered = []
+        subscription = Subscription(lambda records: delivered.extend(records['time']), decimation=3)
+
+        for start in range(0, 20, 4):
+            subscription.deliver(self.records(np.arange(start, start + 4)))
+
+        self.assertEqual(list(range(0, 20, 3)), delivered)
+
+    def test_batches(self):
+        batches = []
+        subscription = Subscription(lambda records: batches.append(records['time'].tolist()), batch_size=4)
+
+        subscription.deliver(self.records(np.arange(3)))
+        self.assertEqual([], batches)
+        subscription.deliver(self.records(np.arange(3, 10)))
+
+        self.assertEqual([[0, 1, 2, 3], [4, 5, 6, 7]], batches)
+
+    def test_incorrect_decimation_raises(self):
+        with self.assertRaises(ValueError):
+            Subscription(lambda records: None, decimation=0)
+
+    def test_subscribe_all_delivers_once_per_step(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+        robot.set_polling(False)
+
+        deliveries = []
+        robot.subscribe_all(deliveries.append)
+        pressures = []
+        robot.subscribe(robot.pressure_sensor, lambda records: pressures.extend(records['pressure']), decimation=2)
+
+        for _ in range(10):
+            simulator.do_step()
+
+        self.assertEqual(10, len(deliveries))
+        self.assertIn('imu', deliveries[-1])
+        self.assertEqual((3,), deliveries[-1]['imu']['acceleration'].shape[1:])
+        self.assertEqual(len(deliveries[-1]['pressure_sensor']), 1)
+
+        # Every other pressure sample, starting with the first one.
+        pressure_count = sum(len(delivery['pressure_sensor']) for delivery in deliveries)
+        self.assertEqual((pressure_count + 1) // 2, len(pressures))
+
+        # Nothing is kept for polling
+        self.assertIsNone(robot.pressure_sensor.pop_next_value())
+        self.assertIsNotNone(robot.pressure_sensor.get_latest_value())
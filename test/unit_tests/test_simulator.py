@@ -4,10 +4,13 @@ import unittest
 from unittest.mock import Mock
 
 from lobster_simulator.common.pybullet_api import PybulletAPI
+from lobster_simulator.environment.terrain import Terrain
 from lobster_simulator.simulator import Simulator
+from lobster_common.vec3 import Vec3
+from . import TemporaryCacheMixin
 
 
-class SimulatorTest(unittest.TestCase):
+class SimulatorTest(TemporaryCacheMixin, unittest.TestCase):
 
     def test_add_ocean_floor(self):
 
@@ -20,3 +23,139 @@ class SimulatorTest(unittest.TestCase):
                 simulator.add_ocean_floor(100)
                 PybulletAPI.loadURDF.assert_called_once()
                 PybulletAPI.changeVisualShape.assert_called_once()
+
+    def test_step_n_advances_time(self):
+        simulator = Simulator(4000, gui=False)
+        simulator.create_robot()
+
+        simulator.step_n(25)
+
+        self.assertEqual(25 * 4000, simulator._time.microseconds)
+
+    def test_step_for_only_executes_whole_steps(self):
+        simulator = Simulator(4000, gui=False)
+        simulator.create_robot()
+
+        simulator.step_for(0.01)
+
+        self.assertEqual(8000, simulator._time.microseconds)
+
+    def test_step_until_does_not_exceed_time(self):
+        simulator = Simulator(4000, gui=False)
+        simulator.create_robot()
+
+        simulator.step_until(0.012)
+        self.assertEqual(12000, simulator._time.microseconds)
+
+        simulator.step_until(0.0239)
+        self.assertEqual(20000, simulator._time.microseconds)
+
+    def test_simulators_are_independent(self):
+        first = Simulator(4000, gui=False)
+        first_robot = first.create_robot()
+        second = Simulator(4000, gui=False)
+        second_robot = second.create_robot()
+
+        self.assertNotEqual(first.physics_client_id, second.physics_client_id)
+
+        start_position = second_robot.get_position()
+
+        first_robot.set_velocity(linear_velocity=Vec3([1, 0, 0]))
+        first.step_n(10)
+
+        self.assertEqual(start_position, second_robot.get_position())
+        self.assertNotEqual(start_position, first_robot.get_position())
+
+        first.shutdown()
+        second.shutdown()
+
+    def test_restore_state(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+        robot.set_velocity(linear_velocity=Vec3([1, 0, 0]))
+        simulator.step_n(10)
+
+        state = simulator.save_state()
+        position = robot.get_position()
+        robot.get_thruster('top-front').set_desired_thrust(20)
+
+        simulator.step_n(10)
+        self.assertNotEqual(position, robot.get_position())
+
+        simulator.restore_state(state)
+        self.assertEqual(position, robot.get_position())
+        self.assertEqual(40000, simulator._time.microseconds)
+        self.assertEqual(0, robot.get_thruster('top-front').current_thrust)
+
+        # The same state can be restored multiple times
+        simulator.step_n(10)
+        simulator.restore_state(state)
+        self.assertEqual(position, robot.get_position())
+
+    def test_robot_state_follows_changes_of_the_body(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+        start_state = robot.state
+
+        robot.set_position_and_orientation(position=Vec3([1, 2, 3]))
+        self.assertEqual(Vec3([1, 2, 3]), robot.state.position)
+
+        simulator.reset_robot()
+        self.assertEqual(start_state.position, robot.state.position)
+
+        # The getters give copies, so changing them doesn't change the shared state.
+        self.assertIsNot(robot.state.orientation, robot.get_orientation())
+        self.assertIsNot(robot.state.orientation, robot.get_position_and_orientation()[1])
+
+    def test_reset_robot_keeps_robot_instance(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+        start_position = robot.get_position()
+
+        robot.set_velocity(linear_velocity=Vec3([1, 0, 0]))
+        simulator.step_n(10)
+        simulator.reset_robot()
+
+        self.assertIs(robot, simulator.robot)
+        self.assertEqual(start_position, robot.get_position())
+        self.assertEqual(0, simulator._time.microseconds)
+
+    def test_reset_robot_with_terrain(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot()
+        start_position = robot.get_position()
+
+        # Only the robot is part of the snapshot, so bodies that are added afterwards don't prevent the reset.
+        terrain = Terrain.sine_wave_terrain(physics_client_id=simulator.physics_client_id)
+        terrain.load_chunk(0, 0)
+        terrain.close()
+
+        robot.set_velocity(linear_velocity=Vec3([1, 0, 0]))
+        simulator.step_n(10)
+        simulator.reset_robot()
+
+        self.assertIs(robot, simulator.robot)
+        self.assertEqual(start_position, robot.get_position())
+        self.assertEqual(Vec3([0, 0, 0]), robot.get_velocity())
+        self.assertEqual(0, simulator._time.microseconds)
+        self.assertIsNone(robot.pressure_sensor.get_latest_value())
+
+        # The sensors sample from the reset time on.
+        simulator.step_n(1)
+        self.assertAlmostEqual(0.004, robot.pressure_sensor.get_latest_value()[0])
+
+    def test_restore_state_keeps_noise_reproducible(self):
+        simulator = Simulator(4000, gui=False)
+        robot = simulator.create_robot(noise_seed=1)
+        robot.pressure_sensor.set_noise(0.1)
+
+        state = simulator.save_state()
+        simulator.step_n(10)
+        first = [value for _, value in robot.pressure_sensor.pop_all_values()]
+
+        simulator.restore_state(state)
+        simulator.step_n(10)
+        second = [value for _, value in robot.pressure_sensor.pop_all_values()]
+
+        self.assertEqual(first, second)
+        self.assertIs(robot.pressure_sensor.noise.rng, robot.pressure_sensor._noise_rng)
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from lobster_simulator.vector_simulator import VectorSimulator
+from . import TemporaryCacheMixin
+
+
+class VectorSimulatorTest(TemporaryCacheMixin, unittest.TestCase):
+
+    def test_step_and_reset(self):
+        with VectorSimulator(2, 4000, steps_per_action=5, timeout=120) as simulator:
+            self.assertEqual(8, simulator.num_thrusters)
+
+            thrusts = np.zeros((2, simulator.num_thrusters))
+            # Only let the first robot move forward
+            thrusts[0, :4] = 40
+
+            for _ in range(10):
+                observations = simulator.step(thrusts)
+
+            np.testing.assert_allclose(observations['time'], [0.2, 0.2])
+            # The thrusters push the first robot sideways, so compare the whole position and velocity
+            self.assertGreater(np.linalg.norm(observations['position'][0] - observations['position'][1]), 0.01)
+            self.assertGreater(np.linalg.norm(observations['velocity'][0] - observations['velocity'][1]), 0.1)
+
+            observations = simulator.reset(np.array([True, False]))
+            np.testing.assert_allclose(observations['time'], [0, 0.2])
+            self.assertAlmostEqual(0, np.linalg.norm(observations['velocity'][0]))
+
+            # The reset robot has no sensor values from the previous episode, the other one keeps them.
+            for field in ['pressure', 'accelerometer', 'gyroscope', 'magnetometer', 'dvl_velocity', 'dvl_altitude']:
+                self.assertTrue(np.isnan(observations[field][0]).all(), field)
+            self.assertFalse(observations['dvl_velocity_valid'][0])
+            self.assertFalse(np.isnan(observations['pressure'][1]))
+            self.assertFalse(np.isnan(observations['accelerometer'][1]).any())
+
+            observations = simulator.step(thrusts)
+            self.assertFalse(np.isnan(observations['pressure']).any())
+            self.assertFalse(np.isnan(observations['accelerometer']).any())
+
+    def test_invalid_amount_of_simulators_raises(self):
+        with self.assertRaises(ValueError):
+            VectorSimulator(0, 4000)